@@ -0,0 +1,148 @@
+"""
+Shared Redis cache for read-heavy endpoints.
+
+Each cached payload is keyed by the current change version of every table it
+reads from. Versions live in one Redis hash and are bumped after a session
+that wrote to those tables commits, so all uvicorn workers see the
+invalidation at once and stale entries simply age out via their TTL.
+
+Tables are collected automatically from ORM flushes and ORM bulk
+update/delete. Raw SQL writes must call touch() with the tables they modify.
+A rolled-back write may still bump versions on the next commit of the same
+session; that only costs a cache miss.
+
+If Redis is unreachable, every call falls straight through to the DB and
+Redis is retried after CACHE_RETRY_SECONDS.
+"""
+import hashlib
+import json
+import logging
+import time
+from typing import Callable, Iterable, Optional
+
+import redis
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core import responses
+from app.core.config import settings
+from app.core.database import AppSession, on_commit
+
+logger = logging.getLogger("act-backend.cache")
+
+VERSIONS_KEY = "act:versions"
+ENTRY_PREFIX = "act:cache"
+
+_client: Optional[redis.Redis] = None
+_down_until = 0.0
+
+
+def get_redis() -> Optional[redis.Redis]:
+    """Shared client, or None while caching is disabled or Redis is marked down."""
+    global _client
+    if not settings.CACHE_ENABLED or time.monotonic() < _down_until:
+        return None
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=settings.CACHE_REDIS_TIMEOUT_SECONDS,
+            socket_connect_timeout=settings.CACHE_REDIS_TIMEOUT_SECONDS,
+        )
+    return _client
+
+
+def _mark_down(exc: Exception):
+    global _down_until
+    _down_until = time.monotonic() + settings.CACHE_RETRY_SECONDS
+    logger.warning(f"Redis unavailable, serving from DB for {settings.CACHE_RETRY_SECONDS}s: {exc}")
+
+
+def cached(name: str, tables: Iterable[str], ttl: int, compute: Callable, params: Optional[dict] = None,
+           db: Optional[Session] = None):
+    """Return the JSON-ready result of compute(), served from Redis when current.
+
+    Pass the session compute() reads from when it may be a read replica:
+    a replica can compute a result that predates the versions it is keyed
+    under, so replica results are kept apart from primary ones (which
+    read-your-writes requests rely on) and live at most REPLICA_MAX_LAG_SECONDS.
+    """
+    return _cached(name, tables, ttl, params, db, lambda: jsonable_encoder(compute()), json.dumps, json.loads)
+
+
+def cached_json(name: str, tables: Iterable[str], ttl: int, compute: Callable, params: Optional[dict] = None,
+                db: Optional[Session] = None) -> bytes:
+    """Like cached(), but returns the encoded JSON body (orjson) for responses.json_response(),
+    so a hit is sent without being decoded and re-encoded."""
+    return _cached(name, tables, ttl, params, db, lambda: responses.dumps(compute()), lambda b: b, lambda b: b)
+
+
+def _cached(name: str, tables: Iterable[str], ttl: int, params: Optional[dict], db: Optional[Session],
+            produce: Callable, serialize: Callable, load: Callable):
+    tables = list(tables)
+    r = get_redis()
+    if r is None:
+        return produce()
+    if db is not None and "replica" in db.info:
+        name = f"{name}@replica"
+        ttl = max(1, min(ttl, int(settings.REPLICA_MAX_LAG_SECONDS)))
+
+    try:
+        versions = r.hmget(VERSIONS_KEY, tables)
+        suffix = hashlib.sha1(json.dumps(params or {}, sort_keys=True, default=str).encode()).hexdigest()[:12]
+        key = f"{ENTRY_PREFIX}:{name}:{suffix}:" + ".".join((v or b"0").decode() for v in versions)
+        hit = r.get(key)
+        if hit is not None:
+            return load(hit)
+    except redis.RedisError as e:
+        _mark_down(e)
+        return produce()
+
+    data = produce()
+    try:
+        r.set(key, serialize(data), ex=ttl)
+    except redis.RedisError as e:
+        _mark_down(e)
+    return data
+
+
+def bump(tables: Iterable[str]):
+    """Invalidate every cached entry that depends on any of the given tables."""
+    tables = sorted(set(tables))
+    r = get_redis()
+    if not tables or r is None:
+        return
+    try:
+        pipe = r.pipeline(transaction=False)
+        for table in tables:
+            pipe.hincrby(VERSIONS_KEY, table, 1)
+        pipe.execute()
+    except redis.RedisError as e:
+        _mark_down(e)
+
+
+def touch(db: Session, *tables: str):
+    """Record tables written by raw SQL; they are bumped when the session commits."""
+    db.info.setdefault("cache_touched", set()).update(tables)
+
+
+# ── Session hooks ─────────────────────────────────────────────────────────────
+
+@event.listens_for(AppSession, "after_flush")
+def _collect_flushed_tables(session, flush_context):
+    touched = session.info.setdefault("cache_touched", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        touched.add(obj.__tablename__)
+
+
+@event.listens_for(AppSession, "do_orm_execute")
+def _collect_bulk_tables(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper:
+        touch(orm_execute_state.session, orm_execute_state.bind_mapper.local_table.name)
+
+
+@on_commit(order=0)
+def _bump_on_commit(session):
+    touched = session.info.pop("cache_touched", None)
+    if touched:
+        return bump, touched
@@ -0,0 +1,93 @@
+"""
+Conditional GET (ETag / Last-Modified) for list and dashboard endpoints.
+
+Every transaction that changes a tracked table appends a `table_changes` row
+(statement-level triggers in 01_schema.sql); a table's version is its
+rolled-up `table_versions` count plus those pending rows, so the state of the
+tables behind a response is one small query away. A route calls
+not_modified() first: it derives a weak ETag from those versions, the request
+URL and, for payloads that also drift with the clock, a time bucket. A
+matching If-None-Match (or, without one, If-Modified-Since) gets a bare 304
+before the route runs its query; otherwise the validators are set on the
+response and the route carries on.
+
+Writes that bypass the triggers (COPY with triggers disabled, restores) must
+record the change themselves, e.g. `INSERT INTO table_changes (table_name) VALUES ('assets')`.
+"""
+import hashlib
+import time
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import Session
+
+from app.models.models import TableChange, TableVersion
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Weak comparison (RFC 9110 §13.1.2): W/ prefixes are ignored
+    if header.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in header.split(","))
+
+
+def _versions(db: Session, tables: list) -> dict:
+    """table -> (version, changed_at): rolled-up counts plus pending changes, read in one snapshot."""
+    rolled = select(TableVersion.table_name, TableVersion.version, TableVersion.changed_at) \
+        .where(TableVersion.table_name.in_(tables))
+    pending = select(TableChange.table_name, func.count(), func.max(TableChange.changed_at)) \
+        .where(TableChange.table_name.in_(tables)) \
+        .group_by(TableChange.table_name)
+    versions = {}
+    for table, version, changed_at in db.execute(union_all(rolled, pending)):
+        if table in versions:
+            prior_version, prior_changed_at = versions[table]
+            version, changed_at = prior_version + version, max(prior_changed_at, changed_at)
+        versions[table] = (version, changed_at)
+    return versions
+
+
+def not_modified(
+    request: Request,
+    response: Response,
+    db: Session,
+    tables: Iterable[str],
+    bucket_seconds: Optional[int] = None,
+) -> Optional[Response]:
+    """Return a 304 response if the client's copy is current, else set ETag / Last-Modified and return None."""
+    tables = sorted(set(tables))
+    versions = _versions(db, tables)
+    parts = [request.url.path, request.url.query]
+    for table in tables:
+        v = versions.get(table)
+        # changed_at keeps tags unique across a reinitialised database whose counters restart
+        parts.append(f"{table}:{v[0]}:{v[1].timestamp()}" if v else f"{table}:0")
+    if bucket_seconds:
+        parts.append(f"t{int(time.time() // bucket_seconds)}")
+    etag = 'W/"' + hashlib.sha1("|".join(parts).encode()).hexdigest()[:20] + '"'
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    # Time-bucketed payloads change without a write, so only the ETag describes them
+    last_modified = None
+    if versions and not bucket_seconds:
+        last_modified = max(changed_at for _, changed_at in versions.values()).replace(microsecond=0)
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    else:
+        fresh = False
+        if_modified_since = request.headers.get("if-modified-since")
+        if last_modified and if_modified_since:
+            try:
+                fresh = last_modified <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                pass
+    if fresh:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
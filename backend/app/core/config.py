@@ -8,13 +8,94 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "change_this_in_production"
     ENVIRONMENT: str = "development"
 
+    # Async DB stack (asyncpg) for the custody scan routes
+    ASYNC_DB_ENABLED: bool = False
+    ASYNC_DB_POOL_SIZE: int = 20
+    ASYNC_DB_MAX_OVERFLOW: int = 20
+
+    # Read replicas for GET-only reporting/dashboard endpoints (comma-separated
+    # URLs; empty = everything on the primary). A replica lagging more than
+    # REPLICA_MAX_LAG_SECONDS is skipped, and a client that wrote within
+    # READ_YOUR_WRITES_SECONDS reads from the primary; keep that above
+    # REPLICA_MAX_LAG_SECONDS + REPLICA_LAG_CHECK_SECONDS. The replica login needs
+    # pg_monitor, or its WAL receiver status is unreadable and it is never used
+    DATABASE_REPLICA_URLS: str = ""
+    REPLICA_POOL_SIZE: int = 10
+    REPLICA_MAX_OVERFLOW: int = 10
+    REPLICA_MAX_LAG_SECONDS: float = 5
+    REPLICA_LAG_CHECK_SECONDS: float = 5
+    READ_YOUR_WRITES_SECONDS: float = 15
+
+    # Shared Redis cache for read-heavy endpoints
+    CACHE_ENABLED: bool = True
+    CACHE_REDIS_TIMEOUT_SECONDS: float = 0.25
+    CACHE_RETRY_SECONDS: int = 30
+
+    # In-process QR resolution cache (workers, assets, kits, edge nodes)
+    QR_CACHE_MAX_ENTRIES: int = 10000
+    QR_CACHE_TTL_SECONDS: int = 300
+
+    # Live change events (SSE /events/stream), fanned out over Redis pub/sub
+    EVENTS_ENABLED: bool = True
+    EVENTS_HEARTBEAT_SECONDS: int = 15
+    EVENTS_CLIENT_QUEUE_SIZE: int = 100
+
+    # Background jobs (rules checks, partition maintenance):
+    #   leader — one process, elected via a Postgres advisory lock, runs them
+    #   all    — every process runs them (single-process development)
+    #   off    — this process never runs them (API-only replicas)
+    SCHEDULER_MODE: str = "leader"
+    SCHEDULER_LEADER_CHECK_SECONDS: int = 15
+    JOB_RUN_RETENTION_DAYS: int = 30
+    # Fold appended dashboard counter deltas and table changes into their totals
+    # (bounds the rows a summary read or ETag check sums)
+    COUNTER_ROLLUP_SECONDS: int = 30
+
+    # Bulk CSV import of assets / workers (rows per COPY + merge, errors reported)
+    IMPORT_CHUNK_SIZE: int = 5000
+    IMPORT_MAX_ERRORS: int = 1000
+
+    # Streaming CSV/NDJSON export of custody history / audit log (rows per
+    # server-side cursor fetch and body chunk; gzip level when requested).
+    # Exports read on the primary use their own capped pool, so at most
+    # EXPORT_POOL_SIZE run at once there; the next waits up to
+    # EXPORT_POOL_TIMEOUT_SECONDS, then gets a 503
+    EXPORT_CHUNK_SIZE: int = 2000
+    EXPORT_GZIP_LEVEL: int = 6
+    EXPORT_POOL_SIZE: int = 2
+    EXPORT_POOL_TIMEOUT_SECONDS: float = 5
+
+    # Monthly partitions of custody_records / audit_log and archival of old ones
+    PARTITION_MONTHS_AHEAD: int = 3
+    ARCHIVE_ENABLED: bool = False
+    ARCHIVE_AFTER_MONTHS: int = 24
+    ARCHIVE_DIR: str = "/app/archive"
+
+    # Per-request SQL profiling (Server-Timing / X-SQL-Profile headers, N+1 warnings).
+    # When enabled, a SAMPLE_RATE fraction of requests is profiled, plus any
+    # request sent with `X-SQL-Profile: 1`. In production the header value must
+    # be SQL_PROFILE_TOKEN (unset = opt-in disabled), as the reply has SQL text
+    SQL_PROFILE_ENABLED: bool = False
+    SQL_PROFILE_SAMPLE_RATE: float = 0.0
+    SQL_PROFILE_N_PLUS_ONE_THRESHOLD: int = 5
+    SQL_PROFILE_TOKEN: Optional[str] = None
+
     # Email alerts
     SMTP_HOST: str = "smtp.gmail.com"
     SMTP_PORT: int = 587
     SMTP_USER: Optional[str] = None
     SMTP_PASSWORD: Optional[str] = None
+    SMTP_STARTTLS: bool = True
+    SMTP_TIMEOUT_SECONDS: float = 30
     ALERT_EMAIL_FROM: str = "alerts@act-system.local"
 
+    # Alert notification dispatcher (digest emails, run by the scheduler leader)
+    ALERT_NOTIFY_ENABLED: bool = False
+    ALERT_NOTIFY_INTERVAL_SECONDS: int = 60
+    ALERT_NOTIFY_BATCH_SIZE: int = 200
+    ALERT_NOTIFY_MAX_ATTEMPTS: int = 5
+    ALERT_NOTIFY_LEASE_SECONDS: int = 300
+
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -1,16 +1,110 @@
-from sqlalchemy import create_engine
+import asyncio
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from app.core import metrics
 from app.core.config import settings
 
 engine = create_engine(
     settings.DATABASE_URL,
+    poolclass=metrics.TimedQueuePool,
     pool_pre_ping=True,
     pool_size=10,
     max_overflow=20,
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+metrics.register_pool("sync", engine)
+
+
+class AppSession(Session):
+    """Session class shared by the sync and async factories, so session event
+    hooks (cache invalidation etc.) apply to both."""
+
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AppSession)
+
+# Streaming exports hold a connection and an open transaction for as long as
+# the client takes to download; on the primary they get a small pool of their
+# own so they cannot starve the request pool
+export_engine = create_engine(
+    settings.DATABASE_URL,
+    poolclass=metrics.timed_pool("export"),
+    pool_pre_ping=True,
+    pool_size=settings.EXPORT_POOL_SIZE,
+    max_overflow=0,
+    pool_timeout=settings.EXPORT_POOL_TIMEOUT_SECONDS,
+)
+
+metrics.register_pool("export", export_engine)
+
+ExportSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=export_engine, class_=AppSession)
+
+# Async stack (asyncpg). Only built when ASYNC_DB_ENABLED is set; the async
+# custody routes are the only users.
+async_engine: Optional[AsyncEngine] = None
+AsyncSessionLocal: Optional[async_sessionmaker] = None
+if settings.ASYNC_DB_ENABLED:
+    async_engine = create_async_engine(
+        make_url(settings.DATABASE_URL).set(drivername="postgresql+asyncpg"),
+        poolclass=metrics.TimedAsyncQueuePool,
+        pool_pre_ping=True,
+        pool_size=settings.ASYNC_DB_POOL_SIZE,
+        max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+    )
+    metrics.register_pool("async", async_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False, sync_session_class=AppSession
+    )
+
+
+# ── Commit side effects ───────────────────────────────────────────────────────
+# Blocking work a commit triggers (Redis I/O: cache version bumps, then event
+# publication) is collected by hooks registered with on_commit() and run in
+# their order, so a published event never reaches a client before the cache
+# it invalidates. On a sync session it runs before commit() returns. On an
+# AsyncSession the commit happens on the event loop, where blocking would
+# stall every connection, so the effects are queued on the session and the
+# async route awaits run_commit_effects() (in the executor) before responding.
+
+_commit_effects: List[Tuple[int, Callable]] = []
+
+
+def on_commit(order: int):
+    """Register collect(session) -> (fn, *args) or None, called after every commit."""
+    def register(collect: Callable):
+        _commit_effects.append((order, collect))
+        _commit_effects.sort(key=lambda effect: effect[0])
+        return collect
+    return register
+
+
+def _run_effects(effects: list):
+    for fn, *args in effects:
+        fn(*args)
+
+
+@event.listens_for(AppSession, "after_commit")
+def _collect_commit_effects(session):
+    effects = [effect for _, collect in _commit_effects if (effect := collect(session))]
+    if not effects:
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return _run_effects(effects)
+    session.info.setdefault("commit_effects", []).extend(effects)
+
+
+async def run_commit_effects(db: AsyncSession):
+    """Run the side effects of the commits made through `db` so far."""
+    effects = db.sync_session.info.pop("commit_effects", None)
+    if effects:
+        await asyncio.get_running_loop().run_in_executor(None, _run_effects, effects)
+
 
 Base = declarative_base()
 
@@ -21,3 +115,12 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        finally:
+            # Routes await these themselves before responding; never drop leftovers
+            await run_commit_effects(db)
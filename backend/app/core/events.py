@@ -0,0 +1,241 @@
+"""
+Live change events for the dashboard, served as Server-Sent Events on
+GET /events/stream.
+
+Writers call emit() next to the change. Events are held on the session and
+published only after it commits, so a rolled-back transition never reaches a
+screen. Publication goes through one Redis pub/sub channel that every uvicorn
+worker subscribes to and fans out to its own connected clients; load grows
+with the number of changes, not with viewers x time. While Redis is
+unreachable each worker delivers its own events to its own clients only, and
+the frontend falls back to polling whenever the stream is down.
+
+Events are refresh hints ({"type": ..., ids}), not a replicated log. A client
+that falls behind, or whose worker lost Redis for a while, gets a "resync"
+event and reloads everything. With read replicas configured, events also
+carry "lsn", the primary's WAL position once they committed: reloads send it
+back so they are not served by a replica that has not replayed the change
+(see replicas.py).
+
+The same subscription carries process-to-process messages on other channels
+(e.g. QR cache invalidations): modules register a handler with
+hub.on_channel() and send with broadcast(). A handler is called with None
+after the subscription was lost, since messages may have been missed.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Callable, Dict, Iterable, Optional, Set
+
+import redis
+import redis.asyncio as aioredis
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import AppSession, on_commit
+from app.core.replicas import primary_lsn
+
+logger = logging.getLogger("act-backend.events")
+
+CHANNEL = "act:events"
+RESYNC = json.dumps({"type": "resync"})
+
+_client: Optional[redis.Redis] = None
+_down_until = 0.0
+
+
+def emit(db: Session, type_: str, **data):
+    """Queue an event on the session; it is published when the session commits."""
+    # Tagged with the innermost savepoint so rolling that back drops just its events
+    db.info.setdefault("pending_events", []).append(
+        (db.get_nested_transaction(), {"type": type_, **jsonable_encoder(data)})
+    )
+
+
+def _get_redis() -> Optional[redis.Redis]:
+    global _client
+    if not settings.EVENTS_ENABLED or time.monotonic() < _down_until:
+        return None
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=settings.CACHE_REDIS_TIMEOUT_SECONDS,
+            socket_connect_timeout=settings.CACHE_REDIS_TIMEOUT_SECONDS,
+        )
+    return _client
+
+
+def publish(events: Iterable[dict]):
+    """Send events to every worker's clients (this worker's only if Redis is down)."""
+    global _down_until
+    payloads = [json.dumps(e) for e in events]
+    r = _get_redis()
+    if r is not None:
+        try:
+            pipe = r.pipeline(transaction=False)
+            for payload in payloads:
+                pipe.publish(CHANNEL, payload)
+            pipe.execute()
+            return
+        except redis.RedisError as e:
+            _down_until = time.monotonic() + settings.CACHE_RETRY_SECONDS
+            logger.warning(f"Redis unavailable, delivering events to local clients only: {e}")
+    hub.dispatch_threadsafe(payloads)
+
+
+def broadcast(channel: str, payload: str):
+    """Send a message to every worker's handler for `channel`; dropped while Redis is down."""
+    global _down_until
+    r = _get_redis()
+    if r is None:
+        return
+    try:
+        r.publish(channel, payload)
+    except redis.RedisError as e:
+        _down_until = time.monotonic() + settings.CACHE_RETRY_SECONDS
+        logger.warning(f"Redis unavailable, {channel} message not sent: {e}")
+
+
+class EventHub:
+    """Fans events out to the stream clients connected to this process."""
+
+    def __init__(self):
+        self._clients: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._handlers: Dict[str, Callable[[Optional[str]], None]] = {}
+
+    def on_channel(self, channel: str, handler: Callable[[Optional[str]], None]):
+        """Call handler(payload) for messages broadcast() on `channel` (register before start())."""
+        self._handlers[channel] = handler
+
+    @property
+    def clients(self) -> int:
+        return len(self._clients)
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        if settings.EVENTS_ENABLED:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+        # Ends every open stream so the server can shut down
+        for queue in list(self._clients):
+            self._put(queue, None)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=settings.EVENTS_CLIENT_QUEUE_SIZE)
+        self._clients.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._clients.discard(queue)
+
+    def dispatch_threadsafe(self, payloads: Iterable[str]):
+        if self._loop is None or self._loop.is_closed():
+            return   # not serving (CLI, scripts): nobody to tell
+        for payload in payloads:
+            self._loop.call_soon_threadsafe(self.dispatch, payload)
+
+    def dispatch(self, payload: str):
+        for queue in list(self._clients):
+            self._put(queue, payload)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, payload: Optional[str]):
+        try:
+            queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            # Slow client: drop what it has not read and tell it to reload
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC if payload is not None else None)
+
+    async def _listen(self):
+        lost = False
+        while True:
+            client = aioredis.Redis.from_url(settings.REDIS_URL)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(CHANNEL, *self._handlers)
+                    if lost:
+                        # Other workers' events were missed while disconnected
+                        self.dispatch(RESYNC)
+                        for handler in self._handlers.values():
+                            handler(None)
+                        lost = False
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        channel = message["channel"].decode()
+                        if channel == CHANNEL:
+                            self.dispatch(message["data"].decode())
+                        else:
+                            self._handlers[channel](message["data"].decode())
+            except (redis.RedisError, OSError) as e:
+                if not lost:
+                    logger.warning(f"Event subscription lost, retrying in {settings.CACHE_RETRY_SECONDS}s: {e}")
+                lost = True
+            finally:
+                await client.aclose()
+            await asyncio.sleep(settings.CACHE_RETRY_SECONDS)
+
+
+hub = EventHub()
+
+
+async def stream(request):
+    """SSE body: one `data:` line per event, a comment line as heartbeat."""
+    queue = hub.subscribe()
+    try:
+        yield "retry: 5000\n\n"
+        yield f"data: {json.dumps({'type': 'hello'})}\n\n"
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+            if payload is None:
+                break
+            yield f"data: {payload}\n\n"
+    finally:
+        hub.unsubscribe(queue)
+
+
+# ── Session hooks ─────────────────────────────────────────────────────────────
+
+def _publish_committed(events: list):
+    lsn = primary_lsn()
+    if lsn:
+        events = [{**e, "lsn": lsn} for e in events]
+    publish(events)
+
+
+# After the cache bump: a client refreshing on the event must not read old entries
+@on_commit(order=1)
+def _publish_on_commit(session):
+    pending = session.info.pop("pending_events", None)
+    if pending:
+        return _publish_committed, [e for _, e in pending]
+
+
+@event.listens_for(AppSession, "after_soft_rollback")
+def _discard_on_rollback(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop("pending_events", None)
+    elif session.info.get("pending_events"):
+        session.info["pending_events"] = [
+            (txn, e) for txn, e in session.info["pending_events"] if txn is not previous_transaction
+        ]
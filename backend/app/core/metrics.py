@@ -0,0 +1,166 @@
+"""
+Prometheus metrics, served at /metrics.
+
+- act_http_request_duration_seconds: time to response start per route
+  template, so a streaming response (SSE) counts its setup, not its lifetime.
+  Requests that match no route share one label value.
+- act_scan_outcomes_total: custody scans by outcome, the action taken
+  (CHECKOUT / RETURN / OVERRIDE_CHECKOUT), REPLAYED for a repeated scan_id, or
+  the HTTP status of a rejected scan (404, 409, ...).
+- act_db_pool_*: time spent waiting for a pooled connection, and the pool's
+  in-use / idle / overflow connections, read from the engines at scrape time.
+  A wait histogram creeping towards the pool timeout is the early sign of the
+  exhaustion seen at shift change.
+- act_job_*: scheduler job durations and the row counts their results report.
+
+Metrics live in the default registry of each process; with several uvicorn
+workers every worker is a separate scrape target.
+"""
+import time
+
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+REQUEST_DURATION = Histogram(
+    "act_http_request_duration_seconds",
+    "HTTP request latency until the response starts",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+SCAN_OUTCOMES = Counter(
+    "act_scan_outcomes_total",
+    "Custody scans by action taken, or HTTP status when rejected",
+    ["outcome"],
+)
+
+POOL_WAIT = Histogram(
+    "act_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30),
+)
+
+JOB_DURATION = Histogram(
+    "act_job_duration_seconds",
+    "Scheduler job run time",
+    ["job", "success"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300),
+)
+
+JOB_ROWS = Counter(
+    "act_job_rows_total",
+    "Rows reported by scheduler job results, by result field",
+    ["job", "field"],
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+# ── Requests ──────────────────────────────────────────────────────────────────
+
+class MetricsMiddleware:
+    """Pure ASGI middleware; unlike BaseHTTPMiddleware it leaves streaming bodies alone."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        observed = False
+
+        def observe(status):
+            nonlocal observed
+            observed = True
+            # The router stores the matched route in the (shared) scope
+            route = scope.get("route")
+            REQUEST_DURATION.labels(
+                scope["method"], getattr(route, "path", UNMATCHED_ROUTE), str(status)
+            ).observe(time.perf_counter() - start)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                observe(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            if not observed:
+                observe(500)
+            raise
+
+
+# ── Scans ─────────────────────────────────────────────────────────────────────
+
+def count_scan(outcome):
+    SCAN_OUTCOMES.labels(str(outcome)).inc()
+
+
+# ── DB pool ───────────────────────────────────────────────────────────────────
+
+class _TimedPoolMixin:
+    metrics_label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT.labels(self.metrics_label).observe(time.perf_counter() - start)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    """QueuePool that records how long each checkout waited."""
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+def timed_pool(label: str):
+    """TimedQueuePool reporting under its own label (e.g. a read replica)."""
+    return type(f"TimedQueuePool[{label}]", (TimedQueuePool,), {"metrics_label": label})
+
+
+class PoolCollector:
+    """Reads connection counts from the registered engines' pools on every scrape."""
+
+    def __init__(self):
+        self.engines = {}
+
+    def collect(self):
+        in_use = GaugeMetricFamily("act_db_pool_connections_in_use", "Connections checked out", labels=["pool"])
+        idle = GaugeMetricFamily("act_db_pool_connections_idle", "Connections idle in the pool", labels=["pool"])
+        overflow = GaugeMetricFamily(
+            "act_db_pool_overflow", "Connections beyond pool_size (negative: unopened slots)", labels=["pool"]
+        )
+        size = GaugeMetricFamily("act_db_pool_size", "Configured pool_size", labels=["pool"])
+        for label, engine in self.engines.items():
+            pool = engine.pool
+            in_use.add_metric([label], pool.checkedout())
+            idle.add_metric([label], pool.checkedin())
+            overflow.add_metric([label], pool.overflow())
+            size.add_metric([label], pool.size())
+        return [in_use, idle, overflow, size]
+
+
+_pools = PoolCollector()
+REGISTRY.register(_pools)
+
+
+def register_pool(label: str, engine):
+    _pools.engines[label] = engine
+
+
+# ── Jobs ──────────────────────────────────────────────────────────────────────
+
+def record_job(job: str, seconds: float, success: bool, result: dict = None):
+    JOB_DURATION.labels(job, str(success).lower()).observe(seconds)
+    for field, value in (result or {}).items():
+        # Counts only: skip flags and nested details
+        if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+            JOB_ROWS.labels(job, field).inc(value)
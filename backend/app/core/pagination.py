@@ -0,0 +1,74 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is the sort key of the last row on a page, encoded as opaque
+url-safe base64 JSON. The next page is `WHERE (sort_key) < (cursor)` (or `>`
+for ascending lists) with the same ORDER BY, which a matching composite index
+answers at constant cost however deep the client pages. List endpoints keep
+their response body and return the cursor for the next page in the
+X-Next-Cursor header; it is absent on the last page.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Callable, Optional, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _jsonable(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value if isinstance(value, (int, str)) else str(value)
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([_jsonable(v) for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[Callable]) -> tuple:
+    """Decode a cursor into values converted by `types` (e.g. (datetime.fromisoformat, UUID))."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if len(values) != len(types):
+            raise ValueError
+        return tuple(convert(v) for convert, v in zip(types, values))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def after_cursor(q, columns: Sequence, cursor: Optional[str], types: Sequence[Callable], descending: bool = True):
+    """Restrict and order `q` to the rows after `cursor` on `columns`."""
+    if cursor:
+        key = tuple_(*columns)
+        values = tuple_(*decode_cursor(cursor, types))
+        q = q.filter(key < values if descending else key > values)
+    return q.order_by(*(c.desc() if descending else c.asc() for c in columns))
+
+
+def page(q, limit: int, response: Response, key: Callable) -> list:
+    """Fetch one page of `limit` rows, setting X-Next-Cursor when more remain."""
+    rows = q.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
+    return rows
+
+
+def count_rows(q, mode: str, cap: int) -> tuple:
+    """Total for a list response as (total, capped).
+
+    exact  — full COUNT(*)
+    capped — counts at most `cap` rows; capped=True means "cap or more"
+    none   — skips counting (total is None)
+    """
+    if mode == "none":
+        return None, False
+    if mode == "capped":
+        n = q.limit(cap + 1).count()
+        return min(n, cap), n > cap
+    return q.count(), False
@@ -0,0 +1,188 @@
+"""
+Opt-in per-request SQL profiling with N+1 detection.
+
+With SQL_PROFILE_ENABLED, a request is profiled when it is sampled
+(SQL_PROFILE_SAMPLE_RATE) or asks for it with an `X-SQL-Profile: 1` header.
+In production the header must carry SQL_PROFILE_TOKEN instead of `1` (and is
+ignored without one configured), since the details include statement text.
+Engine cursor events (sync and async engines) add each statement to the
+profile held in a context variable, which FastAPI carries into the threadpool
+that runs sync routes. Every profiled response gets
+
+    Server-Timing: db;dur=41.3;desc="23 queries"
+
+and one that asked for it also gets the details (statement text is only sent
+to a client that requested it):
+
+    X-SQL-Profile: {"queries": 23, "db_ms": 41.3, "slowest": [...], "n_plus_one": [...]}
+
+A statement shape (the SQL text with expanded IN lists collapsed) that runs
+SQL_PROFILE_N_PLUS_ONE_THRESHOLD times or more in one request is reported as
+an N+1 suspect and logged. Requests that are not profiled pay one context
+variable lookup per statement, so sampling a few percent in production is
+cheap. Jobs and scripts can profile a block with `with profiled() as p:`.
+"""
+import hmac
+import json
+import logging
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger("act-backend.sql")
+
+SLOWEST_KEPT = 3
+SUSPECTS_KEPT = 5
+STATEMENT_PREVIEW = 200
+
+_current: ContextVar[Optional["SQLProfile"]] = ContextVar("sql_profile", default=None)
+
+# Expanded IN lists and multi-row VALUES vary in length with the data, not the code
+_PARAM_RUN = re.compile(r"(%\(\w+\)s|\$\d+|\?)(::\w+)?(\s*,\s*(%\(\w+\)s|\$\d+|\?)(::\w+)?)+")
+_VALUES_RUN = re.compile(r"(\(\s*\?\s*\))(\s*,\s*\(\s*\?\s*\))+")
+_SPACE = re.compile(r"\s+")
+
+
+def _preview(statement: str) -> str:
+    # Keep both ends: the SELECT list says what, the tail (WHERE ...) says why
+    statement = _SPACE.sub(" ", statement).strip()
+    if len(statement) <= STATEMENT_PREVIEW:
+        return statement
+    return statement[:STATEMENT_PREVIEW // 2] + " … " + statement[-STATEMENT_PREVIEW // 2:]
+
+
+def statement_shape(statement: str) -> str:
+    shape = _PARAM_RUN.sub("?", statement)
+    shape = _VALUES_RUN.sub(r"\1", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+class SQLProfile:
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.shapes = {}    # shape -> [count, seconds]
+        self.slowest = []   # (seconds, statement), longest first
+
+    def record(self, statement: str, seconds: float):
+        self.queries += 1
+        self.db_seconds += seconds
+        shape = statement_shape(statement)
+        entry = self.shapes.setdefault(shape, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        if len(self.slowest) < SLOWEST_KEPT or seconds > self.slowest[-1][0]:
+            self.slowest.append((seconds, statement))
+            self.slowest.sort(key=lambda s: s[0], reverse=True)
+            del self.slowest[SLOWEST_KEPT:]
+
+    def n_plus_one(self, threshold: int = None) -> list:
+        threshold = threshold or settings.SQL_PROFILE_N_PLUS_ONE_THRESHOLD
+        suspects = [
+            {"count": count, "ms": round(seconds * 1000, 2), "statement": _preview(shape)}
+            for shape, (count, seconds) in self.shapes.items()
+            if count >= threshold
+        ]
+        return sorted(suspects, key=lambda s: s["count"], reverse=True)
+
+    def summary(self) -> dict:
+        return {
+            "queries": self.queries,
+            "db_ms": round(self.db_seconds * 1000, 2),
+            "slowest": [
+                {"ms": round(seconds * 1000, 2), "statement": _preview(statement)}
+                for seconds, statement in self.slowest
+            ],
+            "n_plus_one": self.n_plus_one()[:SUSPECTS_KEPT],
+        }
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries"'
+
+
+@contextmanager
+def profiled():
+    """Profile the statements run inside the block (in this context)."""
+    profile = SQLProfile()
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+
+
+def log_suspects(label: str, profile: SQLProfile):
+    for suspect in profile.n_plus_one():
+        logger.warning(
+            f"{label}: N+1 suspect, {suspect['count']} runs / {suspect['ms']} ms of: {suspect['statement']}"
+        )
+
+
+# ── Engine hooks ──────────────────────────────────────────────────────────────
+
+# The start time lives on the execution context, which is dropped with the
+# statement, so one that raises (no after_cursor_execute) leaves nothing behind
+# on the pooled connection
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._sql_profile_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    start = getattr(context, "_sql_profile_start", None)
+    if profile is not None and start is not None:
+        profile.record(statement, time.perf_counter() - start)
+
+
+def instrument(engine: Engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ── Middleware ────────────────────────────────────────────────────────────────
+
+def _requested(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"x-sql-profile":
+            if settings.ENVIRONMENT == "production":
+                token = settings.SQL_PROFILE_TOKEN
+                return bool(token) and hmac.compare_digest(value, token.encode())
+            return value not in (b"0", b"false", b"")
+    return False
+
+
+class SQLProfileMiddleware:
+    """Profiles sampled or opted-in requests and reports on the response headers."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        requested = _requested(scope)
+        if not requested and random.random() >= settings.SQL_PROFILE_SAMPLE_RATE:
+            return await self.app(scope, receive, send)
+
+        with profiled() as profile:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    headers = [(b"server-timing", profile.server_timing().encode())]
+                    if requested:
+                        summary = json.dumps(profile.summary(), separators=(",", ":"))
+                        headers.append((b"x-sql-profile", summary.encode()))
+                    message["headers"] = [*message.get("headers", []), *headers]
+                    log_suspects(f"{scope['method']} {scope['path']}", profile)
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,247 @@
+"""
+Read-replica routing for GET-only reporting and dashboard endpoints.
+
+Routes that only read take `db: Session = Depends(get_read_db)`. The session
+is bound to one of DATABASE_REPLICA_URLS when one is fresh enough, else to
+the primary:
+
+- Staleness: a replica's lag is measured at most every
+  REPLICA_LAG_CHECK_SECONDS, by the request that finds the last reading
+  expired, against the primary: a replica that has replayed the primary's
+  current WAL position is current, otherwise it is as far behind as its last
+  replayed commit is old. A replica whose WAL receiver is not streaming
+  (disconnected, restarting) is unusable whatever it has replayed. Replicas
+  lagging more than REPLICA_MAX_LAG_SECONDS, or failing the check, are
+  skipped until the next one; the fresh ones take turns.
+- Read-your-writes: ReadYourWritesMiddleware stamps the response to every
+  successful write with the write time, as a cookie (sent back by browsers
+  on the same origin, e.g. behind nginx) and as an X-Last-Write header for
+  clients that echo it (the frontend's API client does). A request carrying
+  a stamp younger than READ_YOUR_WRITES_SECONDS reads from the primary, so a
+  scan shows up on the scanning client's next refresh.
+- Event-triggered reads: live events carry the primary's WAL position after
+  their commit (primary_lsn()). The frontend echoes the newest one it has
+  seen as X-Min-LSN, and a replica serves such a read only once it has
+  replayed that far; otherwise the primary does. Without this, a view
+  re-fetching on an event could hit a replica that has not replayed the
+  change yet and get a 304 for its old table versions.
+
+Replica sessions carry `info["replica"]`, which keeps what they compute apart
+in the shared cache (see cache.cached). The X-Read-Source response header
+names the database that served a read. Without replicas configured every
+session goes to the primary.
+"""
+import itertools
+import logging
+import math
+import threading
+import time
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+
+logger = logging.getLogger("act-backend.replicas")
+
+WRITE_COOKIE = "act_last_write"
+LAST_WRITE_HEADER = "X-Last-Write"
+MIN_LSN_HEADER = "X-Min-LSN"
+READ_SOURCE_HEADER = "X-Read-Source"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Insert position: past every commit record so far, asynchronous commits included
+_PRIMARY_LSN = text("SELECT pg_current_wal_insert_lsn()::text")
+_REPLAY_LSN = text("SELECT pg_last_wal_replay_lsn()::text")
+
+# Seconds behind the primary, given the primary's WAL position read just
+# before. Replayed up to it: current, even if the last replayed transaction is
+# old (idle primary). NULL (unusable) when the WAL receiver is not streaming;
+# reading its status needs pg_read_all_stats (e.g. GRANT pg_monitor).
+_REPLAY_LAG = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN (SELECT status FROM pg_stat_wal_receiver) IS DISTINCT FROM 'streaming' THEN NULL
+        WHEN pg_last_wal_replay_lsn() >= CAST(:primary_lsn AS pg_lsn) THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+
+class Replica:
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine = create_engine(
+            url,
+            poolclass=metrics.timed_pool(name),
+            pool_pre_ping=True,
+            pool_size=settings.REPLICA_POOL_SIZE,
+            max_overflow=settings.REPLICA_MAX_OVERFLOW,
+            connect_args={"connect_timeout": 2},
+        )
+        metrics.register_pool(name, self.engine)
+        self.lag: Optional[float] = None
+        self.replayed = 0   # highest WAL position seen replayed, see parse_lsn()
+        self._checked_at = -math.inf
+        self._checking = threading.Lock()
+
+    def usable(self) -> bool:
+        # One request re-measures an expired reading; concurrent ones use the last value
+        if time.monotonic() - self._checked_at >= settings.REPLICA_LAG_CHECK_SECONDS \
+                and self._checking.acquire(blocking=False):
+            try:
+                self._check()
+            finally:
+                self._checking.release()
+        return self.lag is not None and self.lag <= settings.REPLICA_MAX_LAG_SECONDS
+
+    def _check(self):
+        try:
+            with engine.connect() as conn:
+                primary_lsn = conn.execute(_PRIMARY_LSN).scalar()
+            with self.engine.connect() as conn:
+                lag = conn.execute(_REPLAY_LAG, {"primary_lsn": primary_lsn}).scalar()
+                self._saw_replayed(conn.execute(_REPLAY_LSN).scalar())
+            if lag is None and self.lag is not None:
+                logger.warning(f"{self.name} WAL receiver not streaming, reading from the primary")
+        except SQLAlchemyError as e:
+            if self.lag is not None:
+                logger.warning(f"{self.name} unavailable, reading from the primary: {e}")
+            lag = None
+        self.lag = float(lag) if lag is not None else None
+        self._checked_at = time.monotonic()
+
+    def _saw_replayed(self, lsn: Optional[str]):
+        position = parse_lsn(lsn)
+        if position is not None and position > self.replayed:
+            self.replayed = position
+
+    def has_replayed(self, db: Session, position: int) -> bool:
+        """Whether this replica has replayed the WAL up to `position`; asks it only
+        when the last known replay position is not far enough."""
+        if self.replayed < position:
+            try:
+                self._saw_replayed(self._replay_lsn(db))
+            except SQLAlchemyError:
+                return False
+        return self.replayed >= position
+
+    def _replay_lsn(self, db: Session) -> Optional[str]:
+        return db.execute(_REPLAY_LSN).scalar()
+
+
+class ReplicaSet:
+    def __init__(self, urls):
+        self.replicas = [Replica(f"replica-{i}", url) for i, url in enumerate(urls, 1)]
+        self._turn = itertools.count()
+
+    def pick(self) -> Optional[Replica]:
+        """Next fresh replica in turn, or None to use the primary."""
+        if not self.replicas:
+            return None
+        start = next(self._turn)
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(start + i) % len(self.replicas)]
+            if replica.usable():
+                return replica
+        return None
+
+    def status(self) -> list:
+        return [{"name": r.name, "lag_seconds": r.lag} for r in self.replicas]
+
+
+replicas = ReplicaSet([url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()])
+
+
+def parse_lsn(lsn: Optional[str]) -> Optional[int]:
+    """'16/B374D848' -> comparable int; None for anything else."""
+    try:
+        high, low = lsn.split("/")
+        return (int(high, 16) << 32) | int(low, 16)
+    except (AttributeError, ValueError):
+        return None
+
+
+def primary_lsn() -> Optional[str]:
+    """The primary's current WAL position (covers everything committed so far);
+    None without replicas, which is the only time it is needed."""
+    if not replicas.replicas:
+        return None
+    try:
+        with engine.connect() as conn:
+            return conn.execute(_PRIMARY_LSN).scalar()
+    except SQLAlchemyError as e:
+        logger.warning(f"Could not read the primary WAL position: {e}")
+        return None
+
+
+def wrote_recently(request: Request) -> bool:
+    for stamp in (request.headers.get(LAST_WRITE_HEADER), request.cookies.get(WRITE_COOKIE)):
+        try:
+            if time.time() - float(stamp) < settings.READ_YOUR_WRITES_SECONDS:
+                return True
+        except (TypeError, ValueError):
+            pass
+    return False
+
+
+def open_read_session(request: Request, primary: sessionmaker = SessionLocal) -> Session:
+    """New session on a fresh replica, or from `primary` after the client's own write
+    or when no fresh replica has replayed the client's X-Min-LSN.
+    For routes that outlive their dependencies (streamed responses); the caller closes it."""
+    replica = None if wrote_recently(request) else replicas.pick()
+    if replica is None:
+        return primary()
+    db = SessionLocal(bind=replica.engine)
+    min_lsn = parse_lsn(request.headers.get(MIN_LSN_HEADER))
+    if min_lsn is not None and not replica.has_replayed(db, min_lsn):
+        db.close()
+        return primary()
+    db.info["replica"] = replica.name
+    return db
+
+
+def read_source(db: Session) -> str:
+    return db.info.get("replica", "primary")
+
+
+def get_read_db(request: Request, response: Response):
+    """Session for a read-only route: a fresh replica, or the primary (see open_read_session)."""
+    db = open_read_session(request)
+    response.headers[READ_SOURCE_HEADER] = read_source(db)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class ReadYourWritesMiddleware:
+    """Stamps successful non-GET responses with the last-write cookie and header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                stamp = f"{time.time():.3f}"
+                cookie = (
+                    f"{WRITE_COOKIE}={stamp}; Max-Age={math.ceil(settings.READ_YOUR_WRITES_SECONDS)}; "
+                    "Path=/; SameSite=Lax; HttpOnly"
+                )
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"set-cookie", cookie.encode()),
+                    (LAST_WRITE_HEADER.lower().encode(), stamp.encode()),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,39 @@
+"""
+orjson-based JSON responses for hot read endpoints.
+
+Returning a plain dict or list from a route makes FastAPI walk the whole
+payload through jsonable_encoder before the response class serializes it.
+Routes that build lean, already JSON-shaped rows return json_response()
+instead: the content goes straight to orjson (datetimes, UUIDs and enums are
+native there), and a body that is already encoded, e.g. a cache hit, is sent
+as is.
+"""
+from decimal import Decimal
+from typing import Any, Optional
+
+import orjson
+from fastapi import Response
+from fastapi.responses import ORJSONResponse as _ORJSONResponse
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+
+class ORJSONResponse(_ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
+def json_response(content: Any, response: Optional[Response] = None) -> ORJSONResponse:
+    """Response for `content`, keeping headers a route set on its injected `response`
+    (X-Next-Cursor, ETag), which FastAPI drops when a route returns a Response itself."""
+    return ORJSONResponse(content, headers=dict(response.headers) if response is not None else None)
@@ -185,6 +185,7 @@ class KitMember(Base):
 
 
 class CustodyRecord(Base):
+    """Partitioned by month on checked_out_at; the DB primary key is (id, checked_out_at)."""
     __tablename__ = "custody_records"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -255,7 +256,7 @@ class Alert(Base):
     status = Column(SAEnum(AlertStatus, name="alert_status"), nullable=False, default=AlertStatus.OPEN)
     asset_id = Column(UUID(as_uuid=True), ForeignKey("assets.id"))
     kit_id = Column(UUID(as_uuid=True), ForeignKey("asset_kits.id"))
-    custody_record_id = Column(UUID(as_uuid=True), ForeignKey("custody_records.id"))
+    custody_record_id = Column(UUID(as_uuid=True))    # custody_records.id (no FK: partitioned table)
     worker_id = Column(UUID(as_uuid=True), ForeignKey("workers.id"))
     title = Column(String(300), nullable=False)
     message = Column(Text, nullable=False)
@@ -266,6 +267,9 @@ class Alert(Base):
     resolution_note = Column(Text)
     notified_at = Column(DateTime(timezone=True))
     notification_channels = Column(ARRAY(String))
+    notify_attempts = Column(Integer, nullable=False, default=0)
+    notify_next_at = Column(DateTime(timezone=True))
+    notify_error = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -273,6 +277,7 @@ class Alert(Base):
 
 
 class AuditLog(Base):
+    """Partitioned by month on created_at; the DB primary key is (id, created_at)."""
     __tablename__ = "audit_log"
 
     id = Column(BigInteger, primary_key=True, autoincrement=True)
@@ -286,3 +291,74 @@ class AuditLog(Base):
     ip_address = Column(String(45))
     notes = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class RulesJobState(Base):
+    """Per-job watermark for incremental rules-engine runs."""
+    __tablename__ = "rules_job_state"
+
+    job_name = Column(String(50), primary_key=True)
+    last_run_at = Column(DateTime(timezone=True))
+    rules_fingerprint = Column(String(32))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class RulesJobRun(Base):
+    """One run of a scheduled background job."""
+    __tablename__ = "rules_job_runs"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    job_name = Column(String(50), nullable=False)
+    runner = Column(String(100), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=False)
+    success = Column(Boolean, nullable=False)
+    result = Column(JSONB)
+    error = Column(Text)
+
+
+class DashboardCounter(Base):
+    """Rolled-up dashboard count; the current value adds its DashboardCounterDelta rows."""
+    __tablename__ = "dashboard_counters"
+
+    counter = Column(String(100), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+
+class DashboardCounterDelta(Base):
+    """Change to a dashboard count appended by DB triggers, folded in by the counter rollup job."""
+    __tablename__ = "dashboard_counter_deltas"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    counter = Column(String(100), nullable=False)
+    delta = Column(BigInteger, nullable=False)
+
+
+class TableVersion(Base):
+    """Rolled-up change counter per table; the current version adds its TableChange rows."""
+    __tablename__ = "table_versions"
+
+    table_name = Column(String(63), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    changed_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class TableChange(Base):
+    """One writing transaction on a tracked table, appended by DB triggers, folded in by the counter rollup job."""
+    __tablename__ = "table_changes"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    table_name = Column(String(63), nullable=False)
+    txid = Column(BigInteger, nullable=False)
+    changed_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class ScanRequest(Base):
+    """Idempotency record for a client-generated scan id."""
+    __tablename__ = "scan_requests"
+
+    scan_id = Column(UUID(as_uuid=True), primary_key=True)
+    action = Column(SAEnum(CustodyEventType, name="custody_event_type"), nullable=False)
+    record_id = Column(UUID(as_uuid=True), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,14 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeout
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, or_
+from sqlalchemy import Float, Numeric, cast, func, or_, select, literal, union_all
+import io
 from typing import List, Optional
 from datetime import datetime, timezone, timedelta
 from uuid import UUID
 
-from app.core.database import get_db
+from app.core import cache, conditional, events
+from app.core.config import settings
+from app.core.responses import json_response
+from app.core.pagination import after_cursor, page, count_rows, NEXT_CURSOR_HEADER
+from app.core.database import ExportSessionLocal, get_db
+from app.core.replicas import READ_SOURCE_HEADER, get_read_db, open_read_session, read_source
 from app.models.models import (
     Asset, AssetKit, Worker, AssetCategory, CustodyRecord,
-    CalibrationRecord, Alert, AlertRule, AuditLog,
+    CalibrationRecord, Alert, AlertRule, AuditLog, DashboardCounter, DashboardCounterDelta, RulesJobRun,
     AssetState, AlertStatus, AlertSeverity, CalibrationStatus
 )
 from app.schemas.schemas import (
@@ -16,9 +24,11 @@ from app.schemas.schemas import (
     KitOut, WorkerOut, WorkerCreate, WorkerUpdate,
     CustodyRecordOut, CheckoutRequest, ReturnRequest, OverrideCheckoutRequest,
     ActiveCustodyOut, AlertOut, AlertAcknowledge, AlertResolve,
-    CalibrationUpdate, CalibrationRecordOut, CategoryOut, DashboardSummary, ScanEvent
+    AlertRuleCreate, AlertRuleUpdate, AlertRuleOut,
+    CalibrationUpdate, CalibrationRecordOut, CategoryOut, DashboardSummary, ScanEvent, ScanBatch
 )
-from app.services import custody_service
+from app.services import bulk_import, custody_service, export, partitions, qr_cache
+from app.services.alert_rules import validate_conditions
 from app.services.rules_engine import run_overdue_check, run_calibration_check
 
 router = APIRouter()
@@ -29,88 +39,106 @@ router = APIRouter()
 # ══════════════════════════════════════════════════════════════════════════════
 
 @router.get("/dashboard/summary", response_model=DashboardSummary, tags=["Dashboard"])
-def get_dashboard_summary(db: Session = Depends(get_db)):
+def get_dashboard_summary(request: Request, response: Response, db: Session = Depends(get_read_db)):
     """Live summary counts for the dashboard header."""
+    # Daily bucket: active_workers_today restarts at UTC midnight
+    unchanged = conditional.not_modified(
+        request, response, db, ("assets", "asset_kits", "alerts", "custody_records"), bucket_seconds=86400,
+    )
+    if unchanged:
+        return unchanged
+    return cache.cached(
+        "dashboard.summary", ("assets", "asset_kits", "alerts", "custody_records"), 60,
+        lambda: _dashboard_summary(db), db=db,
+    )
 
-    def count_state(state):
-        return db.query(func.count(Asset.id)).filter(Asset.state == state, Asset.is_active == True).scalar()
-
-    total_assets = db.query(func.count(Asset.id)).filter(Asset.is_active == True).scalar()
-    total_kits = db.query(func.count(AssetKit.id)).scalar()
-    kits_in_custody = db.query(func.count(AssetKit.id)).filter(
-        AssetKit.state.in_([AssetState.IN_CUSTODY, AssetState.OVERRIDE_CUSTODY, AssetState.OVERDUE])
-    ).scalar()
-    open_alerts = db.query(func.count(Alert.id)).filter(Alert.status == AlertStatus.OPEN).scalar()
-    critical_alerts = db.query(func.count(Alert.id)).filter(
-        Alert.status == AlertStatus.OPEN,
-        Alert.severity == AlertSeverity.CRITICAL
-    ).scalar()
-    cal_overdue = db.query(func.count(Asset.id)).filter(
-        Asset.calibration_status == CalibrationStatus.OVERDUE,
-        Asset.is_active == True
-    ).scalar()
-    cal_due_soon = db.query(func.count(Asset.id)).filter(
-        Asset.calibration_status == CalibrationStatus.DUE_SOON,
-        Asset.is_active == True
-    ).scalar()
 
+def _dashboard_summary(db: Session) -> DashboardSummary:
+    """Asset, kit and alert counts come from the trigger-maintained
+    `dashboard_counters` table plus its not yet rolled-up deltas, so the whole
+    summary is one round trip."""
     today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-    active_today = db.query(func.count(func.distinct(CustodyRecord.worker_id))).filter(
-        CustodyRecord.checked_out_at >= today_start
-    ).scalar()
+    active_today = select(
+        literal("workers.active_today"),
+        func.count(func.distinct(CustodyRecord.worker_id)),
+    ).where(CustodyRecord.checked_out_at >= today_start)
+    counters = {}
+    for key, value in db.execute(union_all(
+        select(DashboardCounter.counter, DashboardCounter.value),
+        select(DashboardCounterDelta.counter, DashboardCounterDelta.delta),
+        active_today,
+    )):
+        counters[key] = counters.get(key, 0) + value
+
+    def count(key):
+        return counters.get(key, 0)
 
     return DashboardSummary(
-        total_assets=total_assets,
-        available=count_state(AssetState.AVAILABLE),
-        in_custody=count_state(AssetState.IN_CUSTODY) + count_state(AssetState.OVERRIDE_CUSTODY),
-        overdue=count_state(AssetState.OVERDUE),
-        suspended=count_state(AssetState.SUSPENDED),
-        withdrawn=count_state(AssetState.WITHDRAWN),
-        total_kits=total_kits,
-        kits_in_custody=kits_in_custody,
-        open_alerts=open_alerts,
-        critical_alerts=critical_alerts,
-        calibration_overdue=cal_overdue,
-        calibration_due_soon=cal_due_soon,
-        active_workers_today=active_today,
+        total_assets=count("assets.total"),
+        available=count("assets.state.AVAILABLE"),
+        in_custody=count("assets.state.IN_CUSTODY") + count("assets.state.OVERRIDE_CUSTODY"),
+        overdue=count("assets.state.OVERDUE"),
+        suspended=count("assets.state.SUSPENDED"),
+        withdrawn=count("assets.state.WITHDRAWN"),
+        total_kits=count("kits.total"),
+        kits_in_custody=(
+            count("kits.state.IN_CUSTODY") + count("kits.state.OVERRIDE_CUSTODY") + count("kits.state.OVERDUE")
+        ),
+        open_alerts=count("alerts.status.OPEN"),
+        critical_alerts=count("alerts.status.OPEN.CRITICAL"),
+        calibration_overdue=count("assets.calibration.OVERDUE"),
+        calibration_due_soon=count("assets.calibration.DUE_SOON"),
+        active_workers_today=count("workers.active_today"),
     )
 
 
 @router.get("/dashboard/active-custody", tags=["Dashboard"])
-def get_active_custody(db: Session = Depends(get_db)):
+def get_active_custody(request: Request, response: Response, db: Session = Depends(get_read_db)):
     """All currently checked-out items."""
-    records = db.query(CustodyRecord).options(
-        joinedload(CustodyRecord.worker),
-        joinedload(CustodyRecord.asset),
-        joinedload(CustodyRecord.kit),
-    ).filter(CustodyRecord.returned_at == None).order_by(CustodyRecord.checked_out_at.desc()).all()
+    # Short TTL and ETag bucket: hours_elapsed keeps moving even when nothing is written
+    unchanged = conditional.not_modified(
+        request, response, db, ("custody_records", "assets", "asset_kits", "workers"), bucket_seconds=30,
+    )
+    if unchanged:
+        return unchanged
+    return json_response(cache.cached_json(
+        "dashboard.active_custody", ("custody_records", "assets", "asset_kits", "workers"), 30,
+        lambda: _active_custody(db), db=db,
+    ), response)
+
+
+# Custody rows as flat columns: item code / name coalesced from asset or kit in SQL
+_ITEM_CODE = func.coalesce(Asset.asset_code, AssetKit.kit_code)
+_ITEM_NAME = func.coalesce(Asset.name, AssetKit.name)
+_OVERDUE_HOURS = cast(func.nullif(CustodyRecord.overdue_hours, 0), Float).label("overdue_hours")
+
+
+def _custody_rows(q):
+    return q.outerjoin(Worker, Worker.id == CustodyRecord.worker_id) \
+        .outerjoin(Asset, Asset.id == CustodyRecord.asset_id) \
+        .outerjoin(AssetKit, AssetKit.id == CustodyRecord.kit_id)
+
 
+def _active_custody(db: Session) -> list:
     now = datetime.now(timezone.utc)
-    result = []
-    for r in records:
-        checked_out = r.checked_out_at
-        if checked_out.tzinfo is None:
-            checked_out = checked_out.replace(tzinfo=timezone.utc)
-        hours_elapsed = round((now - checked_out).total_seconds() / 3600, 2)
-
-        item = r.asset or r.kit
-        item_name = item.name if item else "Unknown"
-        item_code = getattr(item, 'asset_code', getattr(item, 'kit_code', '?')) if item else '?'
-
-        result.append({
-            "id": str(r.id),
-            "worker_name": r.worker.full_name if r.worker else "Unknown",
-            "worker_employee_id": r.worker.employee_id if r.worker else "?",
-            "asset_name": item_name,
-            "asset_code": item_code,
-            "is_kit": r.kit_id is not None,
-            "checked_out_at": r.checked_out_at,
-            "expected_return_at": r.expected_return_at,
-            "is_overdue": r.is_overdue,
-            "overdue_hours": float(r.overdue_hours) if r.overdue_hours else None,
-            "hours_elapsed": hours_elapsed,
-        })
-    return result
+    hours_elapsed = func.round(
+        cast(func.extract("epoch", literal(now) - CustodyRecord.checked_out_at) / 3600, Numeric), 2
+    )
+    q = _custody_rows(db.query(
+        CustodyRecord.id,
+        func.coalesce(Worker.full_name, "Unknown").label("worker_name"),
+        func.coalesce(Worker.employee_id, "?").label("worker_employee_id"),
+        func.coalesce(_ITEM_NAME, "Unknown").label("asset_name"),
+        func.coalesce(_ITEM_CODE, "?").label("asset_code"),
+        CustodyRecord.kit_id.isnot(None).label("is_kit"),
+        CustodyRecord.checked_out_at,
+        CustodyRecord.expected_return_at,
+        CustodyRecord.is_overdue,
+        _OVERDUE_HOURS,
+        cast(hours_elapsed, Float).label("hours_elapsed"),
+    ))
+    rows = q.filter(CustodyRecord.returned_at == None).order_by(CustodyRecord.checked_out_at.desc())
+    return [row._asdict() for row in rows]
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -121,7 +149,7 @@ def get_active_custody(db: Session = Depends(get_db)):
 def checkout(req: CheckoutRequest, db: Session = Depends(get_db)):
     """Check out a tool or kit. Scan worker QR + asset QR."""
     record = custody_service.checkout(
-        db, req.worker_qr, req.asset_qr, req.edge_node_id or "EDGE-001", req.notes
+        db, req.worker_qr, req.asset_qr, req.edge_node_id or "EDGE-001", req.notes, scan_id=req.scan_id
     )
     item = record.asset or record.kit
     return {
@@ -137,7 +165,7 @@ def checkout(req: CheckoutRequest, db: Session = Depends(get_db)):
 def return_item(req: ReturnRequest, db: Session = Depends(get_db)):
     """Return a tool or kit."""
     record = custody_service.return_item(
-        db, req.worker_qr, req.asset_qr, req.edge_node_id or "EDGE-001", req.notes
+        db, req.worker_qr, req.asset_qr, req.edge_node_id or "EDGE-001", req.notes, scan_id=req.scan_id
     )
     return {
         "success": True,
@@ -151,7 +179,8 @@ def return_item(req: ReturnRequest, db: Session = Depends(get_db)):
 def override_checkout(req: OverrideCheckoutRequest, db: Session = Depends(get_db)):
     """Override checkout for suspended asset (requires supervisor scan)."""
     record = custody_service.override_checkout(
-        db, req.worker_qr, req.asset_qr, req.supervisor_qr, req.reason, req.edge_node_id or "EDGE-001"
+        db, req.worker_qr, req.asset_qr, req.supervisor_qr, req.reason, req.edge_node_id or "EDGE-001",
+        scan_id=req.scan_id,
     )
     return {"success": True, "message": "Override checkout recorded", "record_id": str(record.id)}
 
@@ -159,83 +188,211 @@ def override_checkout(req: OverrideCheckoutRequest, db: Session = Depends(get_db
 @router.post("/custody/scan", tags=["Custody"])
 def scan_event(event: ScanEvent, db: Session = Depends(get_db)):
     """Universal scan endpoint — auto-detects checkout vs return based on asset state."""
-    item, is_kit = custody_service.resolve_asset_or_kit(db, event.asset_qr)
+    action, record = custody_service.scan(
+        db, event.worker_qr, event.asset_qr, event.event_type, event.edge_node_id, event.notes,
+        scan_id=event.scan_id,
+    )
+    return {"action": action, "record_id": str(record.id)}
 
-    if event.event_type.upper() == "RETURN" or item.state in (
-        AssetState.IN_CUSTODY, AssetState.OVERRIDE_CUSTODY, AssetState.OVERDUE
-    ):
-        record = custody_service.return_item(db, event.worker_qr, event.asset_qr, event.edge_node_id, event.notes)
-        return {"action": "RETURN", "record_id": str(record.id)}
-    else:
-        record = custody_service.checkout(db, event.worker_qr, event.asset_qr, event.edge_node_id, event.notes)
-        return {"action": "CHECKOUT", "record_id": str(record.id)}
+
+@router.post("/custody/scan/batch", tags=["Custody"])
+def scan_batch(batch: ScanBatch, db: Session = Depends(get_db)):
+    """Apply many buffered scans in capture order — one result per event, in request order."""
+    results = custody_service.scan_batch(db, batch.events)
+    applied = sum(1 for r in results if r["success"])
+    return {"applied": applied, "rejected": len(results) - applied, "results": results}
 
 
 @router.get("/custody/history", tags=["Custody"])
 def get_custody_history(
+    response: Response,
     asset_id: Optional[UUID] = None,
     worker_id: Optional[UUID] = None,
     limit: int = Query(50, le=200),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
-    """Full custody history with optional filters."""
-    q = db.query(CustodyRecord).options(
-        joinedload(CustodyRecord.worker),
-        joinedload(CustodyRecord.asset),
-        joinedload(CustodyRecord.kit),
-    )
+    """Full custody history with optional filters, newest first. Page with the X-Next-Cursor header."""
+    q = _custody_rows(db.query(
+        CustodyRecord.id,
+        CustodyRecord.event_type,
+        Worker.full_name.label("worker"),
+        _ITEM_CODE.label("asset"),
+        _ITEM_NAME.label("asset_name"),
+        CustodyRecord.checked_out_at,
+        CustodyRecord.returned_at,
+        CustodyRecord.is_overdue,
+        _OVERDUE_HOURS,
+    ))
     if asset_id:
         q = q.filter(CustodyRecord.asset_id == asset_id)
     if worker_id:
         q = q.filter(CustodyRecord.worker_id == worker_id)
-    records = q.order_by(CustodyRecord.checked_out_at.desc()).limit(limit).all()
-
-    result = []
-    for r in records:
-        item = r.asset or r.kit
-        result.append({
-            "id": str(r.id),
-            "event_type": r.event_type,
-            "worker": r.worker.full_name if r.worker else None,
-            "asset": getattr(item, 'asset_code', getattr(item, 'kit_code', None)) if item else None,
-            "asset_name": item.name if item else None,
-            "checked_out_at": r.checked_out_at,
-            "returned_at": r.returned_at,
-            "is_overdue": r.is_overdue,
-            "overdue_hours": float(r.overdue_hours) if r.overdue_hours else None,
-        })
-    return result
+    q = after_cursor(q, (CustodyRecord.checked_out_at, CustodyRecord.id), cursor, (datetime.fromisoformat, UUID))
+    records = page(q, limit, response, lambda r: (r.checked_out_at, r.id))
+    return json_response([r._asdict() for r in records], response)
+
+
+@router.get("/custody/history/export", tags=["Custody"])
+def export_custody_history(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    asset_id: Optional[UUID] = None,
+    kit_id: Optional[UUID] = None,
+    worker_id: Optional[UUID] = None,
+):
+    """Every custody record in [since, until), oldest first, streamed as CSV or NDJSON (optionally gzipped).
+
+    With archiving on, archived months are only in the archive files: a range
+    from `since` that overlaps one is refused, and an export without `since`
+    has only what is still live (X-Archived-Before: every month before it is
+    archived, and X-Archived-Months lists archived months after it).
+    """
+    query = export.custody_query(since, until, asset_id, kit_id, worker_id)
+    return _export_response(request, query, "custody-history", format, gzip, "custody_records", since, until)
+
+
+ARCHIVED_BEFORE_HEADER = "X-Archived-Before"
+ARCHIVED_MONTHS_HEADER = "X-Archived-Months"
+
+
+def _utc(dt: Optional[datetime]) -> Optional[datetime]:
+    return dt if dt is None or dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _export_response(request: Request, query, name: str, fmt: str, gzip: bool, table: str,
+                     since: Optional[datetime], until: Optional[datetime]) -> StreamingResponse:
+    headers = {
+        "Content-Disposition": f'attachment; filename="{export.filename(name, fmt, gzip)}"',
+        "Cache-Control": "no-store",
+        "X-Accel-Buffering": "no",
+    }
+    # export.stream() outlives the route's dependencies, so it gets a session of
+    # its own to close; on the primary one from the capped export pool
+    db = open_read_session(request, primary=ExportSessionLocal)
+    try:
+        archived = partitions.archived_months(db, table)
+        if archived:
+            month = since and partitions.first_archived(archived, _utc(since), _utc(until))
+            if month:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Records of {month:%Y-%m} are archived and not in the live tables; "
+                           f"export the months around it, archived months are in the monthly archive files.",
+                )
+            before, gaps = archived
+            headers[ARCHIVED_BEFORE_HEADER] = before.isoformat()
+            if gaps:
+                headers[ARCHIVED_MONTHS_HEADER] = ",".join(f"{m:%Y-%m}" for m in gaps)
+        # Checked out before responding, so a full export pool is a 503 instead
+        # of a body that never starts
+        db.connection()
+    except PoolTimeout:
+        db.close()
+        raise HTTPException(status_code=503, detail="Too many exports running. Please retry shortly.")
+    except Exception:
+        db.close()
+        raise
+    headers[READ_SOURCE_HEADER] = read_source(db)
+    return StreamingResponse(
+        export.stream(db, query, fmt, gzip),
+        media_type="application/gzip" if gzip else export.MEDIA_TYPES[fmt],
+        headers=headers,
+    )
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # ASSETS
 # ══════════════════════════════════════════════════════════════════════════════
 
+# Upper bound for count=capped; the UI shows "1000+" beyond it
+ASSET_COUNT_CAP = 1000
+
+# AssetOut as plain columns (its category flattened to category_*), assembled
+# into dicts without an ORM object or model_validate per row
+_ASSET_OUT_FIELDS = [f for f in AssetOut.model_fields if f != "category"]
+_CATEGORY_OUT_FIELDS = list(CategoryOut.model_fields)
+
+
+def _asset_out_rows(q):
+    """Switch an Asset query to the AssetOut columns; filters and ordering are kept."""
+    return q.join(AssetCategory, AssetCategory.id == Asset.category_id).with_entities(
+        *(getattr(Asset, f) for f in _ASSET_OUT_FIELDS),
+        *(getattr(AssetCategory, f).label(f"category_{f}") for f in _CATEGORY_OUT_FIELDS),
+    )
+
+
+def _asset_out_dicts(rows) -> list:
+    n = len(_ASSET_OUT_FIELDS)
+    items = []
+    for row in rows:
+        item = dict(zip(_ASSET_OUT_FIELDS, row[:n]))
+        item["category"] = dict(zip(_CATEGORY_OUT_FIELDS, row[n:]))
+        items.append(item)
+    return items
+
+
 @router.get("/assets", tags=["Assets"])
 def list_assets(
+    request: Request,
+    response: Response,
     state: Optional[str] = None,
     category_code: Optional[str] = None,
     search: Optional[str] = None,
     limit: int = Query(100, le=500),
     offset: int = 0,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    count: str = Query("exact", pattern="^(exact|capped|none)$"),
+    db: Session = Depends(get_read_db)
 ):
-    q = db.query(Asset).options(joinedload(Asset.category)).filter(Asset.is_active == True)
+    """Assets by asset_code. Pass `next_cursor` back as `cursor` to page; `offset` is kept for old clients.
+
+    With `search`, matches on name / asset_code / serial_number (trigram-indexed)
+    are ranked by relevance instead and paged with `offset`. `count` picks how
+    `total` is computed: exact, capped at ASSET_COUNT_CAP, or none.
+    """
+    unchanged = conditional.not_modified(request, response, db, ("assets", "asset_categories"))
+    if unchanged:
+        return unchanged
+    q = db.query(Asset).filter(Asset.is_active == True)
     if state:
         q = q.filter(Asset.state == state)
     if category_code:
         cat = db.query(AssetCategory).filter(AssetCategory.code == category_code).first()
         if cat:
             q = q.filter(Asset.category_id == cat.id)
+    search = (search or "").strip()
     if search:
+        # ILIKE '%term%' is answered by the gin_trgm_ops indexes (BitmapOr)
         q = q.filter(or_(
             Asset.name.ilike(f"%{search}%"),
             Asset.asset_code.ilike(f"%{search}%"),
             Asset.serial_number.ilike(f"%{search}%"),
         ))
-    total = q.count()
-    assets = q.order_by(Asset.asset_code).offset(offset).limit(limit).all()
-    return {"total": total, "items": [AssetOut.model_validate(a) for a in assets]}
+    total, total_capped = count_rows(q, count, ASSET_COUNT_CAP)
+    q = _asset_out_rows(q)
+
+    if search:
+        rank = func.greatest(
+            func.word_similarity(search, Asset.name),
+            func.word_similarity(search, Asset.asset_code),
+            func.word_similarity(search, func.coalesce(Asset.serial_number, "")),
+        )
+        assets = q.order_by(rank.desc(), Asset.asset_code).offset(offset).limit(limit).all()
+    else:
+        q = after_cursor(q, (Asset.asset_code,), cursor, (str,), descending=False)
+        if offset and not cursor:
+            q = q.offset(offset)
+        assets = page(q, limit, response, lambda a: (a.asset_code,))
+    return json_response({
+        "total": total,
+        "total_capped": total_capped,
+        "items": _asset_out_dicts(assets),
+        "next_cursor": response.headers.get(NEXT_CURSOR_HEADER),
+    }, response)
 
 
 @router.get("/assets/{asset_id}", response_model=AssetOut, tags=["Assets"])
@@ -264,9 +421,17 @@ def create_asset(asset: AssetCreate, db: Session = Depends(get_db)):
     db.add(db_asset)
     db.commit()
     db.refresh(db_asset)
+    qr_cache.invalidate_item(db_asset.qr_code)
     return db_asset
 
 
+@router.post("/assets/import", tags=["Assets"])
+def import_assets(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """Bulk create/update assets from CSV (upsert on asset_code). Columns as AssetCreate;
+    category_code may replace category_id. Returns counts and per-row errors."""
+    return bulk_import.import_csv(db, "assets", io.TextIOWrapper(file.file, encoding="utf-8-sig", newline=""))
+
+
 @router.patch("/assets/{asset_id}", response_model=AssetOut, tags=["Assets"])
 def update_asset(asset_id: UUID, update: AssetUpdate, db: Session = Depends(get_db)):
     asset = db.query(Asset).filter(Asset.id == asset_id).first()
@@ -277,6 +442,7 @@ def update_asset(asset_id: UUID, update: AssetUpdate, db: Session = Depends(get_
     asset.updated_at = datetime.now(timezone.utc)
     db.commit()
     db.refresh(asset)
+    qr_cache.invalidate_item(asset.qr_code)
     return asset
 
 
@@ -285,9 +451,15 @@ def update_asset(asset_id: UUID, update: AssetUpdate, db: Session = Depends(get_
 # ══════════════════════════════════════════════════════════════════════════════
 
 @router.get("/kits", tags=["Kits"])
-def list_kits(db: Session = Depends(get_db)):
-    kits = db.query(AssetKit).options(joinedload(AssetKit.category)).all()
-    return [KitOut.model_validate(k) for k in kits]
+def list_kits(request: Request, response: Response, db: Session = Depends(get_read_db)):
+    unchanged = conditional.not_modified(request, response, db, ("asset_kits", "asset_categories"))
+    if unchanged:
+        return unchanged
+
+    def compute():
+        kits = db.query(AssetKit).options(joinedload(AssetKit.category)).all()
+        return [KitOut.model_validate(k) for k in kits]
+    return cache.cached("kits", ("asset_kits", "asset_categories"), 300, compute, db=db)
 
 
 @router.get("/kits/{kit_id}", response_model=KitOut, tags=["Kits"])
@@ -303,7 +475,10 @@ def get_kit(kit_id: UUID, db: Session = Depends(get_db)):
 # ══════════════════════════════════════════════════════════════════════════════
 
 @router.get("/workers", response_model=List[WorkerOut], tags=["Workers"])
-def list_workers(active_only: bool = True, db: Session = Depends(get_db)):
+def list_workers(request: Request, response: Response, active_only: bool = True, db: Session = Depends(get_read_db)):
+    unchanged = conditional.not_modified(request, response, db, ("workers",))
+    if unchanged:
+        return unchanged
     q = db.query(Worker)
     if active_only:
         q = q.filter(Worker.is_active == True)
@@ -332,9 +507,17 @@ def create_worker(worker: WorkerCreate, db: Session = Depends(get_db)):
     db.add(db_worker)
     db.commit()
     db.refresh(db_worker)
+    qr_cache.invalidate_worker(db_worker.qr_code)
     return db_worker
 
 
+@router.post("/workers/import", tags=["Workers"])
+def import_workers(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """Bulk create/update workers from CSV (upsert on qr_code). Columns as WorkerCreate.
+    Returns counts and per-row errors."""
+    return bulk_import.import_csv(db, "workers", io.TextIOWrapper(file.file, encoding="utf-8-sig", newline=""))
+
+
 @router.patch("/workers/{worker_id}", response_model=WorkerOut, tags=["Workers"])
 def update_worker(worker_id: UUID, update: WorkerUpdate, db: Session = Depends(get_db)):
     worker = db.query(Worker).filter(Worker.id == worker_id).first()
@@ -345,6 +528,7 @@ def update_worker(worker_id: UUID, update: WorkerUpdate, db: Session = Depends(g
     worker.updated_at = datetime.now(timezone.utc)
     db.commit()
     db.refresh(worker)
+    qr_cache.invalidate_worker(worker.qr_code)
     return worker
 
 
@@ -354,17 +538,25 @@ def update_worker(worker_id: UUID, update: WorkerUpdate, db: Session = Depends(g
 
 @router.get("/alerts", tags=["Alerts"])
 def list_alerts(
+    request: Request,
+    response: Response,
     status: Optional[str] = "OPEN",
     severity: Optional[str] = None,
     limit: int = Query(50, le=200),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
+    """Alerts, newest first. Page with the X-Next-Cursor header."""
+    unchanged = conditional.not_modified(request, response, db, ("alerts",))
+    if unchanged:
+        return unchanged
     q = db.query(Alert)
     if status:
         q = q.filter(Alert.status == status)
     if severity:
         q = q.filter(Alert.severity == severity)
-    alerts = q.order_by(Alert.created_at.desc()).limit(limit).all()
+    q = after_cursor(q, (Alert.created_at, Alert.id), cursor, (datetime.fromisoformat, UUID))
+    alerts = page(q, limit, response, lambda a: (a.created_at, a.id))
     return [AlertOut.model_validate(a) for a in alerts]
 
 
@@ -376,6 +568,7 @@ def acknowledge_alert(alert_id: UUID, body: AlertAcknowledge, db: Session = Depe
     alert.status = AlertStatus.ACKNOWLEDGED
     alert.acknowledged_by = body.worker_id
     alert.acknowledged_at = datetime.now(timezone.utc)
+    events.emit(db, "alert", action="ACKNOWLEDGED", alert_id=alert.id)
     db.commit()
     return {"success": True}
 
@@ -389,10 +582,60 @@ def resolve_alert(alert_id: UUID, body: AlertResolve, db: Session = Depends(get_
     alert.resolved_by = body.worker_id
     alert.resolved_at = datetime.now(timezone.utc)
     alert.resolution_note = body.resolution_note
+    events.emit(db, "alert", action="RESOLVED", alert_id=alert.id)
     db.commit()
     return {"success": True}
 
 
+# ══════════════════════════════════════════════════════════════════════════════
+# ALERT RULES
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _check_rule(alert_type, conditions) -> dict:
+    try:
+        validate_conditions(alert_type, conditions)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return conditions
+
+
+@router.get("/alert-rules", response_model=List[AlertRuleOut], tags=["Alert Rules"])
+def list_alert_rules(active_only: bool = False, db: Session = Depends(get_db)):
+    q = db.query(AlertRule)
+    if active_only:
+        q = q.filter(AlertRule.is_active)
+    return q.order_by(AlertRule.alert_type, AlertRule.name).all()
+
+
+@router.post("/alert-rules", response_model=AlertRuleOut, status_code=201, tags=["Alert Rules"])
+def create_alert_rule(body: AlertRuleCreate, db: Session = Depends(get_db)):
+    """The rules engine picks new or changed rules up on its next run."""
+    data = body.model_dump(mode="json")
+    data["conditions"] = _check_rule(body.alert_type, body.conditions.model_dump(mode="json", exclude_none=True))
+    rule = AlertRule(**data)
+    db.add(rule)
+    db.commit()
+    db.refresh(rule)
+    return rule
+
+
+@router.patch("/alert-rules/{rule_id}", response_model=AlertRuleOut, tags=["Alert Rules"])
+def update_alert_rule(rule_id: UUID, update: AlertRuleUpdate, db: Session = Depends(get_db)):
+    """Rules are deactivated (is_active=false) rather than deleted; alerts keep their rule_id."""
+    rule = db.query(AlertRule).filter(AlertRule.id == rule_id).first()
+    if not rule:
+        raise HTTPException(status_code=404, detail="Alert rule not found")
+    data = update.model_dump(mode="json", exclude_none=True)
+    if "conditions" in data:
+        data["conditions"] = _check_rule(rule.alert_type, data["conditions"])
+    for k, v in data.items():
+        setattr(rule, k, v)
+    rule.updated_at = datetime.now(timezone.utc)
+    db.commit()
+    db.refresh(rule)
+    return rule
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 # CALIBRATION
 # ══════════════════════════════════════════════════════════════════════════════
@@ -445,22 +688,27 @@ def update_calibration(asset_id: UUID, data: CalibrationUpdate, db: Session = De
         Alert.status == AlertStatus.OPEN,
     ).update({"status": AlertStatus.RESOLVED, "resolved_at": now})
 
+    events.emit(db, "calibration", asset_id=asset_id, status=asset.calibration_status.value)
     db.commit()
     db.refresh(record)
     return CalibrationRecordOut.model_validate(record)
 
 
 @router.get("/calibration/due", tags=["Calibration"])
-def get_calibration_due(days: int = 30, db: Session = Depends(get_db)):
+def get_calibration_due(response: Response, days: int = 30, db: Session = Depends(get_read_db)):
     """Assets with calibration due within N days."""
-    now = datetime.now(timezone.utc)
-    cutoff = now + timedelta(days=days)
-    assets = db.query(Asset).filter(
-        Asset.is_active == True,
-        Asset.calibration_due_at != None,
-        Asset.calibration_due_at <= cutoff,
-    ).order_by(Asset.calibration_due_at).all()
-    return [AssetOut.model_validate(a) for a in assets]
+    def compute():
+        cutoff = datetime.now(timezone.utc) + timedelta(days=days)
+        q = db.query(Asset).filter(
+            Asset.is_active == True,
+            Asset.calibration_due_at != None,
+            Asset.calibration_due_at <= cutoff,
+        ).order_by(Asset.calibration_due_at, Asset.asset_code)
+        return _asset_out_dicts(_asset_out_rows(q))
+    return json_response(
+        cache.cached_json("calibration.due", ("assets", "asset_categories"), 300, compute, {"days": days}, db=db),
+        response,
+    )
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -468,8 +716,15 @@ def get_calibration_due(days: int = 30, db: Session = Depends(get_db)):
 # ══════════════════════════════════════════════════════════════════════════════
 
 @router.get("/categories", response_model=List[CategoryOut], tags=["Categories"])
-def list_categories(db: Session = Depends(get_db)):
-    return db.query(AssetCategory).order_by(AssetCategory.code).all()
+def list_categories(request: Request, response: Response, db: Session = Depends(get_read_db)):
+    unchanged = conditional.not_modified(request, response, db, ("asset_categories",))
+    if unchanged:
+        return unchanged
+    return cache.cached(
+        "categories", ("asset_categories",), 3600,
+        lambda: [CategoryOut.model_validate(c) for c in db.query(AssetCategory).order_by(AssetCategory.code).all()],
+        db=db,
+    )
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -483,9 +738,35 @@ def trigger_overdue_check(db: Session = Depends(get_db)):
 
 
 @router.post("/rules/run-calibration-check", tags=["Rules Engine"])
-def trigger_calibration_check(db: Session = Depends(get_db)):
-    """Manually trigger calibration status check."""
-    return run_calibration_check(db)
+def trigger_calibration_check(incremental: bool = False, db: Session = Depends(get_db)):
+    """Manually trigger calibration status check. Runs incrementally every hour; full re-check by default here."""
+    return run_calibration_check(db, incremental=incremental)
+
+
+@router.get("/rules/job-runs", tags=["Rules Engine"])
+def list_job_runs(
+    response: Response,
+    job_name: Optional[str] = None,
+    limit: int = Query(50, le=500),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """History of scheduled job runs (which process ran them, outcome), newest first."""
+    q = db.query(RulesJobRun)
+    if job_name:
+        q = q.filter(RulesJobRun.job_name == job_name)
+    q = after_cursor(q, (RulesJobRun.started_at, RulesJobRun.id), cursor, (datetime.fromisoformat, int))
+    runs = page(q, limit, response, lambda r: (r.started_at, r.id))
+    return [{
+        "id": r.id,
+        "job_name": r.job_name,
+        "runner": r.runner,
+        "started_at": r.started_at,
+        "finished_at": r.finished_at,
+        "success": r.success,
+        "result": r.result,
+        "error": r.error,
+    } for r in runs]
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -494,17 +775,21 @@ def trigger_calibration_check(db: Session = Depends(get_db)):
 
 @router.get("/audit", tags=["Audit"])
 def get_audit_log(
+    response: Response,
     entity_type: Optional[str] = None,
     entity_id: Optional[UUID] = None,
     limit: int = Query(100, le=500),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
+    """Audit trail, newest first. Page with the X-Next-Cursor header."""
     q = db.query(AuditLog)
     if entity_type:
         q = q.filter(AuditLog.entity_type == entity_type)
     if entity_id:
         q = q.filter(AuditLog.entity_id == entity_id)
-    logs = q.order_by(AuditLog.created_at.desc()).limit(limit).all()
+    q = after_cursor(q, (AuditLog.created_at, AuditLog.id), cursor, (datetime.fromisoformat, int))
+    logs = page(q, limit, response, lambda l: (l.created_at, l.id))
     return [{
         "id": l.id,
         "entity_type": l.entity_type,
@@ -514,3 +799,49 @@ def get_audit_log(
         "new_state": l.new_state,
         "created_at": l.created_at,
     } for l in logs]
+
+
+@router.get("/audit/export", tags=["Audit"])
+def export_audit_log(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    entity_type: Optional[str] = None,
+    entity_id: Optional[UUID] = None,
+):
+    """Every audit entry in [since, until), oldest first, streamed as CSV or NDJSON (optionally gzipped).
+    Archived months are handled as for the custody history export."""
+    query = export.audit_query(since, until, entity_type, entity_id)
+    return _export_response(request, query, "audit-log", format, gzip, "audit_log", since, until)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# LIVE EVENTS
+# ══════════════════════════════════════════════════════════════════════════════
+
+@router.get("/events/stream", tags=["Events"])
+async def event_stream(request: Request):
+    """Server-Sent Events: custody transitions, alert and calibration changes as they commit.
+
+    Each `data:` line is JSON with a `type` of custody, alert, calibration,
+    hello (on connect) or resync (events were missed — reload everything).
+    """
+    if not settings.EVENTS_ENABLED:
+        raise HTTPException(status_code=503, detail="Live events are disabled")
+    return StreamingResponse(
+        events.stream(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# SYSTEM
+# ══════════════════════════════════════════════════════════════════════════════
+
+@router.get("/system/qr-cache", tags=["System"])
+def get_qr_cache_stats():
+    """Hit/miss counters of this process's QR resolution cache."""
+    return qr_cache.qr_cache.stats()
@@ -0,0 +1,57 @@
+"""
+Async (asyncpg) variants of the custody scan routes.
+
+Mounted ahead of the sync router when ASYNC_DB_ENABLED is set, so the same
+paths are served from the event loop instead of the threadpool. Each handler
+runs the sync route body on the AsyncSession via run_sync, keeping request
+handling and responses identical to app/routers/api.py, then waits for the
+commit's cache bumps and event publication before responding, as the sync
+routes do.
+"""
+from typing import Callable
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_async_db, run_commit_effects
+from app.routers import api
+from app.schemas.schemas import CheckoutRequest, ReturnRequest, OverrideCheckoutRequest, ScanEvent, ScanBatch
+
+router = APIRouter()
+
+
+async def _run(db: AsyncSession, route: Callable):
+    try:
+        return await db.run_sync(route)
+    finally:
+        await run_commit_effects(db)
+
+
+@router.post("/custody/checkout", tags=["Custody"])
+async def checkout(req: CheckoutRequest, db: AsyncSession = Depends(get_async_db)):
+    """Check out a tool or kit. Scan worker QR + asset QR."""
+    return await _run(db, lambda s: api.checkout(req, s))
+
+
+@router.post("/custody/return", tags=["Custody"])
+async def return_item(req: ReturnRequest, db: AsyncSession = Depends(get_async_db)):
+    """Return a tool or kit."""
+    return await _run(db, lambda s: api.return_item(req, s))
+
+
+@router.post("/custody/override", tags=["Custody"])
+async def override_checkout(req: OverrideCheckoutRequest, db: AsyncSession = Depends(get_async_db)):
+    """Override checkout for suspended asset (requires supervisor scan)."""
+    return await _run(db, lambda s: api.override_checkout(req, s))
+
+
+@router.post("/custody/scan", tags=["Custody"])
+async def scan_event(event: ScanEvent, db: AsyncSession = Depends(get_async_db)):
+    """Universal scan endpoint — auto-detects checkout vs return based on asset state."""
+    return await _run(db, lambda s: api.scan_event(event, s))
+
+
+@router.post("/custody/scan/batch", tags=["Custody"])
+async def scan_batch(batch: ScanBatch, db: AsyncSession = Depends(get_async_db)):
+    """Apply many buffered scans in capture order — one result per event, in request order."""
+    return await _run(db, lambda s: api.scan_batch(batch, s))
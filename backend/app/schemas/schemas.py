@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
 from datetime import datetime
 from uuid import UUID
@@ -129,12 +129,14 @@ class CheckoutRequest(BaseModel):
     asset_qr: str             # QR code scanned from tool/kit
     edge_node_id: Optional[str] = "EDGE-001"
     notes: Optional[str] = None
+    scan_id: Optional[UUID] = None   # client-generated; retries with the same id replay the first result
 
 class ReturnRequest(BaseModel):
     worker_qr: str
     asset_qr: str
     edge_node_id: Optional[str] = "EDGE-001"
     notes: Optional[str] = None
+    scan_id: Optional[UUID] = None
 
 class OverrideCheckoutRequest(BaseModel):
     worker_qr: str
@@ -142,6 +144,7 @@ class OverrideCheckoutRequest(BaseModel):
     supervisor_qr: str        # supervisor must also scan
     reason: str
     edge_node_id: Optional[str] = "EDGE-001"
+    scan_id: Optional[UUID] = None
 
 class CustodyRecordOut(BaseModel):
     id: UUID
@@ -195,6 +198,54 @@ class AlertResolve(BaseModel):
     resolution_note: Optional[str] = None
 
 
+# ── Alert Rules ───────────────────────────────────────────────────────────────
+
+class AlertRuleConditions(BaseModel):
+    """JSONB `conditions` of an alert rule. Every key is optional; which keys a
+    rule may use depends on its alert_type (see app/services/alert_rules.py)."""
+    overdue_threshold_hours: Optional[float] = Field(None, ge=0)
+    repeat_overdue_count: Optional[int] = Field(None, ge=1)   # worker's other overdue returns within the window
+    repeat_window_days: Optional[int] = Field(None, ge=1)
+    worker_roles: Optional[List[WorkerRole]] = None
+    days_ahead: Optional[int] = Field(None, ge=1)
+    category_codes: Optional[List[str]] = None
+    category_ids: Optional[List[UUID]] = None
+
+    class Config:
+        extra = "forbid"
+
+class AlertRuleCreate(BaseModel):
+    name: str
+    alert_type: AlertType
+    severity: AlertSeverity = AlertSeverity.WARNING
+    is_active: bool = True
+    conditions: AlertRuleConditions = AlertRuleConditions()
+    notify_email: Optional[List[str]] = None
+    notify_roles: Optional[List[WorkerRole]] = None
+
+class AlertRuleUpdate(BaseModel):
+    name: Optional[str] = None
+    severity: Optional[AlertSeverity] = None
+    is_active: Optional[bool] = None
+    conditions: Optional[AlertRuleConditions] = None
+    notify_email: Optional[List[str]] = None
+    notify_roles: Optional[List[WorkerRole]] = None
+
+class AlertRuleOut(BaseModel):
+    id: UUID
+    name: str
+    alert_type: AlertType
+    severity: AlertSeverity
+    is_active: bool
+    conditions: dict
+    notify_email: Optional[List[str]] = None
+    notify_roles: Optional[List[WorkerRole]] = None
+    created_at: datetime
+    updated_at: datetime
+    class Config:
+        from_attributes = True
+
+
 # ── Calibration ───────────────────────────────────────────────────────────────
 
 class CalibrationUpdate(BaseModel):
@@ -247,3 +298,7 @@ class ScanEvent(BaseModel):
     edge_node_id: str = "EDGE-001"
     timestamp: Optional[datetime] = None
     notes: Optional[str] = None
+    scan_id: Optional[UUID] = None
+
+class ScanBatch(BaseModel):
+    events: List[ScanEvent] = Field(min_length=1, max_length=1000)
@@ -0,0 +1,249 @@
+"""
+Data-driven alert rules.
+
+Active `alert_rules` rows are compiled once into SQL. For each family of
+alerts (overdue returns; calibration expired / due soon) the rules become one
+`CASE WHEN <rule 1> THEN 1 WHEN <rule 2> THEN 2 ... END` expression that the
+rules engine evaluates per candidate row inside its existing set-based pass,
+so a new rule adds a branch to that expression, not another scan. Branches
+are ordered most severe first: a row is alerted under the most severe rule it
+matches, an open alert of equal or higher severity for the same subject
+suppresses a new one, and crossing into a more severe rule escalates.
+
+Conditions (JSONB, validated by AlertRuleConditions):
+
+    OVERDUE_RETURN        overdue_threshold_hours, worker_roles,
+                          category_codes / category_ids,
+                          repeat_overdue_count [+ repeat_window_days, default 90]
+                          (the worker's other overdue returns in the window,
+                          not counting the record being evaluated)
+    CALIBRATION_DUE_SOON  days_ahead (default 7), category_codes / category_ids
+    CALIBRATION_EXPIRED   category_codes / category_ids
+
+The compiled set is cached per process and rebuilt whenever the fingerprint of
+alert_rules (or of the category codes) changes, so edits made through the API
+or directly in SQL apply on each process's next run.
+"""
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models.models import AlertRule, AssetCategory, AlertType, AlertSeverity
+from app.schemas.schemas import AlertRuleConditions
+
+logger = logging.getLogger("act-backend.alert_rules")
+
+ALLOWED_CONDITIONS = {
+    AlertType.OVERDUE_RETURN: {
+        "overdue_threshold_hours", "worker_roles", "category_codes", "category_ids",
+        "repeat_overdue_count", "repeat_window_days",
+    },
+    AlertType.CALIBRATION_DUE_SOON: {"days_ahead", "category_codes", "category_ids"},
+    AlertType.CALIBRATION_EXPIRED: {"category_codes", "category_ids"},
+}
+
+DEFAULT_DAYS_AHEAD = 7
+DEFAULT_REPEAT_WINDOW_DAYS = 90
+# calibration_status turns DUE_SOON this many days ahead (further if a due-soon rule looks further)
+DEFAULT_DUE_SOON_STATUS_DAYS = 30
+
+_SEVERITY_RANK = {AlertSeverity.INFO: 0, AlertSeverity.WARNING: 1, AlertSeverity.CRITICAL: 2}
+
+# Matched rule lookup: r.idx is the value the CASE expression returned
+RULES_TABLE = """unnest(
+            CAST(:rule_ids AS uuid[]), CAST(:rule_types AS alert_type[]), CAST(:rule_severities AS alert_severity[])
+        ) WITH ORDINALITY AS r(rule_id, alert_type, severity, idx)"""
+
+_FINGERPRINT = text("""
+    SELECT md5(
+               COALESCE((SELECT string_agg(concat_ws('|', id, is_active, alert_type, severity, conditions), ','
+                                           ORDER BY id)
+                         FROM alert_rules), '')
+               || COALESCE((SELECT string_agg(code || '=' || id, ',' ORDER BY code) FROM asset_categories), '')
+           )
+""")
+
+
+def validate_conditions(alert_type, conditions: Optional[dict]) -> AlertRuleConditions:
+    """Parse a rule's conditions; raises ValueError if they do not fit its alert type."""
+    alert_type = AlertType(alert_type)
+    try:
+        parsed = AlertRuleConditions.model_validate(conditions or {})
+    except ValidationError as e:
+        raise ValueError("; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+    allowed = ALLOWED_CONDITIONS.get(alert_type)
+    if allowed is None:
+        raise ValueError(f"{alert_type.value} alerts are not raised by rules")
+    unsupported = {k for k in parsed.model_fields_set if getattr(parsed, k) is not None} - allowed
+    if unsupported:
+        raise ValueError(f"{', '.join(sorted(unsupported))} not supported for {alert_type.value} rules")
+    return parsed
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    """Active rules of one alert family compiled to a CASE expression."""
+    case_sql: str = "NULL::int"
+    params: dict = field(default_factory=dict)   # includes rule_ids / rule_types / rule_severities
+
+    def __bool__(self):
+        return bool(self.params.get("rule_ids"))
+
+
+@dataclass(frozen=True)
+class CompiledRules:
+    fingerprint: str                 # of alert_rules and category codes; incremental runs compare it
+    overdue: RuleSet
+    calibration: RuleSet
+    repeat_windows: tuple = ()       # distinct repeat_window_days of the overdue rules
+    due_soon_days: tuple = ()        # distinct days_ahead of the due-soon rules
+
+    @property
+    def alert_days(self) -> int:
+        """How far ahead any calibration alert can be raised (0: expired only)."""
+        return max(self.due_soon_days, default=0)
+
+    @property
+    def due_soon_status_days(self) -> int:
+        """calibration_status is DUE_SOON at least wherever a due-soon alert can be."""
+        return max(self.alert_days, DEFAULT_DUE_SOON_STATUS_DAYS)
+
+    @property
+    def calibration_thresholds(self) -> tuple:
+        """Days ahead of now at which an asset's calibration status or matching rule can change."""
+        return tuple(sorted({0, self.due_soon_status_days, *self.due_soon_days}))
+
+
+def _category_ids(conditions: AlertRuleConditions, codes: dict, rule_name: str) -> Optional[list]:
+    if conditions.category_codes is None and conditions.category_ids is None:
+        return None
+    ids = [str(c) for c in conditions.category_ids or ()]
+    for code in conditions.category_codes or ():
+        if code in codes:
+            ids.append(codes[code])
+        else:
+            logger.warning(f"Alert rule {rule_name!r}: unknown category code {code!r}")
+    return ids
+
+
+def _case(branches: list) -> str:
+    if not branches:
+        return "NULL::int"
+    whens = "\n".join(f"            WHEN {pred} THEN {i}" for i, pred in enumerate(branches, start=1))
+    return f"CASE\n{whens}\n        END"
+
+
+def _rule_params(rules: list) -> dict:
+    return {
+        "rule_ids": [str(r.id) for r, _ in rules],
+        "rule_types": [r.alert_type.value for r, _ in rules],
+        "rule_severities": [r.severity.value for r, _ in rules],
+    }
+
+
+def _compile_overdue(rules: list, codes: dict) -> tuple:
+    """Predicates over cr (custody_records), a / k (asset / kit), w (worker), wo (worker overdue counts)."""
+    rules = sorted(rules, key=lambda rc: (
+        -_SEVERITY_RANK[rc[0].severity],
+        -(rc[1].overdue_threshold_hours or 0),
+        -(rc[1].repeat_overdue_count or 0),
+        rc[0].name,
+    ))
+    params, branches, windows = _rule_params(rules), [], set()
+    for i, (rule, c) in enumerate(rules, start=1):
+        parts = []
+        if c.overdue_threshold_hours:
+            parts.append(f"cr.overdue_hours >= :o{i}_hours")
+            params[f"o{i}_hours"] = c.overdue_threshold_hours
+        category_ids = _category_ids(c, codes, rule.name)
+        if category_ids is not None:
+            parts.append(f"COALESCE(a.category_id, k.category_id) = ANY(CAST(:o{i}_categories AS uuid[]))")
+            params[f"o{i}_categories"] = category_ids
+        if c.worker_roles:
+            parts.append(f"w.role = ANY(CAST(:o{i}_roles AS worker_role[]))")
+            params[f"o{i}_roles"] = [role.value for role in c.worker_roles]
+        if c.repeat_overdue_count:
+            days = c.repeat_window_days or DEFAULT_REPEAT_WINDOW_DAYS
+            windows.add(days)
+            # Other overdue records: the one being evaluated is itself in the count
+            parts.append(
+                f"COALESCE(wo.overdue_{days}d, 0)"
+                f" - (cr.checked_out_at >= :now - make_interval(days => {days}))::int >= :o{i}_repeat"
+            )
+            params[f"o{i}_repeat"] = c.repeat_overdue_count
+        branches.append(" AND ".join(parts) or "TRUE")
+    return RuleSet(_case(branches), params), tuple(sorted(windows))
+
+
+def _compile_calibration(rules: list, codes: dict) -> tuple:
+    """Predicates over a (assets); :now is bound by the caller."""
+    rules = sorted(rules, key=lambda rc: (
+        rc[0].alert_type != AlertType.CALIBRATION_EXPIRED,
+        -_SEVERITY_RANK[rc[0].severity],
+        rc[1].days_ahead or DEFAULT_DAYS_AHEAD,
+        rc[0].name,
+    ))
+    params, branches, due_soon_days = _rule_params(rules), [], set()
+    for i, (rule, c) in enumerate(rules, start=1):
+        if rule.alert_type == AlertType.CALIBRATION_EXPIRED:
+            parts = ["a.calibration_due_at < :now"]
+        else:
+            days = c.days_ahead or DEFAULT_DAYS_AHEAD
+            due_soon_days.add(days)
+            parts = ["a.calibration_due_at >= :now",
+                     f"a.calibration_due_at < :now + make_interval(days => :c{i}_days)"]
+            params[f"c{i}_days"] = days
+        category_ids = _category_ids(c, codes, rule.name)
+        if category_ids is not None:
+            parts.append(f"a.category_id = ANY(CAST(:c{i}_categories AS uuid[]))")
+            params[f"c{i}_categories"] = category_ids
+        branches.append(" AND ".join(parts))
+    return RuleSet(_case(branches), params), tuple(sorted(due_soon_days))
+
+
+def compile_rules(db: Session, fingerprint: str = "") -> CompiledRules:
+    codes = {code: str(id_) for code, id_ in db.query(AssetCategory.code, AssetCategory.id)}
+    overdue, calibration = [], []
+    for rule in db.query(AlertRule).filter(AlertRule.is_active).all():
+        try:
+            conditions = validate_conditions(rule.alert_type, rule.conditions)
+        except ValueError as e:
+            logger.warning(f"Skipping alert rule {rule.name!r}: {e}")
+            continue
+        if rule.alert_type == AlertType.OVERDUE_RETURN:
+            overdue.append((rule, conditions))
+        else:
+            calibration.append((rule, conditions))
+
+    overdue_set, windows = _compile_overdue(overdue, codes)
+    calibration_set, due_soon_days = _compile_calibration(calibration, codes)
+    return CompiledRules(
+        fingerprint=fingerprint,
+        overdue=overdue_set,
+        calibration=calibration_set,
+        repeat_windows=windows,
+        due_soon_days=due_soon_days,
+    )
+
+
+_lock = threading.Lock()
+_compiled: Optional[CompiledRules] = None
+
+
+def get_compiled_rules(db: Session) -> CompiledRules:
+    """Compiled active rules, recompiled only when alert_rules has changed."""
+    global _compiled
+    fingerprint = db.execute(_FINGERPRINT).scalar()
+    with _lock:
+        if _compiled is None or _compiled.fingerprint != fingerprint:
+            _compiled = compile_rules(db, fingerprint)
+            logger.info(
+                f"Compiled alert rules: {len(_compiled.overdue.params.get('rule_ids', []))} overdue, "
+                f"{len(_compiled.calibration.params.get('rule_ids', []))} calibration"
+            )
+        return _compiled
@@ -0,0 +1,324 @@
+"""
+Bulk import of assets and workers from CSV.
+
+The file is read as a stream and each row is validated against AssetCreate /
+WorkerCreate and the column lengths of the table. Valid rows are loaded
+IMPORT_CHUNK_SIZE at a time: COPY into a temporary staging table, then one
+INSERT ... ON CONFLICT merge into the real table (assets upsert on
+asset_code, workers on qr_code). Memory therefore stays flat however large
+the file, and a chunk costs a handful of round trips instead of one commit
+per row. Each chunk commits on its own, so a failure part-way keeps the
+chunks already imported.
+
+A chunk is merged in a savepoint. If the database still refuses it (a value
+the row checks let through), its rows are retried one at a time and only the
+refused ones are reported. A file that stops being readable text (not UTF-8,
+broken CSV) is imported up to that point and the rest reported as one error.
+
+Rows are reported by CSV line number. Within one file a later row for the
+same key wins (the earlier one counts as superseded). A row whose other unique column (asset qr_code, worker
+employee_id) already belongs to a different record is rejected rather than
+aborting its chunk. Assets may give `category_code` instead of `category_id`.
+An update only overwrites the columns the file has (plus the required ones),
+so re-importing a partial sheet keeps e.g. notes, phone numbers and roles.
+
+    python -m app.services.bulk_import assets tools.csv
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+from dataclasses import dataclass
+from typing import Iterable, Type
+
+from fastapi import HTTPException
+import psycopg2
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import String, text
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core import cache
+from app.core.config import settings
+from app.core.database import Base, SessionLocal
+from app.models.models import AssetCategory
+from app.schemas.schemas import AssetCreate, WorkerCreate
+from app.services import qr_cache
+
+
+@dataclass(frozen=True)
+class ImportSpec:
+    table: str
+    schema: Type[BaseModel]
+    key: str                  # upsert (ON CONFLICT) column
+    other_unique: str         # second unique column that may clash with another record
+
+    @property
+    def columns(self) -> tuple:
+        return tuple(self.schema.model_fields)
+
+    @property
+    def staging(self) -> str:
+        return f"import_{self.table}"
+
+    @property
+    def lengths(self) -> dict:
+        """Column -> maximum length, for the VARCHAR columns of the table."""
+        columns = Base.metadata.tables[self.table].columns
+        return {
+            name: columns[name].type.length for name in self.columns
+            if isinstance(columns[name].type, String) and columns[name].type.length
+        }
+
+    def update_columns(self, header) -> tuple:
+        """Columns an upsert overwrites: those in the CSV header plus required ones.
+        Optional columns missing from the file keep their stored values."""
+        header = set(header or ())
+        if "category_code" in header:
+            header.add("category_id")
+        return tuple(
+            name for name, f in self.schema.model_fields.items()
+            if name != self.key and (name in header or f.is_required())
+        )
+
+
+# Database errors that concern the rows of a chunk rather than the connection
+# (the COPY runs on the raw psycopg2 cursor, so its errors are not wrapped)
+ROW_ERRORS = (DataError, IntegrityError, psycopg2.DataError, psycopg2.IntegrityError)
+
+SPECS = {
+    "assets": ImportSpec("assets", AssetCreate, key="asset_code", other_unique="qr_code"),
+    "workers": ImportSpec("workers", WorkerCreate, key="qr_code", other_unique="employee_id"),
+}
+
+
+def _error(line: int, key, message: str) -> dict:
+    return {"row": line, "key": key, "error": message}
+
+
+def _check_header(spec: ImportSpec, header) -> None:
+    header = set(header or ())
+    if spec.table == "assets" and "category_code" in header:
+        header.add("category_id")
+    missing = [name for name, f in spec.schema.model_fields.items() if f.is_required() and name not in header]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"CSV is missing required column(s): {', '.join(missing)}")
+
+
+def _parse(spec: ImportSpec, row: dict, categories: dict) -> dict:
+    """Validate one CSV row; returns values ready for COPY (raises ValueError)."""
+    data = {k: v.strip() for k, v in row.items() if k is not None and v is not None and v.strip()}
+    if spec.table == "assets":
+        if "category_code" in data and "category_id" not in data:
+            code = data.pop("category_code")
+            if code not in categories:
+                raise ValueError(f"unknown category_code {code!r}")
+            data["category_id"] = categories[code]
+    values = spec.schema.model_validate(data).model_dump(mode="json")
+    if spec.table == "assets" and values["category_id"] not in categories.values():
+        raise ValueError(f"unknown category_id {values['category_id']}")
+    _check_lengths(spec, values)
+    return values
+
+
+def _check_lengths(spec: ImportSpec, values: dict) -> None:
+    too_long = [
+        f"{name}: at most {limit} characters"
+        for name, limit in spec.lengths.items()
+        if isinstance(values.get(name), str) and len(values[name]) > limit
+    ]
+    if too_long:
+        raise ValueError("; ".join(too_long))
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in exc.errors())
+
+
+def _database_message(exc: Exception) -> str:
+    # First line of the server's message, e.g. "value too long for type character varying(20)"
+    return str(getattr(exc, "orig", exc)).strip().splitlines()[0]
+
+
+def _load_chunk(db: Session, spec: ImportSpec, rows: list, update_columns: tuple) -> tuple:
+    """Stage, merge and commit one chunk of (line, values); returns
+    (inserted, updated, superseded, errors). Existing rows only get
+    `update_columns` overwritten."""
+    try:
+        with db.begin_nested():
+            inserted, updated, superseded, errors, qrs = _merge(db, spec, rows, update_columns)
+    except ROW_ERRORS:
+        inserted, updated, superseded, errors, qrs = _merge_rows(db, spec, rows, update_columns)
+    db.commit()
+
+    invalidate = qr_cache.invalidate_item if spec.table == "assets" else qr_cache.invalidate_worker
+    invalidate(*qrs)
+    return inserted, updated, superseded, errors
+
+
+def _merge_rows(db: Session, spec: ImportSpec, rows: list, update_columns: tuple) -> tuple:
+    """_merge() one row at a time, each in its own savepoint, reporting the refused ones."""
+    latest = {values[spec.key]: (line, values) for line, values in rows}   # later rows win
+    superseded = len(rows) - len(latest)
+    inserted = updated = 0
+    errors, qrs = [], []
+    for line, values in sorted(latest.values(), key=lambda r: r[0]):
+        try:
+            with db.begin_nested():
+                i, u, _, row_errors, row_qrs = _merge(db, spec, [(line, values)], update_columns)
+        except ROW_ERRORS as e:
+            errors.append(_error(line, values[spec.key], _database_message(e)))
+            continue
+        inserted += i
+        updated += u
+        errors.extend(row_errors)
+        qrs.extend(row_qrs)
+    return inserted, updated, superseded, errors, qrs
+
+
+def _merge(db: Session, spec: ImportSpec, rows: list, update_columns: tuple) -> tuple:
+    """Stage and merge rows without committing; returns
+    (inserted, updated, superseded, errors, QR codes to invalidate)."""
+    cols = spec.columns
+    col_list = ", ".join(cols)
+    db.execute(text(
+        f"CREATE TEMP TABLE {spec.staging} ON COMMIT DROP AS "
+        f"SELECT 0 AS row_no, {col_list} FROM {spec.table} WITH NO DATA"
+    ))
+
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for line, values in rows:
+        writer.writerow([line, *(values[c] for c in cols)])
+    buf.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {spec.staging} (row_no, {col_list}) FROM STDIN WITH (FORMAT csv)", buf)
+    finally:
+        cursor.close()
+
+    key, other, staging = spec.key, spec.other_unique, spec.staging
+    # Later rows for the same key win
+    superseded = db.execute(text(f"""
+        DELETE FROM {staging} s USING {staging} later
+        WHERE later.{key} = s.{key} AND later.row_no > s.row_no
+    """)).rowcount
+    # The other unique column must not belong to a different record, in the table or earlier in this chunk
+    clashes = db.execute(text(f"""
+        DELETE FROM {staging} s
+        USING (
+            SELECT s2.row_no, 'already used by ' || t.{key} AS reason
+            FROM {staging} s2 JOIN {spec.table} t ON t.{other} = s2.{other} AND t.{key} <> s2.{key}
+            UNION ALL
+            SELECT s2.row_no, 'duplicates row ' || min(e.row_no)
+            FROM {staging} s2 JOIN {staging} e ON e.{other} = s2.{other} AND e.row_no < s2.row_no
+            GROUP BY s2.row_no
+        ) c
+        WHERE s.row_no = c.row_no
+        RETURNING s.row_no, s.{key}, s.{other}, c.reason
+    """)).all()
+    errors = [_error(r[0], r[1], f"{other} {r[2]!r} {r[3]}") for r in clashes]
+
+    # QR codes an upsert is about to replace, so their cache entries can be dropped too
+    replaced_qrs = db.execute(text(f"""
+        SELECT t.qr_code FROM {spec.table} t JOIN {staging} s ON s.{key} = t.{key}
+        WHERE t.qr_code <> s.qr_code
+    """)).scalars().all()
+
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in update_columns)
+    merged = db.execute(text(f"""
+        INSERT INTO {spec.table} ({col_list})
+        SELECT {col_list} FROM {staging} ORDER BY row_no
+        ON CONFLICT ({key}) DO UPDATE SET {updates}, updated_at = NOW()
+        RETURNING (xmax = 0) AS inserted, qr_code
+    """)).all()
+    db.execute(text(f"DROP TABLE {staging}"))
+    cache.touch(db, spec.table)
+
+    inserted = sum(1 for row in merged if row.inserted)
+    qrs = [row.qr_code for row in merged] + list(replaced_qrs)
+    return inserted, len(merged) - inserted, superseded, errors, qrs
+
+
+def import_csv(db: Session, entity: str, lines: Iterable[str], chunk_size: int = None) -> dict:
+    """Import CSV text lines (header first) into `entity` ("assets" or "workers")."""
+    spec = SPECS[entity]
+    chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+    reader = csv.DictReader(lines)
+    try:
+        header = reader.fieldnames
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"CSV header is not readable as UTF-8 text: {e}")
+    _check_header(spec, header)
+    update_columns = spec.update_columns(header)
+    categories = {}
+    if entity == "assets":
+        categories = {code: str(id_) for code, id_ in db.query(AssetCategory.code, AssetCategory.id)}
+
+    report = {
+        "rows": 0, "inserted": 0, "updated": 0, "superseded": 0, "failed": 0,
+        "errors": [], "errors_truncated": False,
+    }
+
+    def record(errors):
+        report["failed"] += len(errors)
+        room = settings.IMPORT_MAX_ERRORS - len(report["errors"])
+        report["errors"].extend(errors[:max(room, 0)])
+        report["errors_truncated"] |= len(errors) > room
+
+    def flush(chunk):
+        inserted, updated, superseded, errors = _load_chunk(db, spec, chunk, update_columns)
+        report["inserted"] += inserted
+        report["updated"] += updated
+        report["superseded"] += superseded
+        record(errors)
+
+    chunk = []
+    rows = iter(reader)
+    while True:
+        try:
+            row = next(rows)
+        except StopIteration:
+            break
+        except (UnicodeDecodeError, csv.Error) as e:
+            # The rest of the file cannot be split into rows; keep what was read
+            record([_error(reader.line_num + 1, None, f"unreadable from here on, not imported: {e}")])
+            break
+        report["rows"] += 1
+        try:
+            chunk.append((reader.line_num, _parse(spec, row, categories)))
+        except ValidationError as e:
+            record([_error(reader.line_num, row.get(spec.key), _validation_message(e))])
+        except ValueError as e:
+            record([_error(reader.line_num, row.get(spec.key), str(e))])
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import assets or workers from a CSV file.")
+    parser.add_argument("entity", choices=sorted(SPECS))
+    parser.add_argument("path", help="CSV file with a header row ('-' for stdin)")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    source = sys.stdin if args.path == "-" else open(args.path, newline="", encoding="utf-8-sig")
+    try:
+        report = import_csv(db, args.entity, source, args.chunk_size)
+    except HTTPException as e:
+        sys.exit(e.detail)
+    finally:
+        source.close()
+        db.close()
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
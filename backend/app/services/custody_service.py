@@ -1,50 +1,226 @@
-from datetime import datetime, timezone
+import hashlib
+import json
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
 from typing import Optional
+from uuid import UUID
+from sqlalchemy import case, cast, exists, insert, inspect, update
+from sqlalchemy.exc import DBAPIError, IntegrityError
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 
+from app.core import events, metrics
 from app.models.models import (
-    Asset, AssetKit, Worker, CustodyRecord, EdgeNode, AuditLog,
-    AssetState, CustodyEventType
+    Asset, AssetKit, KitMember, Worker, CustodyRecord, EdgeNode, AuditLog,
+    ScanRequest, AssetState, CustodyEventType, CalibrationStatus, WorkerRole
 )
+from app.services.qr_cache import QREntry, qr_cache, worker_key, item_key, edge_key
 
 
 def get_utc_now():
     return datetime.now(timezone.utc)
 
 
-def resolve_worker(db: Session, qr_code: str) -> Worker:
+def resolve_worker(db: Session, qr_code: str) -> QREntry:
+    key = worker_key(qr_code)
+    entry = qr_cache.get(key)
+    if entry:
+        return entry
     worker = db.query(Worker).filter(
         Worker.qr_code == qr_code,
         Worker.is_active == True
     ).first()
     if not worker:
         raise HTTPException(status_code=404, detail=f"Worker QR '{qr_code}' not found or inactive")
-    return worker
+    entry = QREntry(worker.id, "worker", {
+        "employee_id": worker.employee_id,
+        "full_name": worker.full_name,
+        "role": worker.role,
+    })
+    qr_cache.put(key, entry)
+    return entry
+
+
+# Item rows are locked for the rest of the transaction before their state is
+# read, so concurrent scans of one item serialise on the row. NOWAIT makes the
+# loser fail fast with a 409 instead of queueing and then acting on the
+# winner's outcome (a double-tapped checkout turning into a return). Kit
+# member rows are locked the same way.
+ITEM_LOCK = {"nowait": True}
+
+LOCK_NOT_AVAILABLE = "55P03"
+
+
+def _lock_conflict(exc: DBAPIError) -> bool:
+    # psycopg2 raises OperationalError, asyncpg a plain DBAPIError; both carry pgcode
+    return getattr(exc.orig, "pgcode", None) == LOCK_NOT_AVAILABLE
+
+
+def _item_busy() -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail="Item is being updated by another scan. Please scan again.",
+    )
 
 
 def resolve_asset_or_kit(db: Session, qr_code: str):
-    """Returns (asset_or_kit, is_kit)"""
-    asset = db.query(Asset).filter(Asset.qr_code == qr_code, Asset.is_active == True).first()
+    """Returns (asset_or_kit, is_kit) with the row locked FOR UPDATE NOWAIT."""
+    try:
+        return _resolve_asset_or_kit(db, qr_code)
+    except DBAPIError as e:
+        if not _lock_conflict(e):
+            raise
+        raise _item_busy()
+
+
+def _resolve_asset_or_kit(db: Session, qr_code: str):
+    key = item_key(qr_code)
+    entry = qr_cache.get(key)
+    if entry:
+        # Cached QR -> id; the row itself is always loaded fresh for its state
+        if entry.type == "kit":
+            kit = db.get(AssetKit, entry.id, with_for_update=ITEM_LOCK)
+            if kit:
+                return kit, True
+        else:
+            asset = db.get(Asset, entry.id, with_for_update=ITEM_LOCK)
+            if asset and asset.is_active:
+                return asset, False
+        qr_cache.invalidate(key)
+
+    asset = db.query(Asset).filter(
+        Asset.qr_code == qr_code, Asset.is_active == True
+    ).with_for_update(**ITEM_LOCK).first()
     if asset:
+        qr_cache.put(key, QREntry(asset.id, "asset", {"code": asset.asset_code, "name": asset.name}))
         return asset, False
-    kit = db.query(AssetKit).filter(AssetKit.qr_code == qr_code).first()
+    kit = db.query(AssetKit).filter(AssetKit.qr_code == qr_code).with_for_update(**ITEM_LOCK).first()
     if kit:
+        qr_cache.put(key, QREntry(kit.id, "kit", {"code": kit.kit_code, "name": kit.name}))
         return kit, True
     raise HTTPException(status_code=404, detail=f"Asset/Kit QR '{qr_code}' not found")
 
 
-def resolve_edge_node(db: Session, node_id: str) -> Optional[EdgeNode]:
-    return db.query(EdgeNode).filter(EdgeNode.node_id == node_id).first()
+def resolve_edge_node(db: Session, node_id: str) -> Optional[QREntry]:
+    key = edge_key(node_id)
+    entry = qr_cache.get(key)
+    if entry:
+        return entry
+    edge = db.query(EdgeNode).filter(EdgeNode.node_id == node_id).first()
+    if not edge:
+        return None
+    entry = QREntry(edge.id, "edge_node", {"node_id": edge.node_id})
+    qr_cache.put(key, entry)
+    return entry
+
+
+def _item_kind(is_kit: bool) -> str:
+    return "kit" if is_kit else "asset"
+
+
+def _emit_transition(db: Session, action: str, worker: QREntry, item, is_kit: bool):
+    """Live event for the dashboard, published once the transition commits."""
+    events.emit(db, "custody", action=action, worker_id=worker.id, **{f"{_item_kind(is_kit)}_id": item.id})
+
+
+# ── Kit members ───────────────────────────────────────────────────────────────
+# A kit transition carries its member assets with it. Members are read and
+# locked with one query, validated together, moved with one UPDATE and audited
+# with one multi-row INSERT, so a 40-piece kit costs the same round trips as a
+# single tool.
+
+OUT_STATES = (AssetState.IN_CUSTODY, AssetState.OVERRIDE_CUSTODY, AssetState.OVERDUE)
+
 
+def _lock_members(db: Session, kit_id: UUID):
+    """Active member assets of a kit, locked FOR UPDATE NOWAIT in id order.
 
-def checkout(db: Session, worker_qr: str, asset_qr: str, edge_node_id: str = "EDGE-001", notes: str = None):
-    worker = resolve_worker(db, worker_qr)
-    item, is_kit = resolve_asset_or_kit(db, asset_qr)
-    edge = resolve_edge_node(db, edge_node_id)
-    now = get_utc_now()
+    Rows carry `own_custody`: the asset has an open custody record of its own,
+    i.e. it was issued individually rather than with the kit. A member locked
+    by another scan raises the lock conflict as a DBAPIError: single scans
+    answer it with a 409, batches with a retryable result for the chunk.
+    """
+    own_custody = exists().where(CustodyRecord.asset_id == Asset.id, CustodyRecord.returned_at == None)
+    return db.query(
+        Asset.id, Asset.asset_code, Asset.state, Asset.calibration_status, own_custody.label("own_custody"),
+    ).join(KitMember, KitMember.asset_id == Asset.id).filter(
+        KitMember.kit_id == kit_id, Asset.is_active == True
+    ).order_by(Asset.id).with_for_update(of=Asset, **ITEM_LOCK).all()
 
-    # State check
+
+def _member_codes(members) -> str:
+    return ", ".join(sorted(m.asset_code for m in members))
+
+
+def _check_members_issuable(members, override: bool = False):
+    withdrawn = [m for m in members if m.state == AssetState.WITHDRAWN]
+    if withdrawn:
+        raise HTTPException(
+            status_code=409, detail=f"Kit member(s) WITHDRAWN from service: {_member_codes(withdrawn)}."
+        )
+    issued = [m for m in members if m.state in OUT_STATES]
+    if issued:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Kit member(s) already IN CUSTODY: {_member_codes(issued)}. Return them first."
+        )
+    # A supervisor override issues past calibration, as it does for the kit itself
+    if not override:
+        suspended = [
+            m for m in members
+            if m.state == AssetState.SUSPENDED or m.calibration_status == CalibrationStatus.OVERDUE
+        ]
+        if suspended:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Kit member(s) SUSPENDED — calibration expired or withheld: "
+                       f"{_member_codes(suspended)}. Cannot issue kit."
+            )
+
+
+def _move_members(db: Session, kit: AssetKit, members, new_state, event_type: str, changed_by: UUID,
+                  edge: Optional[QREntry], now: datetime, extra: dict):
+    """Set the members' state with one UPDATE and write their audit rows with one INSERT.
+
+    `new_state` is an AssetState, or a function of the member row when
+    members land in different states (picked per row by a CASE).
+    """
+    if not members:
+        return
+    states = {m.id: new_state(m) if callable(new_state) else new_state for m in members}
+    by_state = defaultdict(list)
+    for member_id, state in states.items():
+        by_state[state].append(member_id)
+    if len(by_state) == 1:
+        state_expr = next(iter(by_state))
+    else:
+        state_expr = cast(case(*[(Asset.id.in_(ids), state) for state, ids in by_state.items()]), Asset.state.type)
+    db.execute(
+        update(Asset).where(Asset.id.in_(list(states))).values(state=state_expr, updated_at=now)
+    )
+    db.execute(insert(AuditLog), [
+        {
+            "entity_type": "asset",
+            "entity_id": m.id,
+            "event_type": event_type,
+            "old_state": {"state": m.state.value},
+            "new_state": {"state": states[m.id].value, "kit_id": str(kit.id), **extra},
+            "changed_by": changed_by,
+            "edge_node_id": edge.id if edge else None,
+        }
+        for m in members
+    ])
+
+
+def _member_return_state(member) -> AssetState:
+    if member.calibration_status == CalibrationStatus.OVERDUE:
+        return AssetState.SUSPENDED
+    return AssetState.AVAILABLE
+
+
+def _apply_checkout(db: Session, worker: QREntry, item, is_kit: bool, edge: Optional[QREntry],
+                    now: datetime, notes: str = None) -> CustodyRecord:
+    """Validate and stage a checkout in the session. Does not commit."""
     if item.state == AssetState.SUSPENDED:
         raise HTTPException(
             status_code=409,
@@ -58,14 +234,11 @@ def checkout(db: Session, worker_qr: str, asset_qr: str, edge_node_id: str = "ED
             detail=f"{'Kit' if is_kit else 'Asset'} is already IN CUSTODY. Return it first."
         )
 
+    members = _lock_members(db, item.id) if is_kit else []
+    _check_members_issuable(members)
+
     # Calculate expected return
     max_hours = item.max_checkout_hours if not is_kit else 8
-    expected_return = datetime(
-        now.year, now.month, now.day,
-        now.hour, now.minute, now.second,
-        tzinfo=now.tzinfo
-    )
-    from datetime import timedelta
     expected_return = now + timedelta(hours=max_hours)
 
     # Create custody record
@@ -90,7 +263,7 @@ def checkout(db: Session, worker_qr: str, asset_qr: str, edge_node_id: str = "ED
 
     # Audit log
     db.add(AuditLog(
-        entity_type="kit" if is_kit else "asset",
+        entity_type=_item_kind(is_kit),
         entity_id=item.id,
         event_type="CHECKOUT",
         old_state={"state": "AVAILABLE"},
@@ -98,18 +271,15 @@ def checkout(db: Session, worker_qr: str, asset_qr: str, edge_node_id: str = "ED
         changed_by=worker.id,
         edge_node_id=edge.id if edge else None,
     ))
-
-    db.commit()
-    db.refresh(record)
+    _move_members(db, item, members, AssetState.IN_CUSTODY, "CHECKOUT", worker.id, edge, now,
+                  {"worker_id": str(worker.id)})
+    _emit_transition(db, "CHECKOUT", worker, item, is_kit)
     return record
 
 
-def return_item(db: Session, worker_qr: str, asset_qr: str, edge_node_id: str = "EDGE-001", notes: str = None):
-    worker = resolve_worker(db, worker_qr)
-    item, is_kit = resolve_asset_or_kit(db, asset_qr)
-    edge = resolve_edge_node(db, edge_node_id)
-    now = get_utc_now()
-
+def _apply_return(db: Session, worker: QREntry, item, is_kit: bool, edge: Optional[QREntry],
+                  now: datetime, notes: str = None) -> CustodyRecord:
+    """Validate and stage a return in the session. Does not commit."""
     if item.state == AssetState.AVAILABLE:
         raise HTTPException(status_code=409, detail="Asset is already AVAILABLE — not checked out.")
     if item.state == AssetState.WITHDRAWN:
@@ -139,7 +309,6 @@ def return_item(db: Session, worker_qr: str, asset_qr: str, edge_node_id: str =
         record.overdue_hours = overdue_hours
 
     # Restore state — check calibration
-    from app.models.models import CalibrationStatus
     if item.state != AssetState.SUSPENDED:
         if not is_kit and hasattr(item, 'calibration_status'):
             if item.calibration_status == CalibrationStatus.OVERDUE:
@@ -151,7 +320,7 @@ def return_item(db: Session, worker_qr: str, asset_qr: str, edge_node_id: str =
     item.updated_at = now
 
     db.add(AuditLog(
-        entity_type="kit" if is_kit else "asset",
+        entity_type=_item_kind(is_kit),
         entity_id=item.id,
         event_type="RETURN",
         old_state={"state": "IN_CUSTODY"},
@@ -159,29 +328,31 @@ def return_item(db: Session, worker_qr: str, asset_qr: str, edge_node_id: str =
         changed_by=worker.id,
         edge_node_id=edge.id if edge else None,
     ))
-
-    db.commit()
-    db.refresh(record)
+    if is_kit:
+        # Members issued on their own stay out with their own record
+        members = [m for m in _lock_members(db, item.id) if m.state in OUT_STATES and not m.own_custody]
+        _move_members(db, item, members, _member_return_state, "RETURN", worker.id, edge, now,
+                      {"overdue_hours": overdue_hours})
+    _emit_transition(db, "RETURN", worker, item, is_kit)
     return record
 
 
-def override_checkout(db: Session, worker_qr: str, asset_qr: str, supervisor_qr: str, reason: str, edge_node_id: str = "EDGE-001"):
-    worker = resolve_worker(db, worker_qr)
-    supervisor = resolve_worker(db, supervisor_qr)
-    item, is_kit = resolve_asset_or_kit(db, asset_qr)
-    edge = resolve_edge_node(db, edge_node_id)
-    now = get_utc_now()
-
+def _apply_override(db: Session, worker: QREntry, supervisor: QREntry, item, is_kit: bool,
+                    edge: Optional[QREntry], now: datetime, reason: str) -> CustodyRecord:
+    """Validate and stage an override checkout in the session. Does not commit."""
     # Only supervisors/admins/toolroom incharge can override
-    from app.models.models import WorkerRole
     allowed = {WorkerRole.SUPERVISOR, WorkerRole.ADMIN, WorkerRole.TOOLROOM_INCHARGE}
-    if supervisor.role not in allowed:
+    # Authority is read from the DB, not the QR cache: a demotion or deactivation
+    # must apply at once on every process
+    role = db.query(Worker.role).filter(Worker.id == supervisor.id, Worker.is_active == True).scalar()
+    if role not in allowed:
         raise HTTPException(status_code=403, detail="Supervisor QR does not have override authority.")
 
     if item.state == AssetState.WITHDRAWN:
         raise HTTPException(status_code=409, detail="Asset is WITHDRAWN — cannot override.")
+    members = _lock_members(db, item.id) if is_kit else []
+    _check_members_issuable(members, override=True)
 
-    from datetime import timedelta
     max_hours = getattr(item, 'max_checkout_hours', 8)
     expected_return = now + timedelta(hours=max_hours)
 
@@ -205,7 +376,7 @@ def override_checkout(db: Session, worker_qr: str, asset_qr: str, supervisor_qr:
 
     db.add(record)
     db.add(AuditLog(
-        entity_type="kit" if is_kit else "asset",
+        entity_type=_item_kind(is_kit),
         entity_id=item.id,
         event_type="OVERRIDE_CHECKOUT",
         old_state={"state": item.state.value},
@@ -213,7 +384,335 @@ def override_checkout(db: Session, worker_qr: str, asset_qr: str, supervisor_qr:
         changed_by=supervisor.id,
         edge_node_id=edge.id if edge else None,
     ))
+    _move_members(db, item, members, AssetState.OVERRIDE_CUSTODY, "OVERRIDE_CHECKOUT", supervisor.id, edge, now,
+                  {"worker_id": str(worker.id), "supervisor": str(supervisor.id), "reason": reason})
+    _emit_transition(db, "OVERRIDE_CHECKOUT", worker, item, is_kit)
+    return record
+
+
+def _scan_action(item, event_type: str) -> str:
+    """A checked-out item is always returned; anything else is checked out."""
+    if event_type.upper() == "RETURN" or item.state in (
+        AssetState.IN_CUSTODY, AssetState.OVERRIDE_CUSTODY, AssetState.OVERDUE
+    ):
+        return "RETURN"
+    return "CHECKOUT"
+
+
+# ── Idempotency ───────────────────────────────────────────────────────────────
+# A client may attach its own scan_id to any custody call. The first call that
+# succeeds stores (scan_id -> action, record, request hash) in the same
+# transaction as the transition; any later call with that id and the same
+# request returns the stored result untouched. Reusing a scan_id for a
+# different request (worker, item, kind of call) is rejected with a 422.
+
+def request_hash(kind: str, *fields) -> str:
+    """Fingerprint of a custody call, stored with its scan_id."""
+    return hashlib.sha256(json.dumps([kind, *fields], default=str).encode()).hexdigest()
+
+
+def _scan_hash(worker_qr: str, asset_qr: str, event_type: str, edge_node_id: Optional[str]) -> str:
+    # Shared by /custody/scan and batch events: an edge may send one scan either way
+    return request_hash("SCAN", worker_qr, asset_qr, (event_type or "CHECKOUT").upper(), edge_node_id)
+
+
+def _check_reuse(scan_id: UUID, stored_hash: str, fingerprint: str):
+    if stored_hash != fingerprint:
+        raise HTTPException(
+            status_code=422,
+            detail=f"scan_id {scan_id} was already used for a different scan.",
+        )
+
 
-    db.commit()
+def _replay(db: Session, scan_id: Optional[UUID], fingerprint: str):
+    """(action, record) previously produced for scan_id, or None."""
+    if scan_id is None:
+        return None
+    prior = db.get(ScanRequest, scan_id)
+    if prior is None:
+        return None
+    _check_reuse(scan_id, prior.request_hash, fingerprint)
+    record = db.get(CustodyRecord, prior.record_id)
+    if record is None:
+        # Its month was archived (partitions.archive_old_partitions)
+        raise HTTPException(
+            status_code=409,
+            detail=f"scan_id {scan_id} was already applied; its custody record has been archived.",
+        )
+    return prior.action.value, record
+
+
+def _remember(db: Session, scan_id: Optional[UUID], fingerprint: str, action: str, record: CustodyRecord):
+    if scan_id is not None:
+        db.flush()
+        db.add(ScanRequest(scan_id=scan_id, action=action, record_id=record.id, request_hash=fingerprint))
+
+
+def _run_once(db: Session, scan_id: Optional[UUID], fingerprint: str, apply):
+    """Commit `apply()` -> (action, record) at most once per scan_id."""
+    replay = _replay(db, scan_id, fingerprint)
+    if replay:
+        metrics.count_scan("REPLAYED")
+        return replay
+    try:
+        try:
+            action, record = apply()
+        except DBAPIError as e:
+            # Kit members are locked NOWAIT after the kit row itself
+            if not _lock_conflict(e):
+                raise
+            raise _item_busy()
+        _remember(db, scan_id, fingerprint, action, record)
+        db.commit()
+    except (HTTPException, IntegrityError) as e:
+        db.rollback()
+        # A concurrent request with the same scan_id may have committed first,
+        # in which case this one fails on state or on the scan_id key
+        replay = _replay(db, scan_id, fingerprint)
+        if replay:
+            metrics.count_scan("REPLAYED")
+            return replay
+        if isinstance(e, HTTPException):
+            metrics.count_scan(e.status_code)
+        raise
+    metrics.count_scan(action)
     db.refresh(record)
-    return record
+    return action, record
+
+
+def checkout(db: Session, worker_qr: str, asset_qr: str, edge_node_id: str = "EDGE-001", notes: str = None,
+             scan_id: Optional[UUID] = None):
+    def apply():
+        worker = resolve_worker(db, worker_qr)
+        item, is_kit = resolve_asset_or_kit(db, asset_qr)
+        edge = resolve_edge_node(db, edge_node_id)
+        return "CHECKOUT", _apply_checkout(db, worker, item, is_kit, edge, get_utc_now(), notes)
+
+    return _run_once(db, scan_id, request_hash("CHECKOUT", worker_qr, asset_qr, edge_node_id), apply)[1]
+
+
+def return_item(db: Session, worker_qr: str, asset_qr: str, edge_node_id: str = "EDGE-001", notes: str = None,
+                scan_id: Optional[UUID] = None):
+    def apply():
+        worker = resolve_worker(db, worker_qr)
+        item, is_kit = resolve_asset_or_kit(db, asset_qr)
+        edge = resolve_edge_node(db, edge_node_id)
+        return "RETURN", _apply_return(db, worker, item, is_kit, edge, get_utc_now(), notes)
+
+    return _run_once(db, scan_id, request_hash("RETURN", worker_qr, asset_qr, edge_node_id), apply)[1]
+
+
+def override_checkout(db: Session, worker_qr: str, asset_qr: str, supervisor_qr: str, reason: str,
+                      edge_node_id: str = "EDGE-001", scan_id: Optional[UUID] = None):
+    def apply():
+        worker = resolve_worker(db, worker_qr)
+        supervisor = resolve_worker(db, supervisor_qr)
+        item, is_kit = resolve_asset_or_kit(db, asset_qr)
+        edge = resolve_edge_node(db, edge_node_id)
+        return "OVERRIDE_CHECKOUT", _apply_override(
+            db, worker, supervisor, item, is_kit, edge, get_utc_now(), reason
+        )
+
+    fingerprint = request_hash("OVERRIDE_CHECKOUT", worker_qr, asset_qr, supervisor_qr, reason, edge_node_id)
+    return _run_once(db, scan_id, fingerprint, apply)[1]
+
+
+def scan(db: Session, worker_qr: str, asset_qr: str, event_type: str = "CHECKOUT",
+         edge_node_id: str = "EDGE-001", notes: str = None, scan_id: Optional[UUID] = None):
+    """Universal scan — returns (action, record); a checked-out item is always returned."""
+    def apply():
+        worker = resolve_worker(db, worker_qr)
+        item, is_kit = resolve_asset_or_kit(db, asset_qr)
+        edge = resolve_edge_node(db, edge_node_id)
+        action = _scan_action(item, event_type)
+        apply_action = _apply_return if action == "RETURN" else _apply_checkout
+        return action, apply_action(db, worker, item, is_kit, edge, get_utc_now(), notes)
+
+    return _run_once(db, scan_id, _scan_hash(worker_qr, asset_qr, event_type, edge_node_id), apply)
+
+
+# ── Batch scans ───────────────────────────────────────────────────────────────
+
+BATCH_CHUNK_SIZE = 100
+
+
+def resolve_batch(db: Session, worker_qrs, item_qrs, edge_node_ids):
+    """Resolve many QR codes with one query per entity type.
+
+    Returns (workers, items, edges) dicts keyed by QR code / node id; codes
+    that do not resolve are simply absent. Items map to (row, is_kit) and are
+    always loaded fresh, since their state drives the transition.
+    """
+    workers = {}
+    for qr in set(worker_qrs):
+        entry = qr_cache.get(worker_key(qr))
+        if entry:
+            workers[qr] = entry
+    missing = set(worker_qrs) - workers.keys()
+    if missing:
+        rows = db.query(Worker).filter(Worker.qr_code.in_(missing), Worker.is_active == True).all()
+        for w in rows:
+            entry = QREntry(w.id, "worker", {"employee_id": w.employee_id, "full_name": w.full_name, "role": w.role})
+            qr_cache.put(worker_key(w.qr_code), entry)
+            workers[w.qr_code] = entry
+
+    items = {}
+    item_qrs = set(item_qrs)
+    if item_qrs:
+        # Batches wait for row locks (in id order) rather than failing fast
+        assets = db.query(Asset).filter(
+            Asset.qr_code.in_(item_qrs), Asset.is_active == True
+        ).order_by(Asset.id).with_for_update().populate_existing().all()
+        for asset in assets:
+            qr_cache.put(item_key(asset.qr_code), QREntry(asset.id, "asset", {"code": asset.asset_code, "name": asset.name}))
+            items[asset.qr_code] = (asset, False)
+        kit_qrs = item_qrs - items.keys()
+        if kit_qrs:
+            kits = db.query(AssetKit).filter(
+                AssetKit.qr_code.in_(kit_qrs)
+            ).order_by(AssetKit.id).with_for_update().populate_existing().all()
+            for kit in kits:
+                qr_cache.put(item_key(kit.qr_code), QREntry(kit.id, "kit", {"code": kit.kit_code, "name": kit.name}))
+                items[kit.qr_code] = (kit, True)
+
+    edges = {}
+    for node_id in set(edge_node_ids):
+        entry = qr_cache.get(edge_key(node_id))
+        if entry:
+            edges[node_id] = entry
+    missing = set(edge_node_ids) - edges.keys()
+    if missing:
+        for edge in db.query(EdgeNode).filter(EdgeNode.node_id.in_(missing)).all():
+            entry = QREntry(edge.id, "edge_node", {"node_id": edge.node_id})
+            qr_cache.put(edge_key(edge.node_id), entry)
+            edges[edge.node_id] = entry
+
+    return workers, items, edges
+
+
+def scan_batch(db: Session, events, chunk_size: int = BATCH_CHUNK_SIZE):
+    """Apply many scan events in capture order.
+
+    `events` are ScanEvent-like objects. They are applied oldest first (events
+    without a timestamp keep their position at the end) using each event's
+    own timestamp as the transition time. Every event runs in a savepoint, so
+    a rejected scan does not affect its neighbours, and the session commits
+    once per `chunk_size` events. Events whose scan_id was already applied
+    replay their stored result. A database error (deadlock, serialization
+    failure) rolls back the current chunk and stops there: its events and all
+    later ones get a 503 result with `retryable: true`, earlier chunks stay
+    committed. Returns one result dict per event, in the order the events
+    were given.
+    """
+    workers, items, edges = resolve_batch(
+        db,
+        [e.worker_qr for e in events],
+        [e.asset_qr for e in events],
+        [e.edge_node_id for e in events if e.edge_node_id],
+    )
+
+    received_at = get_utc_now()
+
+    def event_time(event):
+        ts = event.timestamp
+        if ts is None:
+            return received_at
+        return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+    order = sorted(range(len(events)), key=lambda i: (events[i].timestamp is None, event_time(events[i])))
+    results = [None] * len(events)
+
+    # Scans already applied by an earlier (retried) request, or earlier in this batch
+    scan_ids = {e.scan_id for e in events if e.scan_id is not None}
+    done = {}
+    if scan_ids:
+        for prior in db.query(ScanRequest).filter(ScanRequest.scan_id.in_(scan_ids)).all():
+            done[prior.scan_id] = (prior.action.value, prior.record_id, prior.request_hash)
+
+    for start in range(0, len(order), chunk_size):
+        try:
+            _apply_chunk(db, events, order[start:start + chunk_size], results, done,
+                         workers, items, edges, event_time)
+            db.commit()
+        except DBAPIError:
+            # Deadlock, serialization failure, a kit member locked by a single
+            # scan, lost connection: the chunk is rolled back as a whole and it
+            # and every later event are reported retryable, so a resend applies
+            # them in capture order (scan_ids make it safe)
+            db.rollback()
+            for i in order[start:]:
+                results[i] = {"index": i, "success": False, "status_code": 503, "retryable": True,
+                              "error": "Database conflict, scan not applied. Please resend."}
+                metrics.count_scan(503)
+            break
+        if start + chunk_size < len(order):
+            _reload_items(db, items.values())
+
+    return results
+
+
+def _apply_chunk(db: Session, events, chunk, results, done, workers, items, edges, event_time):
+    """Apply the events at indexes `chunk`, each in its own savepoint. Does not commit."""
+    for i in chunk:
+        event = events[i]
+        fingerprint = _scan_hash(event.worker_qr, event.asset_qr, event.event_type, event.edge_node_id)
+        if event.scan_id in done:
+            action, record_id, stored_hash = done[event.scan_id]
+            try:
+                _check_reuse(event.scan_id, stored_hash, fingerprint)
+            except HTTPException as e:
+                results[i] = {"index": i, "success": False, "status_code": e.status_code, "error": e.detail}
+                metrics.count_scan(e.status_code)
+                continue
+            results[i] = {"index": i, "success": True, "action": action, "record_id": str(record_id)}
+            metrics.count_scan("REPLAYED")
+            continue
+        try:
+            worker = workers.get(event.worker_qr)
+            if worker is None:
+                raise HTTPException(status_code=404, detail=f"Worker QR '{event.worker_qr}' not found or inactive")
+            if event.asset_qr not in items:
+                raise HTTPException(status_code=404, detail=f"Asset/Kit QR '{event.asset_qr}' not found")
+            item, is_kit = items[event.asset_qr]
+
+            # Savepoint: flushed on success so later events in the chunk
+            # see this one's record, rolled back on rejection
+            with db.begin_nested():
+                action = _scan_action(item, event.event_type)
+                apply = _apply_return if action == "RETURN" else _apply_checkout
+                record = apply(db, worker, item, is_kit, edges.get(event.edge_node_id),
+                               event_time(event), event.notes)
+                _remember(db, event.scan_id, fingerprint, action, record)
+        except HTTPException as e:
+            results[i] = {"index": i, "success": False, "status_code": e.status_code, "error": e.detail}
+            metrics.count_scan(e.status_code)
+            continue
+        except IntegrityError:
+            # Same scan_id committed concurrently by another request
+            prior = db.get(ScanRequest, event.scan_id) if event.scan_id else None
+            if prior is None:
+                raise
+            done[prior.scan_id] = (prior.action.value, prior.record_id, prior.request_hash)
+            if prior.request_hash != fingerprint:
+                results[i] = {"index": i, "success": False, "status_code": 422,
+                              "error": f"scan_id {event.scan_id} was already used for a different scan."}
+                metrics.count_scan(422)
+                continue
+            results[i] = {"index": i, "success": True, "action": prior.action.value,
+                          "record_id": str(prior.record_id)}
+            metrics.count_scan("REPLAYED")
+            continue
+        if event.scan_id is not None:
+            done[event.scan_id] = (action, record.id, fingerprint)
+        results[i] = {"index": i, "success": True, "action": action, "record_id": str(record.id)}
+        metrics.count_scan(action)
+
+
+def _reload_items(db: Session, items):
+    """Re-lock and refresh the item rows released by a commit, one query per type."""
+    asset_ids = [inspect(item).identity[0] for item, is_kit in items if not is_kit]
+    kit_ids = [inspect(item).identity[0] for item, is_kit in items if is_kit]
+    if asset_ids:
+        db.query(Asset).filter(Asset.id.in_(asset_ids)).order_by(Asset.id).with_for_update().populate_existing().all()
+    if kit_ids:
+        db.query(AssetKit).filter(AssetKit.id.in_(kit_ids)).order_by(AssetKit.id).with_for_update().populate_existing().all()
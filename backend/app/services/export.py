@@ -0,0 +1,188 @@
+"""
+Streaming export of custody history and the audit log (CSV or NDJSON).
+
+The export query runs on a server-side cursor (yield_per → psycopg2 named
+cursor) and rows are encoded EXPORT_CHUNK_SIZE at a time into one body chunk,
+optionally through a gzip stream. Memory therefore stays flat however many
+rows match, unlike the paged /custody/history and /audit lists.
+
+Rows come oldest first, filtered on the partition key (checked_out_at /
+created_at, `since` inclusive, `until` exclusive), so a date range only
+touches the matching monthly partitions. Months archived by
+partitions.archive_old_partitions() are gone from the tables; the routes
+refuse ranges that overlap one (partitions.archived_months()).
+
+The body is produced while the response is being sent, after the route's
+dependencies have exited, so stream() owns its session and closes it when
+the export ends or the client goes away. On the primary that session comes
+from the capped export pool (database.export_engine), so slow downloads
+cannot use up the request pool. A long export on a read replica can
+be cancelled by replay conflicts (max_standby_streaming_delay); the client
+then gets a truncated body and should retry.
+"""
+import csv
+import enum
+import io
+import zlib
+from datetime import date, datetime, timezone
+from typing import Iterator, Optional
+from uuid import UUID
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.orm import Session, aliased
+
+from app.core import responses
+from app.core.config import settings
+from app.models.models import Asset, AssetKit, AuditLog, CustodyRecord, Worker
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def custody_query(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    asset_id: Optional[UUID] = None,
+    kit_id: Optional[UUID] = None,
+    worker_id: Optional[UUID] = None,
+) -> Select:
+    override_worker = aliased(Worker)
+    q = select(
+        CustodyRecord.id,
+        CustodyRecord.event_type,
+        func.coalesce(Asset.asset_code, AssetKit.kit_code).label("item_code"),
+        func.coalesce(Asset.name, AssetKit.name).label("item_name"),
+        CustodyRecord.asset_id,
+        CustodyRecord.kit_id,
+        CustodyRecord.worker_id,
+        Worker.employee_id.label("worker_employee_id"),
+        Worker.full_name.label("worker_name"),
+        CustodyRecord.edge_node_id,
+        CustodyRecord.checked_out_at,
+        CustodyRecord.expected_return_at,
+        CustodyRecord.returned_at,
+        CustodyRecord.is_overdue,
+        CustodyRecord.overdue_hours,
+        CustodyRecord.is_override,
+        override_worker.employee_id.label("override_by_employee_id"),
+        CustodyRecord.override_reason,
+        CustodyRecord.notes,
+    ).outerjoin(Worker, Worker.id == CustodyRecord.worker_id) \
+        .outerjoin(override_worker, override_worker.id == CustodyRecord.override_by) \
+        .outerjoin(Asset, Asset.id == CustodyRecord.asset_id) \
+        .outerjoin(AssetKit, AssetKit.id == CustodyRecord.kit_id)
+    if since:
+        q = q.where(CustodyRecord.checked_out_at >= since)
+    if until:
+        q = q.where(CustodyRecord.checked_out_at < until)
+    if asset_id:
+        q = q.where(CustodyRecord.asset_id == asset_id)
+    if kit_id:
+        q = q.where(CustodyRecord.kit_id == kit_id)
+    if worker_id:
+        q = q.where(CustodyRecord.worker_id == worker_id)
+    return q.order_by(CustodyRecord.checked_out_at, CustodyRecord.id)
+
+
+def audit_query(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    entity_type: Optional[str] = None,
+    entity_id: Optional[UUID] = None,
+) -> Select:
+    q = select(
+        AuditLog.id,
+        AuditLog.created_at,
+        AuditLog.entity_type,
+        AuditLog.entity_id,
+        AuditLog.event_type,
+        AuditLog.old_state,
+        AuditLog.new_state,
+        AuditLog.changed_by,
+        AuditLog.edge_node_id,
+        AuditLog.ip_address,
+        AuditLog.notes,
+    )
+    if since:
+        q = q.where(AuditLog.created_at >= since)
+    if until:
+        q = q.where(AuditLog.created_at < until)
+    if entity_type:
+        q = q.where(AuditLog.entity_type == entity_type)
+    if entity_id:
+        q = q.where(AuditLog.entity_id == entity_id)
+    return q.order_by(AuditLog.created_at, AuditLog.id)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return responses.dumps(value).decode()
+    return value
+
+
+class _CsvEncoder:
+    def __init__(self, columns: list):
+        self.columns = columns
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def _drain(self) -> bytes:
+        data = self.buffer.getvalue().encode()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+    def header(self) -> bytes:
+        self.writer.writerow(self.columns)
+        return self._drain()
+
+    def rows(self, rows) -> bytes:
+        self.writer.writerows([_csv_value(v) for v in row] for row in rows)
+        return self._drain()
+
+
+class _NdjsonEncoder:
+    def __init__(self, columns: list):
+        self.columns = columns
+
+    def header(self) -> bytes:
+        return b""
+
+    def rows(self, rows) -> bytes:
+        return b"".join(responses.dumps(dict(zip(self.columns, row))) + b"\n" for row in rows)
+
+
+ENCODERS = {"csv": _CsvEncoder, "ndjson": _NdjsonEncoder}
+
+
+def stream(db: Session, query: Select, fmt: str, gzip: bool = False) -> Iterator[bytes]:
+    """Body chunks of `query` exported as `fmt`; closes `db` when done."""
+    try:
+        result = db.execute(query.execution_options(yield_per=settings.EXPORT_CHUNK_SIZE))
+        encoder = ENCODERS[fmt](list(result.keys()))
+        compressor = zlib.compressobj(settings.EXPORT_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if gzip else None
+
+        def emit(data: bytes) -> bytes:
+            return compressor.compress(data) if compressor else data
+
+        head = emit(encoder.header())
+        if head:
+            yield head
+        for rows in result.partitions():
+            chunk = emit(encoder.rows(rows))
+            # gzip may hold a small chunk back; skip empty writes
+            if chunk:
+                yield chunk
+        if compressor:
+            yield compressor.flush()
+    finally:
+        db.close()
+
+
+def filename(name: str, fmt: str, gzip: bool = False) -> str:
+    return f"{name}-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.{fmt}" + (".gz" if gzip else "")
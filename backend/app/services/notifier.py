@@ -0,0 +1,263 @@
+"""
+Alert notification dispatcher.
+
+Runs out of band as a scheduler job (ALERT_NOTIFY_ENABLED) and never inside
+the transaction that raised an alert. Each pass:
+
+1. claims up to ALERT_NOTIFY_BATCH_SIZE open, undelivered alerts with
+   FOR UPDATE SKIP LOCKED and leases them (notify_next_at) for
+   ALERT_NOTIFY_LEASE_SECONDS in a short transaction of its own, so two
+   dispatchers never pick the same alert and no row lock is held while
+   talking to SMTP;
+2. resolves recipients from the alert's rule, or else from the active rules
+   matching its type (and severity, when one matches): the rule's
+   notify_email plus active workers with an email in one of its notify_roles;
+3. sends one digest email per recipient over a single SMTP connection;
+4. records notified_at / notification_channels, or bumps notify_attempts and
+   retries with exponential backoff up to ALERT_NOTIFY_MAX_ATTEMPTS.
+
+An alert counts as delivered once any of its recipients accepted it; the
+recipients that failed are noted in notify_error. Alerts without recipients
+are marked delivered on no channel.
+
+For local testing run an SMTP stand-in (`docker compose --profile mail up
+mailpit`, UI on :8025) with SMTP_HOST=mailpit SMTP_PORT=1025
+SMTP_STARTTLS=false, then `python -m app.services.notifier` for one pass.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+from email.message import EmailMessage
+from typing import Optional
+
+import aiosmtplib
+from sqlalchemy import text, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import Alert, AlertRule, Worker
+
+logger = logging.getLogger("act-backend.notifier")
+
+CHANNEL_EMAIL = "email"
+RETRY_BASE_SECONDS = 60
+
+_CLAIM = text("""
+    UPDATE alerts
+    SET notify_next_at = :lease_until
+    WHERE id IN (
+        SELECT id FROM alerts
+        WHERE notified_at IS NULL
+          AND status = 'OPEN'
+          AND notify_attempts < :max_attempts
+          AND (notify_next_at IS NULL OR notify_next_at <= :now)
+        ORDER BY created_at
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, rule_id, alert_type, severity, title, message, created_at, notify_attempts
+""")
+
+_SEVERITY_ORDER = {"CRITICAL": 0, "WARNING": 1, "INFO": 2}
+
+
+def get_utc_now():
+    return datetime.now(timezone.utc)
+
+
+def claim_batch(db: Session, limit: int) -> list:
+    now = get_utc_now()
+    rows = db.execute(_CLAIM, {
+        "now": now,
+        "lease_until": now + timedelta(seconds=settings.ALERT_NOTIFY_LEASE_SECONDS),
+        "max_attempts": settings.ALERT_NOTIFY_MAX_ATTEMPTS,
+        "limit": limit,
+    }).all()
+    db.commit()
+    return sorted(rows, key=lambda a: (_SEVERITY_ORDER.get(a.severity, 9), a.created_at))
+
+
+def resolve_recipients(db: Session, alerts) -> dict:
+    """alert id -> set of email addresses."""
+    rules = db.query(AlertRule).filter(AlertRule.is_active).all()
+    roles = {role for rule in rules for role in (rule.notify_roles or ())}
+    emails_by_role = defaultdict(set)
+    if roles:
+        for role, email in db.query(Worker.role, Worker.email).filter(
+            Worker.is_active, Worker.email.isnot(None), Worker.role.in_(roles)
+        ):
+            emails_by_role[role].add(email)
+
+    def rule_emails(rule) -> set:
+        emails = set(rule.notify_email or ())
+        for role in rule.notify_roles or ():
+            emails |= emails_by_role[role]
+        return emails
+
+    rules_by_id = {rule.id: rule for rule in rules}
+    recipients = {}
+    for alert in alerts:
+        if alert.rule_id:
+            matched = [rules_by_id[alert.rule_id]] if alert.rule_id in rules_by_id else []
+        else:
+            of_type = [r for r in rules if r.alert_type == alert.alert_type]
+            matched = [r for r in of_type if r.severity == alert.severity] or of_type
+        recipients[alert.id] = set().union(*(rule_emails(r) for r in matched))
+    return recipients
+
+
+def build_digest(recipient: str, alerts: list) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = settings.ALERT_EMAIL_FROM
+    msg["To"] = recipient
+    if len(alerts) == 1:
+        msg["Subject"] = f"[ACT] {alerts[0].title}"
+    else:
+        critical = sum(1 for a in alerts if a.severity == "CRITICAL")
+        msg["Subject"] = f"[ACT] {len(alerts)} new alerts" + (f" ({critical} critical)" if critical else "")
+    msg.set_content("\n\n".join(
+        f"{a.title}\n{a.message}\nRaised {a.created_at.astimezone(timezone.utc):%Y-%m-%d %H:%M} UTC"
+        for a in alerts
+    ) + "\n\n— ACT System\n")
+    return msg
+
+
+class Mailer:
+    """One SMTP connection reused for every message of a pass (reconnects once if dropped)."""
+
+    def __init__(self):
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._down: Optional[Exception] = None
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            start_tls=settings.SMTP_STARTTLS,
+            timeout=settings.SMTP_TIMEOUT_SECONDS,
+        )
+        await smtp.connect()
+        if settings.SMTP_USER:
+            await smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD or "")
+        return smtp
+
+    async def send(self, message: EmailMessage):
+        if self._down:
+            raise self._down   # fail the rest of the pass fast instead of timing out per message
+        for attempt in (1, 2):
+            if self._smtp is None:
+                try:
+                    self._smtp = await self._connect()
+                except (aiosmtplib.SMTPException, OSError) as e:
+                    self._down = e
+                    raise
+            try:
+                await self._smtp.send_message(message)
+                return
+            except aiosmtplib.SMTPServerDisconnected:
+                self._smtp = None
+                if attempt == 2:
+                    raise
+
+    async def close(self):
+        if self._smtp is not None:
+            try:
+                await self._smtp.quit()
+            except (aiosmtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+
+async def _send_batch(mailer: Mailer, alerts: list, recipients: dict) -> dict:
+    """Send one digest per recipient; returns alert id -> {recipient: error or None}."""
+    by_recipient = defaultdict(list)
+    for alert in alerts:
+        for email in recipients[alert.id]:
+            by_recipient[email].append(alert)
+
+    outcome = defaultdict(dict)
+    for email, its_alerts in sorted(by_recipient.items()):
+        try:
+            await mailer.send(build_digest(email, its_alerts))
+            error = None
+        except (aiosmtplib.SMTPException, OSError) as e:
+            error = str(e) or type(e).__name__
+            logger.warning(f"Alert digest to {email} failed: {error}")
+        for alert in its_alerts:
+            outcome[alert.id][email] = error
+    return outcome
+
+
+def _record(db: Session, alerts: list, outcome: dict) -> tuple:
+    now = get_utc_now()
+    updates, delivered, failed = [], 0, 0
+    for alert in alerts:
+        sent = outcome.get(alert.id, {})
+        errors = {email: err for email, err in sent.items() if err}
+        if sent and len(errors) == len(sent):
+            attempts = alert.notify_attempts + 1
+            updates.append({
+                "id": alert.id,
+                "notify_attempts": attempts,
+                "notify_next_at": now + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (attempts - 1)),
+                "notify_error": json.dumps(errors)[:2000],
+            })
+            failed += 1
+        else:
+            updates.append({
+                "id": alert.id,
+                "notified_at": now,
+                "notification_channels": [CHANNEL_EMAIL] if sent else [],
+                "notify_next_at": None,
+                "notify_error": json.dumps(errors)[:2000] if errors else None,
+            })
+            delivered += 1
+    # Grouped by key set: a bulk UPDATE by primary key needs the same columns per row
+    for keys in {tuple(u) for u in updates}:
+        db.execute(update(Alert), [u for u in updates if tuple(u) == keys])
+    db.commit()
+    return delivered, failed
+
+
+async def _dispatch(db: Session) -> dict:
+    result = {"alerts_claimed": 0, "delivered": 0, "failed": 0, "emails_sent": 0, "emails_failed": 0}
+    mailer = Mailer()
+    try:
+        while True:
+            alerts = claim_batch(db, settings.ALERT_NOTIFY_BATCH_SIZE)
+            if not alerts:
+                break
+            recipients = resolve_recipients(db, alerts)
+            outcome = await _send_batch(mailer, alerts, recipients)
+            delivered, failed = _record(db, alerts, outcome)
+
+            digests = {}
+            for sent in outcome.values():
+                digests.update(sent)
+            result["alerts_claimed"] += len(alerts)
+            result["delivered"] += delivered
+            result["failed"] += failed
+            result["emails_sent"] += sum(1 for err in digests.values() if err is None)
+            result["emails_failed"] += sum(1 for err in digests.values() if err)
+            if len(alerts) < settings.ALERT_NOTIFY_BATCH_SIZE:
+                break
+    finally:
+        await mailer.close()
+    return result
+
+
+def dispatch_notifications(db: Session) -> dict:
+    """One dispatcher pass (blocking; runs in a scheduler thread)."""
+    return asyncio.run(_dispatch(db))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    session = SessionLocal()
+    try:
+        print(json.dumps(dispatch_notifications(session), indent=2))
+    finally:
+        session.close()
@@ -0,0 +1,173 @@
+"""
+Partition maintenance for custody_records and audit_log.
+
+Both tables are range-partitioned by UTC month (<table>_pYYYYMM, see
+postgres/init/01_schema.sql). ensure_partitions() keeps the coming months
+created ahead of time. archive_old_partitions() detaches months older than
+ARCHIVE_AFTER_MONTHS, exports each to <ARCHIVE_DIR>/<partition>.csv.gz and
+drops it, so the live tables and their indexes only hold recent data; the
+months archived_months() reports are only in those files.
+"""
+import gzip
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core import cache
+from app.core.config import settings
+
+logger = logging.getLogger("act-backend.partitions")
+
+# parent table -> column that must be NULL-free before a month may be archived
+PARTITIONED_TABLES = {
+    "custody_records": "returned_at",   # never archive a month with tools still out
+    "audit_log": None,
+}
+
+
+def ensure_partitions(db: Session, months_ahead: int = None) -> dict:
+    """Create any missing monthly partitions from the current month onwards."""
+    months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    created = {}
+    for table in PARTITIONED_TABLES:
+        created[table] = db.execute(
+            text("SELECT ensure_monthly_partitions(:parent, 0, :ahead)"),
+            {"parent": table, "ahead": months_ahead},
+        ).scalar()
+    db.commit()
+    return created
+
+
+def _month_index(dt: datetime) -> int:
+    return dt.year * 12 + dt.month - 1
+
+
+def _cutoff_index(after_months: int) -> int:
+    return _month_index(datetime.now(timezone.utc)) - after_months
+
+
+def _month_start(index: int) -> datetime:
+    year, month = divmod(index, 12)
+    return datetime(year, month + 1, 1, tzinfo=timezone.utc)
+
+
+def _attached_months(db: Session, parent: str) -> set:
+    names = db.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        JOIN pg_namespace n ON n.oid = p.relnamespace
+        WHERE n.nspname = current_schema() AND p.relname = :parent
+    """), {"parent": parent}).scalars()
+    months = set()
+    for name in names:
+        yyyymm = re.search(r"_p(\d{4})(\d{2})$", name)
+        if yyyymm:
+            months.add(int(yyyymm.group(1)) * 12 + int(yyyymm.group(2)) - 1)
+    return months
+
+
+def _archived(attached: set, cutoff: int) -> tuple:
+    # Months are created contiguously, so below the cutoff a missing month was
+    # archived; months skipped for open custody records are still attached
+    old = [m for m in attached if m < cutoff]
+    oldest = min(old) if old else cutoff
+    gaps = [m for m in range(oldest, cutoff) if m not in attached]
+    return oldest, gaps
+
+
+def archived_months(db: Session, parent: str) -> Optional[tuple]:
+    """(before, gaps) of `parent`, or None when archiving is off: every month
+    before `before` and the months starting at `gaps` are only in the archive
+    files. Read from the partitions still attached, so months skipped by
+    archive_old_partitions() stay exportable."""
+    if not settings.ARCHIVE_ENABLED:
+        return None
+    oldest, gaps = _archived(_attached_months(db, parent), _cutoff_index(settings.ARCHIVE_AFTER_MONTHS))
+    return _month_start(oldest), [_month_start(m) for m in gaps]
+
+
+def first_archived(archived: tuple, since: datetime, until: Optional[datetime]) -> Optional[datetime]:
+    """Start of the first archived month overlapping [since, until), if any."""
+    before, gaps = archived
+    if since < before:
+        return _month_start(_month_index(since))
+    for start in gaps:
+        end = _month_start(_month_index(start) + 1)
+        if since < end and (until is None or start < until):
+            return start
+    return None
+
+
+def _archivable(db: Session, parent: str, cutoff: int) -> list:
+    """Monthly tables of `parent` (attached or left detached by a failed run) older than cutoff."""
+    rows = db.execute(text("""
+        SELECT c.relname, c.relispartition
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = current_schema()
+          AND c.relkind = 'r'
+          AND c.relname ~ :pattern
+        ORDER BY c.relname
+    """), {"pattern": f"^{parent}_p[0-9]{{6}}$"}).all()
+    result = []
+    for name, attached in rows:
+        yyyymm = re.search(r"_p(\d{4})(\d{2})$", name)
+        if int(yyyymm.group(1)) * 12 + int(yyyymm.group(2)) - 1 < cutoff:
+            result.append((name, attached))
+    return result
+
+
+def _export(db: Session, table: str, path: str) -> int:
+    """COPY a table to a gzipped CSV (written to a temp name, renamed when complete)."""
+    tmp_path = path + ".tmp"
+    cursor = db.connection().connection.cursor()
+    try:
+        with open(tmp_path, "wb") as raw:
+            with gzip.open(raw, "wt", encoding="utf-8") as out:
+                cursor.copy_expert(f'COPY (SELECT * FROM "{table}") TO STDOUT WITH (FORMAT csv, HEADER)', out)
+                rows = cursor.rowcount
+            raw.flush()
+            os.fsync(raw.fileno())
+    finally:
+        cursor.close()
+    os.replace(tmp_path, path)
+    return rows
+
+
+def archive_old_partitions(db: Session, after_months: int = None, archive_dir: str = None) -> dict:
+    """Detach, export and drop partitions older than `after_months` months."""
+    after_months = settings.ARCHIVE_AFTER_MONTHS if after_months is None else after_months
+    archive_dir = archive_dir or settings.ARCHIVE_DIR
+    os.makedirs(archive_dir, exist_ok=True)
+
+    cutoff = _cutoff_index(after_months)
+    archived, skipped = [], []
+    for parent, open_column in PARTITIONED_TABLES.items():
+        for name, attached in _archivable(db, parent, cutoff):
+            if open_column and db.execute(
+                text(f'SELECT EXISTS (SELECT 1 FROM "{name}" WHERE {open_column} IS NULL)')
+            ).scalar():
+                skipped.append(name)
+                logger.warning(f"Not archiving {name}: it still has rows with {open_column} IS NULL")
+                continue
+
+            if attached:
+                db.execute(text(f'ALTER TABLE "{parent}" DETACH PARTITION "{name}"'))
+                cache.touch(db, parent)
+                db.commit()
+
+            path = os.path.join(archive_dir, f"{name}.csv.gz")
+            rows = _export(db, name, path)
+            db.execute(text(f'DROP TABLE "{name}"'))
+            db.commit()
+            archived.append({"partition": name, "rows": rows, "file": path})
+            logger.info(f"Archived {name}: {rows} rows -> {path}")
+
+    return {"archived": archived, "skipped": skipped}
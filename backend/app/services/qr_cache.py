@@ -0,0 +1,131 @@
+"""
+In-process QR resolution cache.
+
+Maps scanned QR codes (and edge node ids) to the entity they identify plus a
+few static attributes, so a scan does not spend 3-4 lookups before any real
+work. Only data that practically never changes is cached; mutable state such
+as asset.state is always read from the DB. Entries expire after a TTL and the
+least recently used entry is evicted once the cache is full.
+
+Writes that change cached data must call one of the invalidate_* helpers
+after committing. They drop the entries here and broadcast the keys over the
+live events' Redis pub/sub, so every other worker process drops them too.
+While Redis is unreachable other processes converge within the TTL, and a
+process whose subscription was lost clears its cache on reconnecting. The
+override path re-reads the supervisor's role regardless.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+from uuid import UUID
+
+from app.core import events
+from app.core.config import settings
+
+INVALIDATE_CHANNEL = "act:qr-invalidate"
+
+
+@dataclass(frozen=True)
+class QREntry:
+    id: UUID
+    type: str                     # worker | asset | kit | edge_node
+    attrs: dict = field(default_factory=dict)
+
+
+class QRCache:
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple[float, QREntry]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[QREntry]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, entry = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: QREntry):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+qr_cache = QRCache(settings.QR_CACHE_MAX_ENTRIES, settings.QR_CACHE_TTL_SECONDS)
+
+
+def worker_key(qr_code: str) -> str:
+    return f"worker:{qr_code}"
+
+
+def item_key(qr_code: str) -> str:
+    return f"item:{qr_code}"
+
+
+def edge_key(node_id: str) -> str:
+    return f"edge:{node_id}"
+
+
+def _invalidate(keys: list):
+    for key in keys:
+        qr_cache.invalidate(key)
+    if keys:
+        events.broadcast(INVALIDATE_CHANNEL, json.dumps(keys))
+
+
+def invalidate_worker(*qr_codes: str):
+    _invalidate([worker_key(qr) for qr in qr_codes])
+
+
+def invalidate_item(*qr_codes: str):
+    _invalidate([item_key(qr) for qr in qr_codes])
+
+
+def _on_invalidate(payload: Optional[str]):
+    if payload is None:
+        qr_cache.clear()     # invalidations may have been missed
+        return
+    for key in json.loads(payload):
+        qr_cache.invalidate(key)
+
+
+events.hub.on_channel(INVALIDATE_CHANNEL, _on_invalidate)
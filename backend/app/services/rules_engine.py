@@ -1,7 +1,10 @@
 from datetime import datetime, timezone, timedelta
+from sqlalchemy import text
 from sqlalchemy.orm import Session
+from app.core import cache, events
+from app.services.alert_rules import CompiledRules, RULES_TABLE, get_compiled_rules
 from app.models.models import (
-    Asset, AssetKit, CustodyRecord, Alert, AlertRule,
+    Asset, AssetKit, CustodyRecord, Alert, AlertRule, RulesJobState,
     AssetState, CalibrationStatus, AlertType, AlertSeverity, AlertStatus
 )
 
@@ -10,159 +13,293 @@ def get_utc_now():
     return datetime.now(timezone.utc)
 
 
+_FLAG_OVERDUE_RECORDS = text("""
+    UPDATE custody_records
+    SET is_overdue = TRUE,
+        overdue_flagged_at = COALESCE(overdue_flagged_at, :now),
+        overdue_hours = ROUND(EXTRACT(EPOCH FROM (:now - expected_return_at)) / 3600, 2)
+    WHERE returned_at IS NULL
+      AND expected_return_at < :now
+""")
+
+_MARK_ASSETS_OVERDUE = text("""
+    UPDATE assets
+    SET state = 'OVERDUE', updated_at = :now
+    FROM custody_records cr
+    WHERE cr.asset_id = assets.id
+      AND cr.returned_at IS NULL
+      AND cr.is_overdue
+      AND assets.state = 'IN_CUSTODY'
+""")
+
+_MARK_KITS_OVERDUE = text("""
+    UPDATE asset_kits
+    SET state = 'OVERDUE', updated_at = :now
+    FROM custody_records cr
+    WHERE cr.kit_id = asset_kits.id
+      AND cr.returned_at IS NULL
+      AND cr.is_overdue
+      AND asset_kits.state = 'IN_CUSTODY'
+""")
+
+# Members that went out with an overdue kit (not on a record of their own)
+_MARK_KIT_MEMBERS_OVERDUE = text("""
+    UPDATE assets
+    SET state = 'OVERDUE', updated_at = :now
+    FROM custody_records cr
+    JOIN kit_members km ON km.kit_id = cr.kit_id
+    WHERE km.asset_id = assets.id
+      AND cr.returned_at IS NULL
+      AND cr.is_overdue
+      AND assets.state = 'IN_CUSTODY'
+      AND NOT EXISTS (
+          SELECT 1 FROM custody_records own
+          WHERE own.asset_id = assets.id AND own.returned_at IS NULL
+      )
+""")
+
+# Each open overdue record is matched against the compiled OVERDUE_RETURN
+# rules in one pass (rule_idx); the most severe matching rule wins. An open
+# alert of the same or higher severity for the record suppresses a new one.
+_INSERT_OVERDUE_ALERTS = """
+    WITH {worker_overdue}matched AS (
+        SELECT cr.id, cr.asset_id, cr.kit_id, cr.worker_id, cr.overdue_hours,
+               COALESCE(a.name, k.name) AS item_name,
+               COALESCE(a.asset_code, k.kit_code) AS item_code,
+               {rule_case} AS rule_idx
+        FROM custody_records cr
+        LEFT JOIN assets a ON a.id = cr.asset_id
+        LEFT JOIN asset_kits k ON k.id = cr.kit_id
+        LEFT JOIN workers w ON w.id = cr.worker_id
+        {worker_overdue_join}
+        WHERE cr.returned_at IS NULL
+          AND cr.is_overdue
+          AND COALESCE(a.id, k.id) IS NOT NULL
+    )
+    INSERT INTO alerts (rule_id, alert_type, severity, status, asset_id, kit_id, custody_record_id, worker_id, title, message)
+    SELECT r.rule_id, r.alert_type, r.severity, 'OPEN', m.asset_id, m.kit_id, m.id, m.worker_id,
+           r.severity::text || ': ' || m.item_name
+               || ' overdue by ' || to_char(m.overdue_hours, 'FM999990.0') || 'h',
+           'Asset ''' || m.item_code || ''' was expected back '
+               || to_char(m.overdue_hours, 'FM999990.0') || ' hours ago. '
+               || 'Worker ID: ' || m.worker_id || '. Please follow up immediately.'
+    FROM matched m
+    JOIN {rules} ON r.idx = m.rule_idx
+    WHERE NOT EXISTS (
+        SELECT 1 FROM alerts al
+        WHERE al.alert_type = 'OVERDUE_RETURN'
+          AND al.status = 'OPEN'
+          AND al.custody_record_id = m.id
+          AND al.severity >= r.severity
+    )
+"""
+
+# Overdue returns per worker inside each repeat window the rules use
+_WORKER_OVERDUE = """worker_overdue AS (
+        SELECT worker_id, {counts}
+        FROM custody_records
+        WHERE is_overdue
+          AND checked_out_at >= :now - make_interval(days => {widest})
+        GROUP BY worker_id
+    ),
+    """
+
+
+def _overdue_alerts_sql(rules: CompiledRules) -> str:
+    worker_overdue, join = "", ""
+    if rules.repeat_windows:
+        counts = ", ".join(
+            f"count(*) FILTER (WHERE checked_out_at >= :now - make_interval(days => {days})) AS overdue_{days}d"
+            for days in rules.repeat_windows
+        )
+        worker_overdue = _WORKER_OVERDUE.format(counts=counts, widest=max(rules.repeat_windows))
+        join = "LEFT JOIN worker_overdue wo ON wo.worker_id = cr.worker_id"
+    return _INSERT_OVERDUE_ALERTS.format(
+        worker_overdue=worker_overdue,
+        worker_overdue_join=join,
+        rule_case=rules.overdue.case_sql,
+        rules=RULES_TABLE,
+    )
+
+
 def run_overdue_check(db: Session):
-    """Flag assets/kits overdue for return and create alerts."""
+    """Flag assets/kits overdue for return and create alerts.
+
+    Runs as a handful of set-based statements (flag records, move items and
+    the members of overdue kits to OVERDUE, insert missing alerts), so the
+    number of round trips does not grow with the number of open custody
+    records. Alerts come from the active OVERDUE_RETURN rules
+    (app/services/alert_rules.py), all evaluated by the one INSERT.
+    """
     now = get_utc_now()
-    created_count = 0
 
-    open_records = db.query(CustodyRecord).filter(
-        CustodyRecord.returned_at == None,
-        CustodyRecord.expected_return_at != None,
-    ).all()
-
-    for record in open_records:
-        expected = record.expected_return_at
-        if expected.tzinfo is None:
-            expected = expected.replace(tzinfo=timezone.utc)
-
-        if now <= expected:
-            continue  # Not yet overdue
-
-        overdue_delta = now - expected
-        overdue_hours = round(overdue_delta.total_seconds() / 3600, 2)
-
-        # Update record
-        if not record.is_overdue:
-            record.is_overdue = True
-            record.overdue_flagged_at = now
-        record.overdue_hours = overdue_hours
-
-        # Update asset state
-        item = None
-        if record.asset_id:
-            item = db.query(Asset).filter(Asset.id == record.asset_id).first()
-        elif record.kit_id:
-            item = db.query(AssetKit).filter(AssetKit.id == record.kit_id).first()
-
-        if item and item.state == AssetState.IN_CUSTODY:
-            item.state = AssetState.OVERDUE
-            item.updated_at = now
-
-        # Create alert if not already open
-        existing_alert = db.query(Alert).filter(
-            Alert.alert_type == AlertType.OVERDUE_RETURN,
-            Alert.status == AlertStatus.OPEN,
-            Alert.custody_record_id == record.id,
-        ).first()
-
-        if not existing_alert and item:
-            severity = AlertSeverity.CRITICAL if overdue_hours >= 8 else AlertSeverity.WARNING
-            alert = Alert(
-                alert_type=AlertType.OVERDUE_RETURN,
-                severity=severity,
-                status=AlertStatus.OPEN,
-                custody_record_id=record.id,
-                worker_id=record.worker_id,
-                title=f"{'CRITICAL' if severity == AlertSeverity.CRITICAL else 'WARNING'}: {item.name if hasattr(item, 'name') else 'Asset'} overdue by {overdue_hours:.1f}h",
-                message=(
-                    f"Asset '{getattr(item, 'asset_code', getattr(item, 'kit_code', ''))}' "
-                    f"was expected back {overdue_hours:.1f} hours ago. "
-                    f"Worker ID: {record.worker_id}. Please follow up immediately."
-                ),
-            )
-            if record.asset_id:
-                alert.asset_id = record.asset_id
-            else:
-                alert.kit_id = record.kit_id
-            db.add(alert)
-            created_count += 1
+    flagged = db.execute(_FLAG_OVERDUE_RECORDS, {"now": now}).rowcount
+    db.execute(_MARK_ASSETS_OVERDUE, {"now": now})
+    db.execute(_MARK_KITS_OVERDUE, {"now": now})
+    db.execute(_MARK_KIT_MEMBERS_OVERDUE, {"now": now})
+    rules = get_compiled_rules(db)
+    created_count = 0
+    if rules.overdue:
+        created_count = db.execute(
+            text(_overdue_alerts_sql(rules)), {"now": now, **rules.overdue.params}
+        ).rowcount
+    cache.touch(db, "custody_records", "assets", "asset_kits", "alerts")
+    if created_count:
+        events.emit(db, "alert", action="CREATED", alert_type="OVERDUE_RETURN", count=created_count)
 
     db.commit()
-    return {"overdue_records_processed": len(open_records), "alerts_created": created_count}
+    return {"overdue_records_processed": flagged, "alerts_created": created_count}
+
 
+CALIBRATION_JOB = "calibration_check"
 
-def run_calibration_check(db: Session):
-    """Check calibration status of all assets and update flags."""
+# Assets whose calibration_due_at crossed one of the thresholds (now, now+Nd
+# for each due-soon rule and the DUE_SOON status window) since the last run,
+# plus assets written since then: a due date set directly inside a window
+# (update_calibration, bulk import) never crosses a threshold. Every branch is
+# a range on an indexed column (idx_assets_calibration_due,
+# idx_assets_updated_at), so Postgres answers it with a BitmapOr.
+_CALIBRATION_WINDOW_BRANCH = """(a.calibration_due_at >= :since + make_interval(days => {days})
+           AND a.calibration_due_at < :now + make_interval(days => {days}))"""
+
+# updated_at is the writing transaction's start time, so a write that
+# committed after the last run's snapshot can carry an older stamp
+CALIBRATION_CHANGE_OVERLAP = timedelta(minutes=10)
+
+
+def _calibration_window(thresholds) -> str:
+    branches = "\n       OR ".join(_CALIBRATION_WINDOW_BRANCH.format(days=days) for days in thresholds)
+    return f"""
+      AND (
+          {branches}
+       OR a.updated_at >= :changed_since
+      )
+"""
+
+
+_UPDATE_CALIBRATION_STATUS = """
+    WITH candidates AS (
+        SELECT a.id, a.state AS old_state, a.calibration_status AS old_status,
+               (CASE
+                    WHEN a.calibration_due_at < :now THEN 'OVERDUE'
+                    WHEN a.calibration_due_at < :now + make_interval(days => :due_soon_days) THEN 'DUE_SOON'
+                    ELSE 'VALID'
+                END)::calibration_status AS new_status
+        FROM assets a
+        WHERE a.is_active
+          AND a.calibration_due_at IS NOT NULL
+          {window}
+        FOR UPDATE
+    ),
+    updated AS (
+        UPDATE assets
+        SET calibration_status = c.new_status,
+            state = CASE
+                WHEN c.new_status = 'OVERDUE' AND assets.state = 'AVAILABLE' THEN 'SUSPENDED'::asset_state
+                ELSE assets.state
+            END,
+            updated_at = :now
+        FROM candidates c
+        WHERE assets.id = c.id
+          AND (c.new_status <> c.old_status OR (c.new_status = 'OVERDUE' AND c.old_state = 'AVAILABLE'))
+        RETURNING c.old_status, assets.calibration_status AS new_status, c.old_state, assets.state AS new_state
+    )
+    SELECT
+        (SELECT COUNT(*) FROM candidates) AS checked,
+        COUNT(*) FILTER (WHERE old_status <> new_status) AS statuses_updated,
+        COUNT(*) FILTER (WHERE old_state <> new_state) AS suspended
+    FROM updated
+"""
+
+# Matched against the compiled calibration rules like overdue records are;
+# dedupe is per asset and alert type, by severity.
+_INSERT_CALIBRATION_ALERTS = """
+    WITH matched AS (
+        SELECT a.id, a.name, a.asset_code, a.calibration_due_at,
+               EXTRACT(DAY FROM (a.calibration_due_at - :now))::int AS days_left,
+               {rule_case} AS rule_idx
+        FROM assets a
+        WHERE a.is_active
+          AND a.calibration_due_at IS NOT NULL
+          AND a.calibration_due_at < :now + make_interval(days => :alert_days)
+          {window}
+    )
+    INSERT INTO alerts (rule_id, alert_type, severity, status, asset_id, title, message)
+    SELECT r.rule_id, r.alert_type, r.severity, 'OPEN', m.id,
+           CASE WHEN r.alert_type = 'CALIBRATION_EXPIRED'
+               THEN r.severity::text || ': ' || m.name || ' calibration expired'
+               ELSE r.severity::text || ': ' || m.name || ' calibration due in ' || m.days_left || ' days'
+           END,
+           CASE WHEN r.alert_type = 'CALIBRATION_EXPIRED'
+               THEN m.asset_code || ' (' || m.name || ') calibration expired on '
+                    || to_char(m.calibration_due_at, 'YYYY-MM-DD')
+                    || '. Asset SUSPENDED. Schedule recalibration immediately.'
+               ELSE m.asset_code || ' (' || m.name || ') is due for calibration in ' || m.days_left || ' days '
+                    || '(due ' || to_char(m.calibration_due_at, 'YYYY-MM-DD') || '). Schedule with NABL lab.'
+           END
+    FROM matched m
+    JOIN {rules} ON r.idx = m.rule_idx
+    WHERE NOT EXISTS (
+        SELECT 1 FROM alerts al
+        WHERE al.alert_type = r.alert_type
+          AND al.status = 'OPEN'
+          AND al.asset_id = m.id
+          AND al.severity >= r.severity
+    )
+"""
+
+
+def run_calibration_check(db: Session, incremental: bool = False):
+    """Check calibration status of assets and update flags.
+
+    A full run re-evaluates every active asset with a due date. An incremental
+    run only looks at assets whose due date crossed a threshold, or that were
+    written, since the watermark persisted in `rules_job_state`, so its cost
+    tracks the number of transitions and writes rather than fleet size.
+    Without a watermark, or when the alert rules or category codes differ from
+    those of the last run, it falls back to a full run.
+    """
     now = get_utc_now()
-    updated_count = 0
-    suspended_count = 0
+    rules = get_compiled_rules(db)
+
+    state = db.get(RulesJobState, CALIBRATION_JOB, with_for_update=True)
+    if state is None:
+        state = RulesJobState(job_name=CALIBRATION_JOB)
+        db.add(state)
+    since = state.last_run_at if incremental else None
+    if state.rules_fingerprint != rules.fingerprint:
+        since = None     # rules or category codes changed: every asset may match differently
+    window = _calibration_window(rules.calibration_thresholds) if since else ""
+
+    params = {
+        "now": now,
+        "since": since,
+        "changed_since": since - CALIBRATION_CHANGE_OVERLAP if since else None,
+        "alert_days": rules.alert_days,
+        "due_soon_days": rules.due_soon_status_days,
+    }
+    counts = db.execute(text(_UPDATE_CALIBRATION_STATUS.format(window=window)), params).one()
     alert_count = 0
+    if rules.calibration:
+        alert_sql = _INSERT_CALIBRATION_ALERTS.format(
+            window=window, rule_case=rules.calibration.case_sql, rules=RULES_TABLE,
+        )
+        alert_count = db.execute(text(alert_sql), {**params, **rules.calibration.params}).rowcount
 
-    assets = db.query(Asset).filter(
-        Asset.is_active == True,
-        Asset.calibration_due_at != None,
-    ).all()
-
-    for asset in assets:
-        due = asset.calibration_due_at
-        if due.tzinfo is None:
-            due = due.replace(tzinfo=timezone.utc)
-
-        old_status = asset.calibration_status
-
-        if now > due:
-            # Expired
-            asset.calibration_status = CalibrationStatus.OVERDUE
-            if asset.state == AssetState.AVAILABLE:
-                asset.state = AssetState.SUSPENDED
-                suspended_count += 1
-
-            # Create alert if not exists
-            existing = db.query(Alert).filter(
-                Alert.alert_type == AlertType.CALIBRATION_EXPIRED,
-                Alert.status == AlertStatus.OPEN,
-                Alert.asset_id == asset.id,
-            ).first()
-            if not existing:
-                db.add(Alert(
-                    alert_type=AlertType.CALIBRATION_EXPIRED,
-                    severity=AlertSeverity.CRITICAL,
-                    status=AlertStatus.OPEN,
-                    asset_id=asset.id,
-                    title=f"CRITICAL: {asset.name} calibration expired",
-                    message=(
-                        f"{asset.asset_code} ({asset.name}) calibration expired on "
-                        f"{due.date()}. Asset SUSPENDED. Schedule recalibration immediately."
-                    ),
-                ))
-                alert_count += 1
-
-        elif now > due - timedelta(days=7):
-            # Due within 7 days
-            asset.calibration_status = CalibrationStatus.DUE_SOON
-            existing = db.query(Alert).filter(
-                Alert.alert_type == AlertType.CALIBRATION_DUE_SOON,
-                Alert.status == AlertStatus.OPEN,
-                Alert.asset_id == asset.id,
-            ).first()
-            if not existing:
-                days_left = (due - now).days
-                db.add(Alert(
-                    alert_type=AlertType.CALIBRATION_DUE_SOON,
-                    severity=AlertSeverity.WARNING,
-                    status=AlertStatus.OPEN,
-                    asset_id=asset.id,
-                    title=f"WARNING: {asset.name} calibration due in {days_left} days",
-                    message=(
-                        f"{asset.asset_code} ({asset.name}) is due for calibration in {days_left} days "
-                        f"(due {due.date()}). Schedule with NABL lab."
-                    ),
-                ))
-                alert_count += 1
-
-        elif now > due - timedelta(days=30):
-            asset.calibration_status = CalibrationStatus.DUE_SOON
-        else:
-            asset.calibration_status = CalibrationStatus.VALID
-
-        if asset.calibration_status != old_status:
-            asset.updated_at = now
-            updated_count += 1
+    cache.touch(db, "assets", "alerts")
+    if counts.statuses_updated or counts.suspended:
+        events.emit(db, "calibration", statuses_updated=counts.statuses_updated, suspended=counts.suspended)
+    if alert_count:
+        events.emit(db, "alert", action="CREATED", alert_type="CALIBRATION", count=alert_count)
 
+    state.last_run_at = now
+    state.rules_fingerprint = rules.fingerprint
+    state.updated_at = now
     db.commit()
     return {
-        "assets_checked": len(assets),
-        "statuses_updated": updated_count,
-        "assets_suspended": suspended_count,
+        "mode": "incremental" if since else "full",
+        "assets_checked": counts.checked,
+        "statuses_updated": counts.statuses_updated,
+        "assets_suspended": counts.suspended,
         "alerts_created": alert_count,
     }
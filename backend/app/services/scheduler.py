@@ -0,0 +1,264 @@
+"""
+Background jobs (rules checks, partition maintenance, counter rollup) with a single leader.
+
+Every API process starts an APScheduler BackgroundScheduler, but with
+SCHEDULER_MODE=leader only the process holding the Postgres advisory lock
+LEADER_LOCK_KEY executes jobs; the others keep theirs paused. The lock is taken
+on a dedicated connection kept open while leading, so if the leader process
+or its connection dies Postgres releases the lock and another process takes
+over within SCHEDULER_LEADER_CHECK_SECONDS. A new leader runs every job at
+once instead of waiting a full interval, which also covers the startup run
+without blocking the boot path.
+
+The leader names its lock connection (application_name) after itself, so any
+process can report who leads. Every run is recorded in rules_job_runs.
+"""
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone, timedelta
+from typing import Callable, Optional
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.core import metrics, profiling
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.models.models import RulesJobRun
+from app.services.notifier import dispatch_notifications
+from app.services.partitions import ensure_partitions, archive_old_partitions
+from app.services.rules_engine import run_overdue_check, run_calibration_check
+
+logger = logging.getLogger("act-backend.scheduler")
+
+LEADER_LOCK_KEY = 4_150_001          # advisory lock id reserved for the scheduler leader
+APPLICATION_NAME_PREFIX = "act-scheduler:"
+IDENTITY = f"{socket.gethostname()}:{os.getpid()}"
+
+_CURRENT_LEADER = text("""
+    SELECT a.application_name
+    FROM pg_locks l
+    JOIN pg_stat_activity a ON a.pid = l.pid
+    WHERE l.locktype = 'advisory'
+      AND l.granted
+      AND l.classid = 0 AND l.objid = :key AND l.objsubid = 1
+""")
+
+
+def get_utc_now():
+    return datetime.now(timezone.utc)
+
+
+# ── Jobs ──────────────────────────────────────────────────────────────────────
+
+def partition_maintenance(db: Session) -> dict:
+    result = {"partitions_created": ensure_partitions(db)}
+    if settings.ARCHIVE_ENABLED:
+        result.update(archive_old_partitions(db))
+    return result
+
+
+def prune_job_runs(db: Session) -> dict:
+    cutoff = get_utc_now() - timedelta(days=settings.JOB_RUN_RETENTION_DAYS)
+    deleted = db.query(RulesJobRun).filter(RulesJobRun.started_at < cutoff).delete()
+    db.commit()
+    return {"deleted": deleted}
+
+
+def rollup_counters(db: Session) -> dict:
+    """Fold the rows appended by the dashboard counter and table version triggers into their totals."""
+    deltas = db.execute(text("SELECT rollup_dashboard_counters()")).scalar()
+    changes = db.execute(text("SELECT rollup_table_versions()")).scalar()
+    db.commit()
+    return {"dashboard_deltas": deltas, "table_changes": changes}
+
+
+@dataclass(frozen=True)
+class Job:
+    name: str
+    run: Callable[[Session], dict]
+    interval: dict                   # APScheduler interval trigger arguments
+
+
+JOBS = [
+    Job("overdue_check", run_overdue_check, {"minutes": 5}),
+    Job("calibration_check", lambda db: run_calibration_check(db, incremental=True), {"hours": 1}),
+    Job("partition_maintenance", partition_maintenance, {"hours": 24}),
+    Job("prune_job_runs", prune_job_runs, {"hours": 24}),
+    Job("counter_rollup", rollup_counters, {"seconds": settings.COUNTER_ROLLUP_SECONDS}),
+]
+if settings.ALERT_NOTIFY_ENABLED:
+    JOBS.append(Job("alert_notifications", dispatch_notifications,
+                    {"seconds": settings.ALERT_NOTIFY_INTERVAL_SECONDS}))
+
+
+# ── Leader election ───────────────────────────────────────────────────────────
+
+class LeaderElection:
+    """Holds LEADER_LOCK_KEY on a dedicated connection while this process leads."""
+
+    def __init__(self, key: int):
+        self.key = key
+        # Unpooled: closing the connection is what releases the lock
+        self._engine = create_engine(settings.DATABASE_URL, poolclass=NullPool)
+        self._conn: Optional[Connection] = None
+        self.since: Optional[datetime] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._conn is not None
+
+    def check(self) -> bool:
+        """Keep or try to take leadership. True only when it was just gained."""
+        if self._conn is not None:
+            try:
+                self._conn.execute(text("SELECT 1"))
+                self._conn.commit()
+            except DBAPIError as e:
+                logger.warning(f"Lost scheduler leadership: {e}")
+                self.release()
+            return False
+
+        try:
+            conn = self._engine.connect()
+        except DBAPIError as e:
+            logger.warning(f"Leader election could not connect: {e}")
+            return False
+        try:
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}).scalar()
+            if acquired:
+                conn.execute(text("SELECT set_config('application_name', :name, false)"),
+                             {"name": APPLICATION_NAME_PREFIX + IDENTITY})
+            conn.commit()
+        except DBAPIError as e:
+            logger.warning(f"Leader election failed: {e}")
+            acquired = False
+        if not acquired:
+            conn.close()
+            return False
+
+        self._conn, self.since = conn, get_utc_now()
+        logger.info(f"{IDENTITY} is now the scheduler leader")
+        return True
+
+    def release(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            finally:
+                self._conn, self.since = None, None
+
+    def current_leader(self) -> Optional[str]:
+        """Identity of whichever process holds the lock, as seen by Postgres."""
+        with engine.connect() as conn:
+            name = conn.execute(_CURRENT_LEADER, {"key": self.key}).scalar()
+        return name[len(APPLICATION_NAME_PREFIX):] if name else None
+
+
+# ── Scheduler ─────────────────────────────────────────────────────────────────
+
+class JobScheduler:
+    def __init__(self, mode: str):
+        if mode not in ("leader", "all", "off"):
+            raise ValueError(f"SCHEDULER_MODE must be leader, all or off, not {mode!r}")
+        self.mode = mode
+        self.election = LeaderElection(LEADER_LOCK_KEY) if mode == "leader" else None
+        self._scheduler = BackgroundScheduler()
+
+    @property
+    def runs_jobs(self) -> bool:
+        if self.mode == "leader":
+            return self.election.is_leader
+        return self.mode == "all"
+
+    def start(self):
+        if self.mode == "off":
+            logger.info("Scheduler off in this process (SCHEDULER_MODE=off)")
+            return
+        # In "all" mode jobs fire straight away; in leader mode they stay paused
+        # (next_run_time=None) until this process is elected
+        first_run = get_utc_now() if self.mode == "all" else None
+        for job in JOBS:
+            self._scheduler.add_job(self._run, "interval", args=[job], id=job.name,
+                                    next_run_time=first_run, **job.interval)
+        if self.election:
+            self._scheduler.add_job(self._elect, "interval", id="leader_election",
+                                    seconds=settings.SCHEDULER_LEADER_CHECK_SECONDS,
+                                    next_run_time=get_utc_now())
+        self._scheduler.start()
+        logger.info(
+            f"Background scheduler started ({self.mode} mode) — overdue check every 5 min, "
+            "calibration check every 1 hr, partition maintenance daily"
+        )
+
+    def shutdown(self):
+        if self._scheduler.running:
+            self._scheduler.shutdown()
+        if self.election:
+            self.election.release()
+
+    def _elect(self):
+        if self.election.check():
+            for job in JOBS:
+                self._scheduler.modify_job(job.name, next_run_time=get_utc_now())
+
+    def _run(self, job: Job):
+        if not self.runs_jobs:
+            return
+        started = get_utc_now()
+        clock = time.perf_counter()
+        db = SessionLocal()
+        try:
+            try:
+                if settings.SQL_PROFILE_ENABLED:
+                    with profiling.profiled() as profile:
+                        result, error = job.run(db), None
+                    logger.info(f"{job.name}: {profile.queries} queries, {profile.db_seconds * 1000:.1f} ms in DB")
+                    profiling.log_suspects(job.name, profile)
+                else:
+                    result, error = job.run(db), None
+            except Exception as e:
+                db.rollback()
+                result, error = None, str(e)
+                logger.error(f"{job.name} failed: {e}")
+            metrics.record_job(job.name, time.perf_counter() - clock, error is None, result)
+            if error is None:
+                logger.debug(f"{job.name}: {result}")
+                if result.get("alerts_created") and self._scheduler.get_job("alert_notifications"):
+                    # Deliver new alerts now rather than at the next dispatcher tick
+                    self._scheduler.modify_job("alert_notifications", next_run_time=get_utc_now())
+            db.add(RulesJobRun(
+                job_name=job.name,
+                runner=IDENTITY,
+                started_at=started,
+                finished_at=get_utc_now(),
+                success=error is None,
+                result=jsonable_encoder(result),
+                error=error,
+            ))
+            db.commit()
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not record run of {job.name}: {e}")
+        finally:
+            db.close()
+
+    def status(self) -> dict:
+        info = {"mode": self.mode, "identity": IDENTITY, "runs_jobs": self.runs_jobs}
+        if self.election:
+            info["leader_since"] = self.election.since
+            try:
+                info["leader"] = self.election.current_leader()
+            except DBAPIError:
+                info["leader"] = None
+        return info
+
+
+scheduler = JobScheduler(settings.SCHEDULER_MODE)
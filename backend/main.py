@@ -1,58 +1,36 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from apscheduler.schedulers.background import BackgroundScheduler
-from app.core.database import get_db
-from app.routers.api import router
-from app.services.rules_engine import run_overdue_check, run_calibration_check
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from app.core import metrics, profiling
+from app.core.replicas import LAST_WRITE_HEADER, READ_SOURCE_HEADER, ReadYourWritesMiddleware, replicas
+from app.core.config import settings
+from app.core.database import async_engine, engine
+from app.core.events import hub
+from app.routers.api import ARCHIVED_BEFORE_HEADER, ARCHIVED_MONTHS_HEADER, router
+from app.routers import custody_async
+from app.services.scheduler import scheduler
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("act-backend")
 
-scheduler = BackgroundScheduler()
-
-
-def scheduled_overdue_check():
-    db = next(get_db())
-    try:
-        result = run_overdue_check(db)
-        if result["alerts_created"] > 0:
-            logger.info(f"Overdue check: {result}")
-    except Exception as e:
-        logger.error(f"Overdue check failed: {e}")
-    finally:
-        db.close()
-
-
-def scheduled_calibration_check():
-    db = next(get_db())
-    try:
-        result = run_calibration_check(db)
-        if result["alerts_created"] > 0:
-            logger.info(f"Calibration check: {result}")
-    except Exception as e:
-        logger.error(f"Calibration check failed: {e}")
-    finally:
-        db.close()
-
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Start background scheduler
-    scheduler.add_job(scheduled_overdue_check, "interval", minutes=5, id="overdue_check")
-    scheduler.add_job(scheduled_calibration_check, "interval", hours=1, id="calibration_check")
-    scheduler.start()
-    logger.info("Background scheduler started — overdue check every 5 min, calibration check every 1 hr")
+    hub.start()
 
-    # Run once on startup
-    scheduled_calibration_check()
-    scheduled_overdue_check()
+    # Jobs run in the background on the elected leader (or per SCHEDULER_MODE);
+    # nothing blocks startup
+    scheduler.start()
 
     yield
 
+    await hub.stop()
     scheduler.shutdown()
     logger.info("Scheduler stopped")
+    if async_engine is not None:
+        await async_engine.dispose()
 
 
 app = FastAPI(
@@ -68,6 +46,7 @@ app = FastAPI(
 - `GET /dashboard/summary` — Live dashboard counts
 - `GET /dashboard/active-custody` — All currently checked-out items
 - `GET /alerts` — Open alerts
+- `GET /events/stream` — Live change events (Server-Sent Events)
 - `POST /assets/{id}/calibration` — Record new calibration
     """,
     version="1.0.0",
@@ -80,14 +59,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Next-Cursor", "ETag", "Last-Modified", "Server-Timing", "X-SQL-Profile",
+        READ_SOURCE_HEADER, LAST_WRITE_HEADER, ARCHIVED_BEFORE_HEADER, ARCHIVED_MONTHS_HEADER,
+    ],
 )
-
+if replicas.replicas:
+    app.add_middleware(ReadYourWritesMiddleware)
+if settings.SQL_PROFILE_ENABLED:
+    profiling.instrument(engine)
+    if async_engine is not None:
+        profiling.instrument(async_engine.sync_engine)
+    app.add_middleware(profiling.SQLProfileMiddleware)
+# Added last so it wraps everything, CORS included
+app.add_middleware(metrics.MetricsMiddleware)
+
+if settings.ASYNC_DB_ENABLED:
+    # Registered first so these take precedence over the sync custody routes
+    app.include_router(custody_async.router, prefix="/api/v1")
 app.include_router(router, prefix="/api/v1")
 
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok", "service": "act-backend", "version": "1.0.0"}
+    return {
+        "status": "ok",
+        "service": "act-backend",
+        "version": "1.0.0",
+        "scheduler": scheduler.status(),
+        "replicas": replicas.status(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 @app.get("/")
@@ -97,4 +103,5 @@ def root():
         "docs": "/docs",
         "api": "/api/v1",
         "health": "/health",
+        "metrics": "/metrics",
     }
@@ -0,0 +1,101 @@
+"""
+Benchmark: legacy per-state COUNT queries vs. dashboard_counters read.
+
+Loads N synthetic assets inside a transaction that is rolled back at the end,
+so it is safe to run against a dev database:
+
+    docker compose exec backend python -m scripts.bench_dashboard_summary --assets 100000
+"""
+import argparse
+import statistics
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import text, func
+
+from app.core.database import SessionLocal
+from app.models.models import (
+    Asset, AssetKit, Alert, CustodyRecord, AssetState, AlertStatus, AlertSeverity, CalibrationStatus
+)
+from app.routers.api import _dashboard_summary
+
+
+def legacy_summary(db):
+    """The pre-counters implementation: one COUNT round trip per figure."""
+    def count_state(state):
+        return db.query(func.count(Asset.id)).filter(Asset.state == state, Asset.is_active == True).scalar()
+
+    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        "total_assets": db.query(func.count(Asset.id)).filter(Asset.is_active == True).scalar(),
+        "available": count_state(AssetState.AVAILABLE),
+        "in_custody": count_state(AssetState.IN_CUSTODY) + count_state(AssetState.OVERRIDE_CUSTODY),
+        "overdue": count_state(AssetState.OVERDUE),
+        "suspended": count_state(AssetState.SUSPENDED),
+        "withdrawn": count_state(AssetState.WITHDRAWN),
+        "total_kits": db.query(func.count(AssetKit.id)).scalar(),
+        "kits_in_custody": db.query(func.count(AssetKit.id)).filter(
+            AssetKit.state.in_([AssetState.IN_CUSTODY, AssetState.OVERRIDE_CUSTODY, AssetState.OVERDUE])
+        ).scalar(),
+        "open_alerts": db.query(func.count(Alert.id)).filter(Alert.status == AlertStatus.OPEN).scalar(),
+        "critical_alerts": db.query(func.count(Alert.id)).filter(
+            Alert.status == AlertStatus.OPEN, Alert.severity == AlertSeverity.CRITICAL
+        ).scalar(),
+        "calibration_overdue": db.query(func.count(Asset.id)).filter(
+            Asset.calibration_status == CalibrationStatus.OVERDUE, Asset.is_active == True
+        ).scalar(),
+        "calibration_due_soon": db.query(func.count(Asset.id)).filter(
+            Asset.calibration_status == CalibrationStatus.DUE_SOON, Asset.is_active == True
+        ).scalar(),
+        "active_workers_today": db.query(func.count(func.distinct(CustodyRecord.worker_id))).filter(
+            CustodyRecord.checked_out_at >= today_start
+        ).scalar(),
+    }
+
+
+def load_assets(db, n):
+    tag = uuid.uuid4().hex[:8]
+    db.execute(text("""
+        INSERT INTO assets (asset_code, qr_code, name, category_id, state, calibration_status)
+        SELECT 'BENCH-' || :tag || '-' || g, 'QR-BENCH-' || :tag || '-' || g, 'Bench tool ' || g,
+               (SELECT id FROM asset_categories ORDER BY code LIMIT 1),
+               (ARRAY['AVAILABLE','IN_CUSTODY','OVERDUE','SUSPENDED']::asset_state[])[1 + g % 4],
+               (ARRAY['VALID','DUE_SOON','OVERDUE','NOT_REQUIRED']::calibration_status[])[1 + g % 4]
+        FROM generate_series(1, :n) g
+    """), {"tag": tag, "n": n})
+    db.execute(text("ANALYZE assets"))
+
+
+def timed(fn, db, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(db)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--assets", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        load_assets(db, args.assets)
+        # The endpoint's own summary code, so the benchmark times what it serves
+        assert legacy_summary(db)["total_assets"] == _dashboard_summary(db).total_assets, "counters out of sync"
+
+        for name, fn in (("legacy (12 COUNTs)", legacy_summary), ("dashboard_counters", _dashboard_summary)):
+            p50, p95 = timed(fn, db, args.runs)
+            print(f"{name:<22} p50={p50:8.2f} ms   p95={p95:8.2f} ms")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
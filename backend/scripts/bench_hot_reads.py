@@ -0,0 +1,209 @@
+"""
+Benchmark: ORM graphs + Pydantic/jsonable_encoder vs. lean projections + orjson.
+
+Covers the hot read paths (active custody, custody history page, asset list,
+calibration due). Loads N synthetic assets, each with an open custody record,
+inside a transaction that is rolled back at the end, so it is safe to run
+against a dev database:
+
+    docker compose exec backend python -m scripts.bench_hot_reads --records 50000
+
+Latency is the full path from query to encoded JSON body; memory is the peak
+Python allocation for one call (tracemalloc, measured in separate runs).
+"""
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone, timedelta
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import text
+from sqlalchemy.orm import joinedload
+
+from app.core import responses
+from app.core.database import SessionLocal
+from app.models.models import Asset, CustodyRecord
+from app.routers.api import _active_custody, _asset_out_dicts, _asset_out_rows, get_custody_history
+from app.schemas.schemas import AssetOut
+
+HISTORY_PAGE = 200
+ASSET_PAGE = 500
+
+
+def encode(content) -> bytes:
+    """What FastAPI does with a returned dict/list: jsonable_encoder, then json.dumps."""
+    return json.dumps(jsonable_encoder(content), separators=(",", ":")).encode()
+
+
+# ── The previous implementations ──────────────────────────────────────────────
+
+def legacy_active_custody(db) -> bytes:
+    records = db.query(CustodyRecord).options(
+        joinedload(CustodyRecord.worker),
+        joinedload(CustodyRecord.asset),
+        joinedload(CustodyRecord.kit),
+    ).filter(CustodyRecord.returned_at == None).order_by(CustodyRecord.checked_out_at.desc()).all()
+
+    now = datetime.now(timezone.utc)
+    result = []
+    for r in records:
+        hours_elapsed = round((now - r.checked_out_at).total_seconds() / 3600, 2)
+        item = r.asset or r.kit
+        result.append({
+            "id": str(r.id),
+            "worker_name": r.worker.full_name if r.worker else "Unknown",
+            "worker_employee_id": r.worker.employee_id if r.worker else "?",
+            "asset_name": item.name if item else "Unknown",
+            "asset_code": getattr(item, 'asset_code', getattr(item, 'kit_code', '?')) if item else '?',
+            "is_kit": r.kit_id is not None,
+            "checked_out_at": r.checked_out_at,
+            "expected_return_at": r.expected_return_at,
+            "is_overdue": r.is_overdue,
+            "overdue_hours": float(r.overdue_hours) if r.overdue_hours else None,
+            "hours_elapsed": hours_elapsed,
+        })
+    return encode(result)
+
+
+def legacy_history(db) -> bytes:
+    records = db.query(CustodyRecord).options(
+        joinedload(CustodyRecord.worker),
+        joinedload(CustodyRecord.asset),
+        joinedload(CustodyRecord.kit),
+    ).order_by(CustodyRecord.checked_out_at.desc(), CustodyRecord.id.desc()).limit(HISTORY_PAGE + 1).all()
+    result = []
+    for r in records[:HISTORY_PAGE]:
+        item = r.asset or r.kit
+        result.append({
+            "id": str(r.id),
+            "event_type": r.event_type,
+            "worker": r.worker.full_name if r.worker else None,
+            "asset": getattr(item, 'asset_code', getattr(item, 'kit_code', None)) if item else None,
+            "asset_name": item.name if item else None,
+            "checked_out_at": r.checked_out_at,
+            "returned_at": r.returned_at,
+            "is_overdue": r.is_overdue,
+            "overdue_hours": float(r.overdue_hours) if r.overdue_hours else None,
+        })
+    return encode(result)
+
+
+def legacy_assets(db) -> bytes:
+    assets = db.query(Asset).options(joinedload(Asset.category)).filter(Asset.is_active == True) \
+        .order_by(Asset.asset_code).limit(ASSET_PAGE + 1).all()
+    return encode({"items": [AssetOut.model_validate(a) for a in assets[:ASSET_PAGE]]})
+
+
+def legacy_calibration_due(db) -> bytes:
+    cutoff = datetime.now(timezone.utc) + timedelta(days=30)
+    assets = db.query(Asset).filter(
+        Asset.is_active == True, Asset.calibration_due_at != None, Asset.calibration_due_at <= cutoff,
+    ).order_by(Asset.calibration_due_at).all()
+    return encode([AssetOut.model_validate(a) for a in assets])
+
+
+# ── The current implementations ───────────────────────────────────────────────
+
+def lean_active_custody(db) -> bytes:
+    return responses.dumps(_active_custody(db))
+
+
+def lean_history(db) -> bytes:
+    return get_custody_history(response=Response(), limit=HISTORY_PAGE, asset_id=None, worker_id=None,
+                               cursor=None, db=db).body
+
+
+def lean_assets(db) -> bytes:
+    q = _asset_out_rows(db.query(Asset).filter(Asset.is_active == True).order_by(Asset.asset_code))
+    return responses.dumps({"items": _asset_out_dicts(q.limit(ASSET_PAGE + 1).all()[:ASSET_PAGE])})
+
+
+def lean_calibration_due(db) -> bytes:
+    cutoff = datetime.now(timezone.utc) + timedelta(days=30)
+    q = db.query(Asset).filter(
+        Asset.is_active == True, Asset.calibration_due_at != None, Asset.calibration_due_at <= cutoff,
+    ).order_by(Asset.calibration_due_at, Asset.asset_code)
+    return responses.dumps(_asset_out_dicts(_asset_out_rows(q)))
+
+
+CASES = [
+    ("active custody", legacy_active_custody, lean_active_custody),
+    (f"history ({HISTORY_PAGE} rows)", legacy_history, lean_history),
+    (f"assets ({ASSET_PAGE} rows)", legacy_assets, lean_assets),
+    ("calibration due", legacy_calibration_due, lean_calibration_due),
+]
+
+
+def load_records(db, n):
+    tag = uuid.uuid4().hex[:8]
+    db.execute(text("""
+        INSERT INTO assets (asset_code, qr_code, name, category_id, state, calibration_status, calibration_due_at)
+        SELECT 'BENCH-' || :tag || '-' || g, 'QR-BENCH-' || :tag || '-' || g, 'Bench tool ' || g,
+               (SELECT id FROM asset_categories ORDER BY code LIMIT 1),
+               'IN_CUSTODY', 'VALID', NOW() + make_interval(days => g % 365)
+        FROM generate_series(1, :n) g
+    """), {"tag": tag, "n": n})
+    db.execute(text("""
+        INSERT INTO custody_records (asset_id, worker_id, event_type, checked_out_at, expected_return_at,
+                                     is_overdue, overdue_hours)
+        SELECT a.id, w.ids[1 + a.n % array_length(w.ids, 1)], 'CHECKOUT',
+               NOW() - a.age, NOW() - a.age + interval '8 hours',
+               a.n % 5 = 0, CASE WHEN a.n % 5 = 0 THEN 1.5 END
+        FROM (SELECT id, n, make_interval(mins => (n % 600)::int) AS age
+              FROM (SELECT id, row_number() OVER () AS n FROM assets WHERE asset_code LIKE 'BENCH-' || :tag || '-%') x
+        ) a
+        CROSS JOIN (SELECT array_agg(id) AS ids FROM workers) w
+    """), {"tag": tag})
+    db.execute(text("ANALYZE assets"))
+    db.execute(text("ANALYZE custody_records"))
+
+
+def timed(fn, db, runs):
+    samples = []
+    for _ in range(runs):
+        db.expunge_all()
+        start = time.perf_counter()
+        fn(db)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[max(int(len(samples) * 0.95) - 1, 0)]
+
+
+def peak_memory(fn, db) -> float:
+    db.expunge_all()
+    tracemalloc.start()
+    try:
+        fn(db)
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=50_000)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        load_records(db, args.records)
+        for label, legacy, lean in CASES:
+            assert len(json.loads(legacy(db))) == len(json.loads(lean(db))), f"{label}: results differ"
+            print(label)
+            for name, fn in (("legacy (ORM + Pydantic)", legacy), ("lean (columns + orjson)", lean)):
+                p50, p95 = timed(fn, db, args.runs)
+                mib = peak_memory(fn, db)
+                size = len(fn(db)) / 1024
+                print(f"  {name:<25} p50={p50:9.2f} ms   p95={p95:9.2f} ms   peak={mib:8.1f} MiB   body={size:8.0f} KiB")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
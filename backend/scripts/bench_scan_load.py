@@ -0,0 +1,82 @@
+"""
+Load benchmark: concurrent scanners hammering POST /custody/scan.
+
+Each simulated scanner owns one freshly created asset and alternates
+checkout/return scans on it for the given duration, so scans never conflict
+and every request exercises a full state transition. Run it once against a
+backend started with ASYNC_DB_ENABLED=false and once with it set to true:
+
+    python -m scripts.bench_scan_load --url http://localhost:8000 --scanners 200 --seconds 30
+
+The bench assets are deactivated afterwards.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+async def setup(client, scanners):
+    tag = uuid.uuid4().hex[:8]
+    category_id = (await client.get("/categories")).json()[0]["id"]
+    worker = (await client.post("/workers", json={
+        "employee_id": f"BENCH-{tag}", "qr_code": f"QR-W-BENCH-{tag}", "full_name": "Load Bench",
+    })).json()
+    assets = []
+    for i in range(scanners):
+        assets.append((await client.post("/assets", json={
+            "asset_code": f"BENCH-{tag}-{i}", "qr_code": f"QR-BENCH-{tag}-{i}",
+            "name": f"Bench tool {i}", "category_id": category_id,
+        })).json())
+    return worker, assets
+
+
+async def teardown(client, worker, assets):
+    for asset in assets:
+        await client.patch(f"/assets/{asset['id']}", json={"is_active": False})
+    await client.patch(f"/workers/{worker['id']}", json={"is_active": False})
+
+
+async def scanner(client, worker, asset, deadline, latencies, errors):
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        r = await client.post("/custody/scan", json={"worker_qr": worker["qr_code"], "asset_qr": asset["qr_code"]})
+        latencies.append((time.perf_counter() - start) * 1000)
+        if r.status_code != 200:
+            errors.append(r.status_code)
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.scanners, max_keepalive_connections=args.scanners)
+    async with httpx.AsyncClient(base_url=args.url.rstrip("/") + "/api/v1", timeout=60, limits=limits) as client:
+        worker, assets = await setup(client, args.scanners)
+        latencies, errors = [], []
+        try:
+            deadline = time.monotonic() + args.seconds
+            await asyncio.gather(*(
+                scanner(client, worker, asset, deadline, latencies, errors) for asset in assets
+            ))
+        finally:
+            await teardown(client, worker, assets)
+
+    latencies.sort()
+    print(f"scanners={args.scanners} scans={len(latencies)} errors={len(errors)} "
+          f"throughput={len(latencies) / args.seconds:.0f}/s")
+    print(f"p50={statistics.median(latencies):.1f} ms  "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1]:.1f} ms  "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1]:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--scanners", type=int, default=200)
+    parser.add_argument("--seconds", type=int, default=30)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
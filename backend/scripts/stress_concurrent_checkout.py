@@ -0,0 +1,99 @@
+"""
+Stress test: many scanners grabbing the same tool at the same instant.
+
+Each round fires --parallel simultaneous POST /custody/checkout requests (each
+from a different worker) at one asset, then checks that exactly one succeeded
+and that the asset has exactly one open custody record. The asset is returned
+between rounds. Exits non-zero on any violation:
+
+    python -m scripts.stress_concurrent_checkout --url http://localhost:8000 --parallel 50 --rounds 20
+
+Losing requests should see 409 (already in custody / being updated by another
+scan). The bench asset and workers are deactivated afterwards.
+"""
+import argparse
+import asyncio
+import sys
+import uuid
+from collections import Counter
+
+import httpx
+
+
+async def setup(client, parallel):
+    tag = uuid.uuid4().hex[:8]
+    category_id = (await client.get("/categories")).json()[0]["id"]
+    asset = (await client.post("/assets", json={
+        "asset_code": f"STRESS-{tag}", "qr_code": f"QR-STRESS-{tag}",
+        "name": "Stress tool", "category_id": category_id,
+    })).json()
+    workers = []
+    for i in range(parallel):
+        workers.append((await client.post("/workers", json={
+            "employee_id": f"STRESS-{tag}-{i}", "qr_code": f"QR-W-STRESS-{tag}-{i}", "full_name": f"Stress {i}",
+        })).json())
+    return asset, workers
+
+
+async def teardown(client, asset, workers):
+    await client.patch(f"/assets/{asset['id']}", json={"is_active": False})
+    for worker in workers:
+        await client.patch(f"/workers/{worker['id']}", json={"is_active": False})
+
+
+async def open_records(client, asset):
+    history = (await client.get("/custody/history", params={"asset_id": asset["id"], "limit": 200})).json()
+    return [r for r in history if r["returned_at"] is None]
+
+
+async def round_(client, asset, workers):
+    start = asyncio.Event()
+
+    async def grab(worker):
+        await start.wait()
+        r = await client.post("/custody/checkout", json={"worker_qr": worker["qr_code"], "asset_qr": asset["qr_code"]})
+        return r.status_code
+
+    tasks = [asyncio.create_task(grab(w)) for w in workers]
+    await asyncio.sleep(0.05)
+    start.set()
+    statuses = Counter(await asyncio.gather(*tasks))
+
+    still_open = await open_records(client, asset)
+    ok = statuses[200] == 1 and len(still_open) == 1 and set(statuses) <= {200, 409}
+
+    # Reset for the next round (one return per open record if the invariant broke)
+    by_name = {w["full_name"]: w for w in workers}
+    for record in still_open:
+        holder = by_name[record["worker"]]
+        await client.post("/custody/return", json={"worker_qr": holder["qr_code"], "asset_qr": asset["qr_code"]})
+    return ok, statuses, len(still_open)
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.parallel, max_keepalive_connections=args.parallel)
+    async with httpx.AsyncClient(base_url=args.url.rstrip("/") + "/api/v1", timeout=60, limits=limits) as client:
+        asset, workers = await setup(client, args.parallel)
+        failures = 0
+        try:
+            for n in range(1, args.rounds + 1):
+                ok, statuses, n_open = await round_(client, asset, workers)
+                failures += not ok
+                print(f"round {n:3d}: {'ok  ' if ok else 'FAIL'} statuses={dict(statuses)} open_records={n_open}")
+        finally:
+            await teardown(client, asset, workers)
+
+    print(f"{args.rounds - failures}/{args.rounds} rounds produced exactly one open custody record")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--parallel", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    sys.exit(1 if asyncio.run(run(parser.parse_args())) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Run from backend/ (the app's working directory in the container)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
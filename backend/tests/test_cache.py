@@ -0,0 +1,139 @@
+import asyncio
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core import cache, events
+from app.core.config import settings
+from app.core.database import AppSession, run_commit_effects
+
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+    monkeypatch.setattr(cache, "_client", fakeredis.FakeRedis(server=server))
+    monkeypatch.setattr(cache, "_down_until", 0.0)
+    return server
+
+
+class Counter:
+    """compute() stand-in that records how often it ran."""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_miss_then_hit(redis_server):
+    compute = Counter({"total": 3})
+    assert cache.cached("summary", ("assets",), 60, compute) == {"total": 3}
+    assert cache.cached("summary", ("assets",), 60, compute) == {"total": 3}
+    assert compute.calls == 1
+
+
+def test_params_are_part_of_the_key(redis_server):
+    compute = Counter([1])
+    cache.cached("due", ("assets",), 60, compute, {"days": 7})
+    cache.cached("due", ("assets",), 60, compute, {"days": 30})
+    assert compute.calls == 2
+
+
+def test_cached_json_returns_encoded_body(redis_server):
+    compute = Counter({"a": 1})
+    first = cache.cached_json("kits", ("asset_kits",), 60, compute)
+    assert cache.cached_json("kits", ("asset_kits",), 60, compute) == first == b'{"a":1}'
+    assert compute.calls == 1
+
+
+def test_bump_invalidates_dependent_entries_only(redis_server):
+    assets = Counter(1)
+    workers = Counter(2)
+    cache.cached("assets", ("assets", "asset_categories"), 60, assets)
+    cache.cached("workers", ("workers",), 60, workers)
+
+    cache.bump(["asset_categories"])
+
+    cache.cached("assets", ("assets", "asset_categories"), 60, assets)
+    cache.cached("workers", ("workers",), 60, workers)
+    assert assets.calls == 2
+    assert workers.calls == 1
+
+
+def test_commit_bumps_touched_tables(redis_server):
+    compute = Counter(1)
+    cache.cached("summary", ("alerts",), 60, compute)
+
+    db = AppSession(bind=create_engine("sqlite://"))
+    db.execute(text("SELECT 1"))
+    cache.touch(db, "alerts")
+    db.commit()
+
+    cache.cached("summary", ("alerts",), 60, compute)
+    assert compute.calls == 2
+
+
+def test_replica_results_are_kept_apart(redis_server):
+    compute = Counter(1)
+    replica = AppSession()
+    replica.info["replica"] = "replica-1"
+    cache.cached("summary", ("assets",), 60, compute, db=replica)
+    cache.cached("summary", ("assets",), 60, compute, db=AppSession())
+    assert compute.calls == 2
+    ttls = [cache._client.ttl(key) for key in cache._client.keys(f"{cache.ENTRY_PREFIX}:summary@replica:*")]
+    assert ttls and all(ttl <= settings.REPLICA_MAX_LAG_SECONDS for ttl in ttls)
+
+
+def test_redis_down_falls_back_to_compute(redis_server):
+    redis_server.connected = False
+    compute = Counter({"total": 3})
+
+    assert cache.cached("summary", ("assets",), 60, compute) == {"total": 3}
+    # Marked down: later calls skip Redis entirely until CACHE_RETRY_SECONDS pass
+    assert cache.get_redis() is None
+    assert cache.cached("summary", ("assets",), 60, compute) == {"total": 3}
+    cache.bump(["assets"])
+    assert compute.calls == 2
+
+
+def test_disabled_cache_always_computes(redis_server, monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_ENABLED", False)
+    compute = Counter(1)
+    cache.cached("summary", ("assets",), 60, compute)
+    cache.cached("summary", ("assets",), 60, compute)
+    assert compute.calls == 2
+
+
+def test_cache_bump_precedes_event_publication(monkeypatch):
+    calls = []
+    monkeypatch.setattr(cache, "bump", lambda tables: calls.append("bump"))
+    monkeypatch.setattr(events, "_publish_committed", lambda published: calls.append("publish"))
+
+    db = AppSession(bind=create_engine("sqlite://"))
+    db.execute(text("SELECT 1"))
+    events.emit(db, "custody")
+    cache.touch(db, "custody_records")
+    db.commit()
+    assert calls == ["bump", "publish"]
+
+
+def test_commit_on_the_event_loop_waits_for_the_route(monkeypatch):
+    calls = []
+    monkeypatch.setattr(cache, "bump", lambda tables: calls.append(sorted(tables)))
+    db = AppSession(bind=create_engine("sqlite://"))
+
+    async def route():
+        db.execute(text("SELECT 1"))
+        cache.touch(db, "assets")
+        db.commit()
+        assert calls == []      # queued, not fired and forgotten
+        await run_commit_effects(SimpleNamespace(sync_session=db))
+
+    asyncio.run(route())
+    assert calls == [["assets"]]
@@ -0,0 +1,45 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services import partitions
+from main import app
+
+
+def month(year: int, m: int) -> int:
+    return year * 12 + m - 1
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_months_before_the_oldest_attached_partition_are_archived():
+    attached = {month(2024, 3), month(2024, 4), month(2024, 5)}
+    assert partitions._archived(attached, cutoff=month(2024, 5)) == (month(2024, 3), [])
+
+
+def test_skipped_month_stays_live_and_later_months_are_gaps():
+    # 2024-01 kept for an open custody record, 2024-02 and 2024-03 archived
+    attached = {month(2024, 1), month(2024, 4)}
+    assert partitions._archived(attached, cutoff=month(2024, 4)) == (
+        month(2024, 1), [month(2024, 2), month(2024, 3)],
+    )
+
+
+def test_first_archived_month_in_a_range():
+    archived = (utc(2024, 1, 1), [utc(2024, 2, 1), utc(2024, 3, 1)])
+    assert partitions.first_archived(archived, utc(2023, 12, 5), None) == utc(2023, 12, 1)
+    assert partitions.first_archived(archived, utc(2024, 1, 1), utc(2024, 2, 1)) is None
+    assert partitions.first_archived(archived, utc(2024, 1, 1), utc(2024, 2, 2)) == utc(2024, 2, 1)
+    assert partitions.first_archived(archived, utc(2024, 4, 1), None) is None
+
+
+@pytest.mark.parametrize("path", ["/api/v1/custody/history/export", "/api/v1/audit/export"])
+def test_export_refuses_archived_ranges(monkeypatch, path):
+    monkeypatch.setattr(partitions, "archived_months", lambda db, table: (utc(2024, 1, 1), [utc(2024, 2, 1)]))
+    client = TestClient(app)
+    response = client.get(path, params={"since": "2024-02-10T00:00:00"})
+    assert response.status_code == 422
+    assert "2024-02" in response.json()["detail"]
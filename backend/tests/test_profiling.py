@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.core import profiling
+from app.core.config import settings
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    profiling.instrument(engine)
+    return engine
+
+
+def test_statements_are_recorded(engine):
+    with profiling.profiled() as profile, engine.connect() as conn:
+        for _ in range(3):
+            conn.execute(text("SELECT 1"))
+    assert profile.queries == 3
+    assert profile.n_plus_one(threshold=3)[0]["count"] == 3
+
+
+def test_failed_statement_leaves_nothing_on_the_connection(engine):
+    with profiling.profiled() as profile, engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM missing_table"))
+        conn.execute(text("SELECT 1"))
+        assert not any(key.startswith("sql_profile") for key in conn.info)
+    assert profile.queries == 1
+
+
+def scope(value: bytes) -> dict:
+    return {"headers": [(b"x-sql-profile", value)]}
+
+
+def test_header_opts_in_outside_production(monkeypatch):
+    monkeypatch.setattr(settings, "ENVIRONMENT", "development")
+    assert profiling._requested(scope(b"1"))
+    assert not profiling._requested(scope(b"0"))
+
+
+def test_production_requires_the_token(monkeypatch):
+    monkeypatch.setattr(settings, "ENVIRONMENT", "production")
+    monkeypatch.setattr(settings, "SQL_PROFILE_TOKEN", None)
+    assert not profiling._requested(scope(b"1"))
+    monkeypatch.setattr(settings, "SQL_PROFILE_TOKEN", "s3cret")
+    assert not profiling._requested(scope(b"1"))
+    assert profiling._requested(scope(b"s3cret"))
@@ -0,0 +1,153 @@
+"""
+Read-replica routing.
+
+The routing tests use stand-in replicas whose lag and replay position are set
+by the test, so they need no database. test_two_instances runs against a real
+primary and a streaming replica of it:
+
+    TEST_DATABASE_URL=postgresql://...@localhost:5432/act_test \
+    TEST_REPLICA_URL=postgresql://...@localhost:5433/act_test python -m pytest tests/test_replicas.py
+
+and is skipped when either is not set.
+"""
+import os
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from starlette.requests import Request
+
+from app.core import replicas
+from app.core.config import settings
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+TEST_REPLICA_URL = os.environ.get("TEST_REPLICA_URL")
+
+
+class StandIn(replicas.Replica):
+    """Replica whose measurements are set by the test instead of queried."""
+
+    def __init__(self, name: str, lag=0.0, replayed: str = "0/0"):
+        super().__init__(name, "postgresql://stand-in/act")
+        self.measured = lag
+        self.position = replayed
+        self.checks = 0
+        self.asked = 0
+
+    def _check(self):
+        self.checks += 1
+        self.lag = self.measured
+        self._saw_replayed(self.position)
+        self._checked_at = time.monotonic()
+
+    def _replay_lsn(self, db):
+        self.asked += 1
+        return self.position
+
+
+def use(monkeypatch, *standins):
+    pool = replicas.ReplicaSet([])
+    pool.replicas = list(standins)
+    monkeypatch.setattr(replicas, "replicas", pool)
+    return pool
+
+
+def request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "headers": [(name.replace("_", "-").lower().encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def source(req: Request) -> str:
+    db = replicas.open_read_session(req)
+    try:
+        return replicas.read_source(db)
+    finally:
+        db.close()
+
+
+def test_fresh_replicas_take_turns_and_stale_ones_are_skipped(monkeypatch):
+    lagging = StandIn("lagging", lag=settings.REPLICA_MAX_LAG_SECONDS + 1)
+    not_streaming = StandIn("not-streaming", lag=None)
+    a, b = StandIn("a"), StandIn("b")
+    pool = use(monkeypatch, lagging, a, not_streaming, b)
+    picked = {pool.pick().name for _ in range(8)}
+    assert picked == {"a", "b"}
+
+
+def test_all_stale_reads_from_the_primary(monkeypatch):
+    use(monkeypatch, StandIn("lagging", lag=settings.REPLICA_MAX_LAG_SECONDS + 1))
+    assert source(request()) == "primary"
+
+
+def test_lag_is_measured_once_per_interval(monkeypatch):
+    monkeypatch.setattr(settings, "REPLICA_LAG_CHECK_SECONDS", 60)
+    replica = StandIn("a")
+    pool = use(monkeypatch, replica)
+    for _ in range(5):
+        pool.pick()
+    assert replica.checks == 1
+
+
+def test_recent_write_reads_from_the_primary(monkeypatch):
+    use(monkeypatch, StandIn("a"))
+    assert source(request()) == "a"
+    assert source(request(x_last_write=f"{time.time():.3f}")) == "primary"
+    assert source(request(x_last_write=f"{time.time() - settings.READ_YOUR_WRITES_SECONDS - 1:.3f}")) == "a"
+
+
+def test_min_lsn_waits_for_replay(monkeypatch):
+    replica = StandIn("a", replayed="0/2000")
+    use(monkeypatch, replica)
+    assert source(request(x_min_lsn="0/1000")) == "a"
+    assert source(request(x_min_lsn="0/3000")) == "primary"
+    replica.position = "0/3000"
+    assert source(request(x_min_lsn="0/3000")) == "a"
+    # Known to be far enough now: no further question to the replica
+    asked = replica.asked
+    assert source(request(x_min_lsn="0/2800")) == "a"
+    assert replica.asked == asked
+
+
+def test_parse_lsn_orders_positions():
+    assert replicas.parse_lsn("1/0") > replicas.parse_lsn("0/FFFFFFFF") > replicas.parse_lsn("0/10")
+    assert replicas.parse_lsn("garbage") is None
+    assert replicas.parse_lsn(None) is None
+
+
+@pytest.mark.skipif(not (TEST_DATABASE_URL and TEST_REPLICA_URL), reason="TEST_DATABASE_URL/TEST_REPLICA_URL not set")
+def test_two_instances(monkeypatch):
+    primary = create_engine(TEST_DATABASE_URL)
+    monkeypatch.setattr(replicas, "engine", primary)
+    replica = replicas.Replica("replica-test", TEST_REPLICA_URL)
+    use(monkeypatch, replica)
+    table = f"replica_test_{int(time.time())}"
+    try:
+        with primary.begin() as conn:
+            conn.execute(text("INSERT INTO table_changes (table_name) VALUES (:t)"), {"t": table})
+        lsn = replicas.primary_lsn()
+        assert replicas.parse_lsn(lsn) is not None
+
+        replica._check()
+        assert replica.lag is not None and replica.lag <= settings.REPLICA_MAX_LAG_SECONDS
+
+        # A read carrying the write's LSN never sees the replica without it
+        deadline = time.monotonic() + 10
+        while True:
+            db = replicas.open_read_session(request(x_min_lsn=lsn))
+            try:
+                if replicas.read_source(db) == replica.name:
+                    assert db.execute(
+                        text("SELECT COUNT(*) FROM table_changes WHERE table_name = :t"), {"t": table}
+                    ).scalar() == 1
+                    break
+            finally:
+                db.close()
+            assert time.monotonic() < deadline, "replica did not replay the write"
+            time.sleep(0.1)
+    finally:
+        with primary.begin() as conn:
+            conn.execute(text("DELETE FROM table_changes WHERE table_name = :t"), {"t": table})
+        replica.engine.dispose()
+        primary.dispose()
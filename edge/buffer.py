@@ -0,0 +1,147 @@
+"""
+Durable local scan queue.
+
+Every scan captured at the counter is appended to a SQLite database in WAL
+mode before the request is acknowledged, so scans survive backend outages and
+edge restarts. The sync worker reads the queue in `seq` order and advances a
+persisted cursor once the backend has accepted a batch. Rows at or below the
+cursor keep the backend's per-event result until they are pruned.
+"""
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import aiosqlite
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    seq          INTEGER PRIMARY KEY AUTOINCREMENT,
+    scan_id      TEXT NOT NULL UNIQUE,
+    payload      TEXT NOT NULL,
+    captured_at  TEXT NOT NULL,
+    status       TEXT NOT NULL DEFAULT 'PENDING',   -- PENDING | SYNCED | REJECTED
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    result       TEXT,
+    synced_at    TEXT
+);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key    TEXT PRIMARY KEY,
+    value  TEXT NOT NULL
+);
+"""
+
+CURSOR_KEY = "cursor"
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class ScanBuffer:
+    def __init__(self, path: str):
+        self.path = path
+        self._db: Optional[aiosqlite.Connection] = None
+
+    async def open(self):
+        self._db = await aiosqlite.connect(self.path)
+        self._db.row_factory = aiosqlite.Row
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        # NORMAL is durable across application crashes in WAL mode; only an
+        # OS crash / power loss can drop the last few commits
+        await self._db.execute("PRAGMA synchronous=NORMAL")
+        await self._db.executescript(SCHEMA)
+        await self._db.commit()
+
+    async def close(self):
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    async def enqueue(self, event: dict) -> dict:
+        """Persist one scan and return its scan_id / seq. `event` must be JSON-serialisable."""
+        scan_id = str(uuid.uuid4())
+        captured_at = event.get("timestamp") or utc_now().isoformat()
+        payload = {**event, "scan_id": scan_id, "timestamp": captured_at}
+        cur = await self._db.execute(
+            "INSERT INTO scans (scan_id, payload, captured_at) VALUES (?, ?, ?)",
+            (scan_id, json.dumps(payload), captured_at),
+        )
+        await self._db.commit()
+        return {"scan_id": scan_id, "seq": cur.lastrowid, "captured_at": captured_at}
+
+    async def get_cursor(self) -> int:
+        async with self._db.execute("SELECT value FROM sync_state WHERE key = ?", (CURSOR_KEY,)) as cur:
+            row = await cur.fetchone()
+        return int(row["value"]) if row else 0
+
+    async def next_batch(self, limit: int) -> list:
+        """Oldest pending scans after the cursor, as (seq, payload) tuples."""
+        cursor = await self.get_cursor()
+        async with self._db.execute(
+            "SELECT seq, payload FROM scans WHERE seq > ? ORDER BY seq LIMIT ?", (cursor, limit)
+        ) as cur:
+            rows = await cur.fetchall()
+        return [(row["seq"], json.loads(row["payload"])) for row in rows]
+
+    async def record_attempt(self, seqs: list):
+        await self._db.executemany("UPDATE scans SET attempts = attempts + 1 WHERE seq = ?", [(s,) for s in seqs])
+        await self._db.commit()
+
+    async def ack(self, seqs: list, results: list):
+        """Store the backend's per-event results and advance the cursor, atomically."""
+        now = utc_now().isoformat()
+        await self._db.executemany(
+            "UPDATE scans SET status = ?, result = ?, synced_at = ?, attempts = attempts + 1 WHERE seq = ?",
+            [
+                ("SYNCED" if result.get("success") else "REJECTED", json.dumps(result), now, seq)
+                for seq, result in zip(seqs, results)
+            ],
+        )
+        await self._db.execute(
+            "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (CURSOR_KEY, str(max(seqs))),
+        )
+        await self._db.commit()
+
+    async def get_scan(self, scan_id: str) -> Optional[dict]:
+        async with self._db.execute(
+            "SELECT seq, scan_id, captured_at, status, attempts, result, synced_at FROM scans WHERE scan_id = ?",
+            (scan_id,),
+        ) as cur:
+            row = await cur.fetchone()
+        if row is None:
+            return None
+        scan = dict(row)
+        scan["result"] = json.loads(scan["result"]) if scan["result"] else None
+        return scan
+
+    async def status(self) -> dict:
+        cursor = await self.get_cursor()
+        async with self._db.execute(
+            "SELECT COUNT(*) AS depth, MIN(captured_at) AS oldest FROM scans WHERE seq > ?", (cursor,)
+        ) as cur:
+            pending = await cur.fetchone()
+        async with self._db.execute(
+            "SELECT COUNT(*) AS rejected FROM scans WHERE status = 'REJECTED'"
+        ) as cur:
+            rejected = await cur.fetchone()
+        return {
+            "cursor": cursor,
+            "pending": pending["depth"],
+            "oldest_pending_captured_at": pending["oldest"],
+            "rejected": rejected["rejected"],
+        }
+
+    async def prune(self, retain_days: int) -> int:
+        """Delete synced/rejected rows older than `retain_days`."""
+        cutoff = (utc_now() - timedelta(days=retain_days)).isoformat()
+        cur = await self._db.execute(
+            "DELETE FROM scans WHERE seq <= (SELECT COALESCE(MAX(CAST(value AS INTEGER)), 0) "
+            "FROM sync_state WHERE key = ?) AND synced_at < ?",
+            (CURSOR_KEY, cutoff),
+        )
+        await self._db.commit()
+        return cur.rowcount
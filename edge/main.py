@@ -1,11 +1,62 @@
+import logging
 import os
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, Gauge, generate_latest
+from pydantic import BaseModel
+
+from buffer import ScanBuffer
+from sync import SyncWorker
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("act-edge")
+
+EDGE_NODE_ID = os.getenv("EDGE_NODE_ID", "EDGE-001")
+APP_SERVER_URL = os.getenv("APP_SERVER_URL", "http://localhost:8000")
+SYNC_INTERVAL_SECONDS = float(os.getenv("SYNC_INTERVAL_SECONDS") or 30)
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE") or 200)
+SYNC_MAX_BACKOFF_SECONDS = float(os.getenv("SYNC_MAX_BACKOFF_SECONDS") or 300)
+BUFFER_PATH = os.getenv("EDGE_BUFFER_PATH", "/app/data/edge_buffer.db")
+BUFFER_RETAIN_DAYS = int(os.getenv("EDGE_BUFFER_RETAIN_DAYS") or 7)
+
+# Set from the buffer and sync worker on every scrape
+BUFFER_DEPTH = Gauge("act_edge_buffer_depth", "Scans queued and not yet accepted by the backend")
+SYNC_LAG = Gauge("act_edge_sync_lag_seconds", "Age of the oldest queued scan (0 when the queue is empty)")
+BUFFER_REJECTED = Gauge("act_edge_buffer_rejected", "Scans the backend rejected, still held in the buffer")
+SYNC_FAILURES = Gauge("act_edge_sync_consecutive_failures", "Failed sync attempts since the last success")
+LAST_SYNC = Gauge("act_edge_last_sync_timestamp_seconds", "Unix time of the last successful sync (0: never)")
+
+buffer = ScanBuffer(BUFFER_PATH)
+sync_worker = SyncWorker(
+    buffer, APP_SERVER_URL, SYNC_INTERVAL_SECONDS,
+    batch_size=SYNC_BATCH_SIZE, max_backoff_seconds=SYNC_MAX_BACKOFF_SECONDS,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await buffer.open()
+    pruned = await buffer.prune(BUFFER_RETAIN_DAYS)
+    if pruned:
+        logger.info(f"Pruned {pruned} synced scans older than {BUFFER_RETAIN_DAYS} days")
+    sync_worker.start()
+    logger.info(f"Edge {EDGE_NODE_ID} buffering to {BUFFER_PATH}, syncing to {APP_SERVER_URL}")
+
+    yield
+
+    await sync_worker.stop()
+    await buffer.close()
+
 
 app = FastAPI(
     title="ACT Edge Node API",
     description="ACT System Edge Node — scan capture & offline buffer",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -16,7 +67,53 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-EDGE_NODE_ID = os.getenv("EDGE_NODE_ID", "EDGE-001")
+
+class ScanIn(BaseModel):
+    worker_qr: str
+    asset_qr: str
+    event_type: str = "CHECKOUT"   # CHECKOUT or RETURN
+    timestamp: Optional[datetime] = None
+    notes: Optional[str] = None
+
+
+@app.post("/scan", status_code=202)
+async def capture_scan(scan: ScanIn):
+    """Queue a scan locally and acknowledge at once; it reaches the backend via the sync worker."""
+    queued = await buffer.enqueue({**scan.model_dump(mode="json"), "edge_node_id": EDGE_NODE_ID})
+    sync_worker.notify()
+    return {"status": "queued", **queued}
+
+
+@app.get("/scan/{scan_id}")
+async def get_scan(scan_id: str):
+    """Sync status of a queued scan, including the backend's result once synced."""
+    scan = await buffer.get_scan(scan_id)
+    if not scan:
+        raise HTTPException(status_code=404, detail="Scan not found")
+    return scan
+
+
+@app.get("/queue/status")
+async def queue_status():
+    return {"node_id": EDGE_NODE_ID, **await buffer.status(), **sync_worker.status()}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    queue = await buffer.status()
+    sync = sync_worker.status()
+    BUFFER_DEPTH.set(queue["pending"])
+    lag = 0.0
+    if queue["oldest_pending_captured_at"]:
+        oldest = datetime.fromisoformat(queue["oldest_pending_captured_at"])
+        if oldest.tzinfo is None:
+            oldest = oldest.replace(tzinfo=timezone.utc)
+        lag = max((datetime.now(timezone.utc) - oldest).total_seconds(), 0.0)
+    SYNC_LAG.set(lag)
+    BUFFER_REJECTED.set(queue["rejected"])
+    SYNC_FAILURES.set(sync["consecutive_failures"])
+    LAST_SYNC.set(sync["last_success_at"].timestamp() if sync["last_success_at"] else 0)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 @app.get("/health")
@@ -36,4 +133,6 @@ def root():
         "node_id": EDGE_NODE_ID,
         "docs": "/docs",
         "health": "/health",
+        "queue": "/queue/status",
+        "metrics": "/metrics",
     }
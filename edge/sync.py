@@ -0,0 +1,153 @@
+"""
+Background sync worker: drains the local scan buffer to the backend.
+
+Scans are posted in capture order to /api/v1/custody/scan/batch. The cursor
+only moves once the backend has answered a batch, so an outage or crash
+mid-request just resends the same scans. Each scan carries its scan_id as an
+idempotency key so the backend can recognise a resent scan. Failures back
+off exponentially (with jitter) up to SYNC_MAX_BACKOFF_SECONDS; a new scan
+wakes the worker early whenever it is not backing off.
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import httpx
+from prometheus_client import Counter, Histogram
+
+from buffer import ScanBuffer
+
+logger = logging.getLogger("act-edge.sync")
+
+SYNC_BATCHES = Counter("act_edge_sync_batches_total", "Batch posts to the backend by outcome", ["outcome"])
+SYNCED_SCANS = Counter("act_edge_synced_scans_total", "Scans answered by the backend", ["status"])
+SYNC_BATCH_SECONDS = Histogram(
+    "act_edge_sync_batch_seconds", "Round trip of one batch post",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15),
+)
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class SyncRejected(Exception):
+    """The backend answered but refused the batch as a whole."""
+
+
+class SyncRetry(Exception):
+    """The backend applied part of the batch and asked for the rest to be resent."""
+
+
+class SyncWorker:
+    def __init__(self, buffer: ScanBuffer, server_url: str, interval_seconds: float,
+                 batch_size: int = 200, max_backoff_seconds: float = 300, timeout_seconds: float = 15):
+        self.buffer = buffer
+        self.batch_url = server_url.rstrip("/") + "/api/v1/custody/scan/batch"
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.max_backoff_seconds = max_backoff_seconds
+        self.timeout_seconds = timeout_seconds
+
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._failures = 0
+        self.last_success_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self.next_attempt_at: Optional[datetime] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="edge-sync")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def notify(self):
+        """Called after a scan is enqueued; ignored while backing off."""
+        if not self._failures:
+            self._wake.set()
+
+    def status(self) -> dict:
+        return {
+            "backend": self.batch_url,
+            "consecutive_failures": self._failures,
+            "last_success_at": self.last_success_at,
+            "last_error": self.last_error,
+            "next_attempt_at": self.next_attempt_at,
+        }
+
+    def _backoff(self) -> float:
+        delay = min(self.max_backoff_seconds, self.interval_seconds * 2 ** min(self._failures, 16))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _run(self):
+        async with httpx.AsyncClient(timeout=self.timeout_seconds) as client:
+            while True:
+                self._wake.clear()
+                try:
+                    await self.drain(client)
+                    self._failures = 0
+                    self.last_error = None
+                    delay = self.interval_seconds
+                except (httpx.HTTPError, SyncRejected, SyncRetry) as e:
+                    self._failures += 1
+                    self.last_error = str(e) or type(e).__name__
+                    delay = self._backoff()
+                    logger.warning(f"Sync failed ({self._failures} in a row), retrying in {delay:.1f}s: {self.last_error}")
+                except Exception:
+                    self._failures += 1
+                    self.last_error = "unexpected error"
+                    delay = self._backoff()
+                    logger.exception("Sync worker error")
+
+                self.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def drain(self, client: httpx.AsyncClient):
+        """Send batches until the buffer is empty. Raises on the first failed batch."""
+        while True:
+            batch = await self.buffer.next_batch(self.batch_size)
+            if not batch:
+                return
+            seqs = [seq for seq, _ in batch]
+            events = [payload for _, payload in batch]
+
+            try:
+                with SYNC_BATCH_SECONDS.time():
+                    response = await client.post(self.batch_url, json={"events": events})
+            except httpx.HTTPError:
+                SYNC_BATCHES.labels("error").inc()
+                await self.buffer.record_attempt(seqs)
+                raise
+            if response.status_code != 200:
+                SYNC_BATCHES.labels(str(response.status_code)).inc()
+                await self.buffer.record_attempt(seqs)
+                if response.status_code in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                # Anything else means the batch itself was refused (e.g. schema mismatch
+                # after an upgrade); keep it queued and surface it in /queue/status
+                raise SyncRejected(f"backend refused batch: HTTP {response.status_code} {response.text[:200]}")
+
+            results = response.json()["results"]
+            # The backend stops at a database conflict and marks the rest retryable;
+            # those stay queued (cursor not moved past them) and are resent in order
+            retry_from = next((i for i, r in enumerate(results) if r.get("retryable")), len(results))
+            if retry_from:
+                await self.buffer.ack(seqs[:retry_from], results[:retry_from])
+            SYNC_BATCHES.labels("200").inc()
+            for result in results[:retry_from]:
+                SYNCED_SCANS.labels("synced" if result.get("success") else "rejected").inc()
+            if retry_from < len(results):
+                await self.buffer.record_attempt(seqs[retry_from:])
+                raise SyncRetry(f"backend deferred {len(results) - retry_from} scans from seq {seqs[retry_from]}: "
+                                f"{results[retry_from].get('error')}")
+            self.last_success_at = datetime.now(timezone.utc)
+            logger.info(f"Synced {len(seqs)} scans up to seq {seqs[-1]}")
@@ -1,14 +1,15 @@
 import { useState, useEffect, useCallback, useRef } from 'react'
 import axios from 'axios'
+import { sawLsn, withConditionalGet, withMinLsn, withReadYourWrites } from './api/client'
 
 // ─── API ──────────────────────────────────────────────────────────────────────
 const BASE = (import.meta.env?.VITE_API_URL || 'http://localhost:8000') + '/api/v1'
-const http = axios.create({ baseURL: BASE, timeout: 10000 })
+const http = withConditionalGet(withReadYourWrites(withMinLsn(axios.create({ baseURL: BASE, timeout: 10000 }))))
 const api = {
   summary:    () => http.get('/dashboard/summary'),
   custody:    () => http.get('/dashboard/active-custody'),
   alerts:     () => http.get('/alerts?status=OPEN&limit=30'),
-  assets:     () => http.get('/assets?limit=200'),
+  assets:     (params) => http.get('/assets', { params: { limit: 200, ...params } }),
   kits:       () => http.get('/kits'),
   workers:    () => http.get('/workers'),
   history:    () => http.get('/custody/history?limit=100'),
@@ -27,10 +28,75 @@ function useData(fn, ms = 10000) {
     catch(e) { setErr(e.message) }
     finally { setLoading(false) }
   }, [fn])
-  useEffect(() => { load(); const t = setInterval(load, ms); return () => clearInterval(t) }, [load, ms])
+  useEffect(() => {
+    load()
+    if (!ms) return
+    const t = setInterval(load, ms); return () => clearInterval(t)
+  }, [load, ms])
   return { data, loading, err, reload: load }
 }
 
+// ─── LIVE EVENTS ──────────────────────────────────────────────────────────────
+// One EventSource on /events/stream per tab, shared by every view. A view
+// reloads when an event of a type it shows arrives (bursts coalesced); while
+// the stream is down it falls back to polling every `ms`, and while it is up
+// it still polls every LIVE_POLL_MS in case an event was lost. Event LSNs are
+// echoed on reloads so a lagging read replica does not serve them.
+const live = { source: null, connected: false, listeners: new Set(), retry: null }
+const LIVE_POLL_MS = 60000
+
+function liveConnect() {
+  if (live.source || typeof EventSource === 'undefined') return
+  const es = new EventSource(`${BASE}/events/stream`)
+  const notify = (ev) => live.listeners.forEach(l => l(ev))
+  es.onmessage = (m) => {
+    let ev
+    try { ev = JSON.parse(m.data) } catch { return }
+    sawLsn(ev.lsn)
+    if (ev.type === 'hello') { live.connected = true; notify({ type: 'resync' }) }  // may have missed events
+    else notify(ev)
+  }
+  es.onerror = () => {
+    if (live.connected) { live.connected = false; notify({ type: 'down' }) }
+    if (es.readyState === EventSource.CLOSED) {   // refused (e.g. 503): browser will not retry by itself
+      live.source = null
+      clearTimeout(live.retry)
+      live.retry = setTimeout(() => live.listeners.size && liveConnect(), 30000)
+    }
+  }
+  live.source = es
+}
+
+function liveSubscribe(listener) {
+  live.listeners.add(listener)
+  liveConnect()
+  return () => {
+    live.listeners.delete(listener)
+    if (!live.listeners.size && live.source) {
+      live.source.close(); live.source = null; live.connected = false; clearTimeout(live.retry)
+    }
+  }
+}
+
+function useLiveData(fn, types, ms = 10000) {
+  const [connected, setConnected] = useState(live.connected)
+  const result = useData(fn, connected ? Math.max(ms, LIVE_POLL_MS) : ms)
+  const { reload } = result
+  const key = types.join(',')
+  useEffect(() => {
+    let t = null
+    const unsubscribe = liveSubscribe((ev) => {
+      if (ev.type === 'down') { setConnected(false); return }
+      setConnected(live.connected)
+      if (ev.type === 'resync' || key.split(',').includes(ev.type)) {
+        clearTimeout(t); t = setTimeout(reload, 300)
+      }
+    })
+    return () => { clearTimeout(t); unsubscribe() }
+  }, [reload, key])
+  return { ...result, live: connected }
+}
+
 // ─── GLOBAL CSS ───────────────────────────────────────────────────────────────
 const CSS = `
   @import url('https://fonts.googleapis.com/css2?family=Plus+Jakarta+Sans:wght@400;500;600;700;800&family=DM+Mono:wght@400;500&display=swap');
@@ -243,9 +309,9 @@ function Dashboard({ setPage }) {
   const sfn = useCallback(() => api.summary(), [])
   const cfn = useCallback(() => api.custody(), [])
   const afn = useCallback(() => api.alerts(), [])
-  const { data: S, loading: sl, reload: rs } = useData(sfn, 10000)
-  const { data: custody, loading: cl } = useData(cfn, 10000)
-  const { data: alerts, loading: al, reload: ra } = useData(afn, 12000)
+  const { data: S, loading: sl, reload: rs, live: isLive } = useLiveData(sfn, ['custody', 'alert', 'calibration'], 10000)
+  const { data: custody, loading: cl } = useLiveData(cfn, ['custody'], 10000)
+  const { data: alerts, loading: al, reload: ra } = useLiveData(afn, ['alert'], 12000)
   const total = (custody || []).length
 
   return (
@@ -254,7 +320,7 @@ function Dashboard({ setPage }) {
       <div style={{ display:'flex', justifyContent:'space-between', alignItems:'flex-end' }}>
         <div>
           <h1 style={{ fontSize:28, fontWeight:800, letterSpacing:'-0.04em', color: C.text, lineHeight:1.1 }}>Tool Room</h1>
-          <p style={{ fontSize:13.5, color: C.textSub, marginTop:5 }}>Live operations dashboard · refreshes every 10s</p>
+          <p style={{ fontSize:13.5, color: C.textSub, marginTop:5 }}>Live operations dashboard · {isLive ? 'live updates' : 'refreshes every 10s'}</p>
         </div>
         <Button onClick={rs} icon="↻">Refresh</Button>
       </div>
@@ -441,7 +507,7 @@ function AlertsFeed({ alerts, loading, onRefresh, compact }) {
 // ─── ALERTS PAGE ───────────────────────────────────────────────────────────────
 function AlertsPage() {
   const fn = useCallback(() => api.alerts(), [])
-  const { data: alerts, loading, reload } = useData(fn, 15000)
+  const { data: alerts, loading, reload } = useLiveData(fn, ['alert'], 15000)
   const [filter, setFilter] = useState('ALL')
   const [acking, setAcking] = useState(null)
 
@@ -516,8 +582,8 @@ function CustodyPage() {
   const [tab, setTab] = useState('active')
   const activeFn  = useCallback(() => api.custody(), [])
   const historyFn = useCallback(() => api.history(), [])
-  const { data: active,  loading: al } = useData(activeFn, 10000)
-  const { data: history, loading: hl } = useData(historyFn, 30000)
+  const { data: active,  loading: al } = useLiveData(activeFn, ['custody'], 10000)
+  const { data: history, loading: hl } = useLiveData(historyFn, ['custody'], 30000)
 
   const records = tab === 'active' ? (active || []) : (history || [])
   const loading  = tab === 'active' ? al : hl
@@ -608,16 +674,27 @@ function AssetsPage() {
   const [tab, setTab]  = useState('assets')
   const [q, setQ]      = useState('')
   const [sf, setSf]    = useState('')
+  const [total, setTotal] = useState('')
+
+  useEffect(() => { api.kits().then(k => setK(k.data||[])) }, [])
 
+  // Assets are searched server-side (trigram-indexed, ranked); debounce keystrokes
   useEffect(() => {
-    Promise.all([api.assets(), api.kits()])
-      .then(([a,k]) => { setA(a.data.items||[]); setK(k.data||[]) })
-      .finally(() => setLoad(false))
-  }, [])
-
-  const items = (tab === 'assets' ? assets : kits).filter(x => {
-    const code = x.asset_code || x.kit_code || ''
-    const ok1 = !q || x.name.toLowerCase().includes(q.toLowerCase()) || code.toLowerCase().includes(q.toLowerCase())
+    let stale = false
+    const t = setTimeout(() => {
+      api.assets({ search: q || undefined, state: sf || undefined, count: 'capped' })
+        .then(a => {
+          if (stale) return
+          setA(a.data.items||[])
+          setTotal(a.data.total_capped ? `${a.data.total}+` : a.data.total)
+        })
+        .finally(() => setLoad(false))
+    }, q ? 250 : 0)
+    return () => { stale = true; clearTimeout(t) }
+  }, [q, sf])
+
+  const items = tab === 'assets' ? assets : kits.filter(x => {
+    const ok1 = !q || x.name.toLowerCase().includes(q.toLowerCase()) || x.kit_code.toLowerCase().includes(q.toLowerCase())
     const ok2 = !sf || x.state === sf
     return ok1 && ok2
   })
@@ -638,7 +715,7 @@ function AssetsPage() {
           <div style={{ marginLeft:'auto', display:'flex', background: C.panelAlt, border:`1px solid ${C.border}`, borderRadius: C.rSm, overflow:'hidden' }}>
             {['assets','kits'].map(t => (
               <button key={t} onClick={() => setTab(t)} style={{ padding:'9px 20px', border:'none', cursor:'pointer', fontSize:13.5, fontWeight:600, background: tab === t ? C.text : 'transparent', color: tab === t ? 'white' : C.textSub, transition:'all .15s' }}>
-                {t === 'assets' ? `Assets (${assets.length})` : `Kits (${kits.length})`}
+                {t === 'assets' ? `Assets (${total})` : `Kits (${kits.length})`}
               </button>
             ))}
           </div>
@@ -908,7 +985,7 @@ function timeAgo(d) {
 export default function App() {
   const [page, setPage] = useState('dashboard')
   const sfn = useCallback(() => api.summary(), [])
-  const { data: summary } = useData(sfn, 15000)
+  const { data: summary } = useLiveData(sfn, ['custody', 'alert', 'calibration'], 15000)
 
   const VIEWS = { dashboard: <Dashboard setPage={setPage} />, scan: <ScanPage />, custody: <CustodyPage />, assets: <AssetsPage />, workers: <WorkersPage />, alerts: <AlertsPage /> }
 
@@ -5,6 +5,91 @@ const API = axios.create({
   timeout: 10000,
 })
 
+// Conditional GET: keep the ETag and body of recent GETs, revalidate with
+// If-None-Match and serve the kept body when the API answers 304. The kept
+// body is the same object as before, so React state set from it is unchanged.
+const MAX_VALIDATED = 100
+
+export function withConditionalGet(instance) {
+  const validated = new Map()
+
+  instance.interceptors.request.use((config) => {
+    if ((config.method || 'get') === 'get') {
+      const kept = validated.get(instance.getUri(config))
+      if (kept) config.headers['If-None-Match'] = kept.etag
+      config.validateStatus = (status) => (status >= 200 && status < 300) || status === 304
+    }
+    return config
+  })
+
+  instance.interceptors.response.use((res) => {
+    if (res.config.method !== 'get') return res
+    const key = instance.getUri(res.config)
+    if (res.status === 304) {
+      const kept = validated.get(key)
+      if (kept) return { ...res, status: 200, data: kept.data, headers: { ...kept.headers, ...res.headers } }
+    }
+    const etag = res.headers.etag
+    validated.delete(key)
+    if (etag) {
+      validated.set(key, { etag, data: res.data, headers: res.headers })
+      if (validated.size > MAX_VALIDATED) validated.delete(validated.keys().next().value)
+    }
+    return res
+  })
+  return instance
+}
+
+// Read-your-writes: the API stamps each write response with X-Last-Write;
+// echoing it on the next reads sends them to the primary database instead of
+// a possibly lagging read replica. Kept for a minute (the API decides what
+// is still recent), which also limits the CORS preflights it causes.
+const LAST_WRITE_KEEP_MS = 60000
+
+export function withReadYourWrites(instance) {
+  let lastWrite = null
+
+  instance.interceptors.request.use((config) => {
+    if (lastWrite && Date.now() - lastWrite.receivedAt < LAST_WRITE_KEEP_MS) {
+      config.headers['X-Last-Write'] = lastWrite.stamp
+    }
+    return config
+  })
+
+  instance.interceptors.response.use((res) => {
+    const stamp = res.headers['x-last-write']
+    if (stamp) lastWrite = { stamp, receivedAt: Date.now() }
+    return res
+  })
+  return instance
+}
+
+// Event-triggered reads: with read replicas, live events carry the primary's
+// WAL position ("lsn") after their commit. Echoing the newest one seen as
+// X-Min-LSN keeps the reload off replicas that have not replayed it yet,
+// which would answer 304 for the state the event replaced.
+let minLsn = null
+
+const lsnValue = (lsn) => {
+  const [high, low] = lsn.split('/')
+  return BigInt(`0x${high}`) * 4294967296n + BigInt(`0x${low}`)
+}
+
+export function sawLsn(lsn) {
+  if (typeof lsn !== 'string' || !/^[0-9A-F]+\/[0-9A-F]+$/i.test(lsn)) return
+  if (!minLsn || lsnValue(lsn) > lsnValue(minLsn)) minLsn = lsn
+}
+
+export function withMinLsn(instance) {
+  instance.interceptors.request.use((config) => {
+    if (minLsn && (config.method || 'get') === 'get') config.headers['X-Min-LSN'] = minLsn
+    return config
+  })
+  return instance
+}
+
+withConditionalGet(withReadYourWrites(withMinLsn(API)))
+
 export const getDashboardSummary = () => API.get('/dashboard/summary')
 export const getActiveCustody = () => API.get('/dashboard/active-custody')
 
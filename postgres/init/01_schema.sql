@@ -7,6 +7,7 @@
 -- Extensions
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 CREATE EXTENSION IF NOT EXISTS "pgcrypto";
+CREATE EXTENSION IF NOT EXISTS "pg_trgm";
 
 -- =============================================================================
 -- ENUMS
@@ -195,9 +196,10 @@ CREATE TABLE kit_members (
 -- =============================================================================
 -- TABLE: custody_records
 -- Every checkout and return event — the core audit trail
+-- Range-partitioned by month on checked_out_at (see PARTITIONING below)
 -- =============================================================================
 CREATE TABLE custody_records (
-    id              UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id              UUID NOT NULL DEFAULT uuid_generate_v4(),
     -- What was checked out
     asset_id        UUID REFERENCES assets(id),
     kit_id          UUID REFERENCES asset_kits(id),
@@ -222,12 +224,14 @@ CREATE TABLE custody_records (
     notes           TEXT,
     raw_scan_data   JSONB,                         -- raw QR scan payload from edge
     created_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    -- The partition key has to be part of the primary key
+    PRIMARY KEY (id, checked_out_at),
     -- Constraint: must reference either asset or kit, not neither
     CONSTRAINT chk_asset_or_kit CHECK (
         (asset_id IS NOT NULL AND kit_id IS NULL) OR
         (asset_id IS NULL AND kit_id IS NOT NULL)
     )
-);
+) PARTITION BY RANGE (checked_out_at);
 
 -- =============================================================================
 -- TABLE: calibration_records
@@ -280,7 +284,7 @@ CREATE TABLE alerts (
     -- What triggered it
     asset_id        UUID REFERENCES assets(id),
     kit_id          UUID REFERENCES asset_kits(id),
-    custody_record_id UUID REFERENCES custody_records(id),
+    custody_record_id UUID,                        -- custody_records.id; no FK, that table is partitioned
     worker_id       UUID REFERENCES workers(id),   -- worker involved
     -- Content
     title           VARCHAR(300) NOT NULL,
@@ -294,6 +298,9 @@ CREATE TABLE alerts (
     -- Notification tracking
     notified_at     TIMESTAMPTZ,
     notification_channels   TEXT[],
+    notify_attempts INTEGER NOT NULL DEFAULT 0,
+    notify_next_at  TIMESTAMPTZ,                   -- claimed by a dispatcher / retry not before
+    notify_error    TEXT,
     created_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     updated_at      TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
@@ -301,9 +308,10 @@ CREATE TABLE alerts (
 -- =============================================================================
 -- TABLE: audit_log
 -- Immutable record of every state change in the system
+-- Range-partitioned by month on created_at (see PARTITIONING below)
 -- =============================================================================
 CREATE TABLE audit_log (
-    id              BIGSERIAL PRIMARY KEY,
+    id              BIGSERIAL,
     entity_type     VARCHAR(50) NOT NULL,          -- 'asset', 'worker', 'custody', etc.
     entity_id       UUID NOT NULL,
     event_type      VARCHAR(100) NOT NULL,
@@ -313,12 +321,150 @@ CREATE TABLE audit_log (
     edge_node_id    UUID REFERENCES edge_nodes(id),
     ip_address      VARCHAR(45),
     notes           TEXT,
+    created_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- =============================================================================
+-- TABLE: rules_job_state
+-- Watermarks for incremental rules-engine jobs (e.g. calibration_check)
+-- =============================================================================
+CREATE TABLE rules_job_state (
+    job_name        VARCHAR(50) PRIMARY KEY,
+    last_run_at     TIMESTAMPTZ,                   -- thresholds crossed after this are pending
+    rules_fingerprint VARCHAR(32),                 -- alert rules the last run evaluated (md5)
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- =============================================================================
+-- TABLE: rules_job_runs
+-- History of scheduled background job runs (which process ran it, outcome)
+-- =============================================================================
+CREATE TABLE rules_job_runs (
+    id              BIGSERIAL PRIMARY KEY,
+    job_name        VARCHAR(50) NOT NULL,
+    runner          VARCHAR(100) NOT NULL,         -- host:pid of the scheduler leader
+    started_at      TIMESTAMPTZ NOT NULL,
+    finished_at     TIMESTAMPTZ NOT NULL,
+    success         BOOLEAN NOT NULL,
+    result          JSONB,
+    error           TEXT
+);
+
+CREATE INDEX idx_rules_job_runs_job ON rules_job_runs(job_name, started_at DESC);
+
+-- =============================================================================
+-- TABLE: dashboard_counters / dashboard_counter_deltas
+-- Pre-aggregated dashboard counts. Triggers only append delta rows, so writers
+-- never wait on each other; rollup_dashboard_counters() folds the deltas into
+-- dashboard_counters periodically. A count is its base value plus its deltas.
+-- =============================================================================
+CREATE TABLE dashboard_counters (
+    counter         VARCHAR(100) PRIMARY KEY,      -- e.g. 'assets.state.AVAILABLE'
+    value           BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE dashboard_counter_deltas (
+    id              BIGSERIAL PRIMARY KEY,
+    counter         VARCHAR(100) NOT NULL,
+    delta           BIGINT NOT NULL
+);
+
+-- =============================================================================
+-- TABLE: table_versions / table_changes
+-- Change counter per table; the API builds ETags from it so unchanged lists
+-- answer 304 without being queried. Triggers append one table_changes row per
+-- writing transaction and table (no shared row to lock), and
+-- rollup_table_versions() folds them into table_versions periodically. A
+-- table's version is its rolled-up version plus its pending change rows.
+-- =============================================================================
+CREATE TABLE table_versions (
+    table_name      VARCHAR(63) PRIMARY KEY,
+    version         BIGINT NOT NULL DEFAULT 0,
+    changed_at      TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE table_changes (
+    id              BIGSERIAL PRIMARY KEY,
+    table_name      VARCHAR(63) NOT NULL,
+    txid            BIGINT NOT NULL DEFAULT txid_current(),
+    changed_at      TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    UNIQUE (txid, table_name)
+);
+
+-- =============================================================================
+-- TABLE: scan_requests
+-- Client-generated scan ids already applied, so retried scans replay their
+-- original result instead of being applied again
+-- =============================================================================
+CREATE TABLE scan_requests (
+    scan_id         UUID PRIMARY KEY,
+    action          custody_event_type NOT NULL,   -- what the scan did
+    record_id       UUID NOT NULL,                 -- custody_records.id it created or closed
+    request_hash    VARCHAR(64) NOT NULL,          -- sha256 of the call; a reused id must match it
     created_at      TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
+-- =============================================================================
+-- PARTITIONING
+-- custody_records and audit_log are split into monthly partitions named
+-- <table>_pYYYYMM (UTC months). ensure_monthly_partitions() is run daily by the
+-- backend to keep PARTITION_MONTHS_AHEAD months ready; anything outside the
+-- existing ranges lands in <table>_default and is moved into its month's
+-- partition when that partition is created. Old partitions are detached and
+-- exported by the backend's archival job.
+-- =============================================================================
+CREATE TABLE custody_records_default PARTITION OF custody_records DEFAULT;
+CREATE TABLE audit_log_default PARTITION OF audit_log DEFAULT;
+
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(
+    parent TEXT, months_back INT DEFAULT 0, months_ahead INT DEFAULT 3
+) RETURNS INT AS $$
+DECLARE
+    key_column  TEXT;
+    month_start TIMESTAMPTZ;
+    month_end   TIMESTAMPTZ;
+    part_name   TEXT;
+    created     INT := 0;
+BEGIN
+    SELECT a.attname INTO key_column
+    FROM pg_partitioned_table pt
+    JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = pt.partattrs[0]
+    WHERE pt.partrelid = parent::regclass;
+
+    FOR i IN -months_back..months_ahead LOOP
+        month_start := (date_trunc('month', NOW() AT TIME ZONE 'UTC') + make_interval(months => i)) AT TIME ZONE 'UTC';
+        month_end   := (date_trunc('month', NOW() AT TIME ZONE 'UTC') + make_interval(months => i + 1)) AT TIME ZONE 'UTC';
+        part_name   := parent || '_p' || to_char(month_start AT TIME ZONE 'UTC', 'YYYYMM');
+        CONTINUE WHEN to_regclass(part_name) IS NOT NULL;
+
+        -- Build the partition detached, pull its rows out of the DEFAULT
+        -- partition, then attach (attaching fails while DEFAULT still has rows
+        -- in the range). Indexes are created to match the parent on attach.
+        EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part_name, parent);
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM %I WHERE %I >= $1 AND %I < $2 RETURNING *) INSERT INTO %I SELECT * FROM moved',
+            parent || '_default', key_column, key_column, part_name
+        ) USING month_start, month_end;
+        EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                       parent, part_name, month_start, month_end);
+        created := created + 1;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    PERFORM ensure_monthly_partitions('custody_records', 1, 3);
+    PERFORM ensure_monthly_partitions('audit_log', 1, 3);
+END $$;
+
 -- =============================================================================
 -- INDEXES
 -- =============================================================================
+-- (timestamp, id) composites serve keyset pagination of the history lists in
+-- either direction: WHERE (ts, id) < (:ts, :id) ORDER BY ts DESC, id DESC
 
 -- Workers
 CREATE INDEX idx_workers_employee_id ON workers(employee_id);
@@ -331,16 +477,21 @@ CREATE INDEX idx_assets_asset_code ON assets(asset_code);
 CREATE INDEX idx_assets_state ON assets(state);
 CREATE INDEX idx_assets_category ON assets(category_id);
 CREATE INDEX idx_assets_calibration_due ON assets(calibration_due_at) WHERE calibration_due_at IS NOT NULL;
+CREATE INDEX idx_assets_updated_at ON assets(updated_at) WHERE calibration_due_at IS NOT NULL;
+-- Trigram indexes for substring search (ILIKE '%term%') and relevance ranking
+CREATE INDEX idx_assets_name_trgm ON assets USING gin (name gin_trgm_ops);
+CREATE INDEX idx_assets_asset_code_trgm ON assets USING gin (asset_code gin_trgm_ops);
+CREATE INDEX idx_assets_serial_number_trgm ON assets USING gin (serial_number gin_trgm_ops);
 
 -- Kits
 CREATE INDEX idx_kits_qr_code ON asset_kits(qr_code);
 CREATE INDEX idx_kits_state ON asset_kits(state);
 
 -- Custody records
-CREATE INDEX idx_custody_asset ON custody_records(asset_id);
+CREATE INDEX idx_custody_asset ON custody_records(asset_id, checked_out_at, id);
 CREATE INDEX idx_custody_kit ON custody_records(kit_id);
-CREATE INDEX idx_custody_worker ON custody_records(worker_id);
-CREATE INDEX idx_custody_checked_out_at ON custody_records(checked_out_at);
+CREATE INDEX idx_custody_worker ON custody_records(worker_id, checked_out_at, id);
+CREATE INDEX idx_custody_checked_out_at ON custody_records(checked_out_at, id);
 CREATE INDEX idx_custody_returned_at ON custody_records(returned_at);
 CREATE INDEX idx_custody_overdue ON custody_records(is_overdue) WHERE is_overdue = TRUE;
 CREATE INDEX idx_custody_open ON custody_records(returned_at) WHERE returned_at IS NULL;
@@ -350,14 +501,16 @@ CREATE INDEX idx_calibration_asset ON calibration_records(asset_id);
 CREATE INDEX idx_calibration_valid_until ON calibration_records(valid_until);
 
 -- Alerts
-CREATE INDEX idx_alerts_status ON alerts(status);
+CREATE INDEX idx_alerts_status ON alerts(status, created_at, id);
 CREATE INDEX idx_alerts_severity ON alerts(severity);
 CREATE INDEX idx_alerts_asset ON alerts(asset_id);
-CREATE INDEX idx_alerts_created ON alerts(created_at);
+CREATE INDEX idx_alerts_created ON alerts(created_at, id);
+CREATE INDEX idx_alerts_custody_record ON alerts(custody_record_id) WHERE custody_record_id IS NOT NULL;
+CREATE INDEX idx_alerts_notify_pending ON alerts(created_at) WHERE notified_at IS NULL AND status = 'OPEN';
 
 -- Audit log
-CREATE INDEX idx_audit_entity ON audit_log(entity_type, entity_id);
-CREATE INDEX idx_audit_created ON audit_log(created_at);
+CREATE INDEX idx_audit_entity ON audit_log(entity_type, entity_id, created_at, id);
+CREATE INDEX idx_audit_created ON audit_log(created_at, id);
 
 -- =============================================================================
 -- TRIGGER: auto-update updated_at timestamp
@@ -389,3 +542,214 @@ CREATE TRIGGER trg_alerts_updated_at
 CREATE TRIGGER trg_alert_rules_updated_at
     BEFORE UPDATE ON alert_rules
     FOR EACH ROW EXECUTE FUNCTION update_updated_at();
+
+-- =============================================================================
+-- TRIGGER: dashboard_counters maintenance
+-- Counter keys:
+--   assets.total, assets.state.<state>, assets.calibration.<status>   (active assets only)
+--   kits.total, kits.state.<state>
+--   alerts.status.<status>, alerts.status.<status>.<severity>
+-- Triggers are statement-level with transition tables, so a bulk UPDATE from
+-- the rules engine appends one delta row per touched counter. Appending takes
+-- no row locks, so custody transactions never queue or deadlock on counters.
+-- =============================================================================
+CREATE OR REPLACE FUNCTION apply_dashboard_deltas(removed TEXT[], added TEXT[])
+RETURNS VOID AS $$
+    INSERT INTO dashboard_counter_deltas (counter, delta)
+    SELECT counter, SUM(delta) FROM (
+        SELECT unnest(removed) AS counter, -1 AS delta
+        UNION ALL
+        SELECT unnest(added), 1
+    ) d
+    GROUP BY counter
+    HAVING SUM(delta) <> 0;
+$$ LANGUAGE sql;
+
+-- Fold committed deltas into dashboard_counters in one transaction, so readers
+-- summing both tables never see a delta twice or not at all. Run by the
+-- scheduler leader only; returns the number of delta rows folded.
+CREATE OR REPLACE FUNCTION rollup_dashboard_counters()
+RETURNS BIGINT AS $$
+    WITH moved AS (
+        DELETE FROM dashboard_counter_deltas RETURNING counter, delta
+    ), folded AS (
+        INSERT INTO dashboard_counters (counter, value)
+        SELECT counter, SUM(delta) FROM moved
+        GROUP BY counter
+        ORDER BY counter
+        ON CONFLICT (counter) DO UPDATE SET value = dashboard_counters.value + EXCLUDED.value
+    )
+    SELECT COUNT(*) FROM moved;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION asset_dashboard_keys(a assets)
+RETURNS TEXT[] AS $$
+    SELECT CASE WHEN a.is_active THEN ARRAY[
+        'assets.total',
+        'assets.state.' || a.state,
+        'assets.calibration.' || a.calibration_status
+    ] ELSE ARRAY[]::TEXT[] END;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION kit_dashboard_keys(k asset_kits)
+RETURNS TEXT[] AS $$
+    SELECT ARRAY['kits.total', 'kits.state.' || k.state];
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION alert_dashboard_keys(al alerts)
+RETURNS TEXT[] AS $$
+    SELECT ARRAY['alerts.status.' || al.status, 'alerts.status.' || al.status || '.' || al.severity];
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION assets_dashboard_counters()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM apply_dashboard_deltas('{}', ARRAY(SELECT unnest(asset_dashboard_keys(n)) FROM new_rows n));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM apply_dashboard_deltas(
+            ARRAY(SELECT unnest(asset_dashboard_keys(o)) FROM old_rows o),
+            ARRAY(SELECT unnest(asset_dashboard_keys(n)) FROM new_rows n)
+        );
+    ELSE
+        PERFORM apply_dashboard_deltas(ARRAY(SELECT unnest(asset_dashboard_keys(o)) FROM old_rows o), '{}');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION kits_dashboard_counters()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM apply_dashboard_deltas('{}', ARRAY(SELECT unnest(kit_dashboard_keys(n)) FROM new_rows n));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM apply_dashboard_deltas(
+            ARRAY(SELECT unnest(kit_dashboard_keys(o)) FROM old_rows o),
+            ARRAY(SELECT unnest(kit_dashboard_keys(n)) FROM new_rows n)
+        );
+    ELSE
+        PERFORM apply_dashboard_deltas(ARRAY(SELECT unnest(kit_dashboard_keys(o)) FROM old_rows o), '{}');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION alerts_dashboard_counters()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM apply_dashboard_deltas('{}', ARRAY(SELECT unnest(alert_dashboard_keys(n)) FROM new_rows n));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM apply_dashboard_deltas(
+            ARRAY(SELECT unnest(alert_dashboard_keys(o)) FROM old_rows o),
+            ARRAY(SELECT unnest(alert_dashboard_keys(n)) FROM new_rows n)
+        );
+    ELSE
+        PERFORM apply_dashboard_deltas(ARRAY(SELECT unnest(alert_dashboard_keys(o)) FROM old_rows o), '{}');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_assets_counters_ins AFTER INSERT ON assets
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION assets_dashboard_counters();
+CREATE TRIGGER trg_assets_counters_upd AFTER UPDATE ON assets
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION assets_dashboard_counters();
+CREATE TRIGGER trg_assets_counters_del AFTER DELETE ON assets
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION assets_dashboard_counters();
+
+CREATE TRIGGER trg_kits_counters_ins AFTER INSERT ON asset_kits
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kits_dashboard_counters();
+CREATE TRIGGER trg_kits_counters_upd AFTER UPDATE ON asset_kits
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kits_dashboard_counters();
+CREATE TRIGGER trg_kits_counters_del AFTER DELETE ON asset_kits
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kits_dashboard_counters();
+
+CREATE TRIGGER trg_alerts_counters_ins AFTER INSERT ON alerts
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION alerts_dashboard_counters();
+CREATE TRIGGER trg_alerts_counters_upd AFTER UPDATE ON alerts
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION alerts_dashboard_counters();
+CREATE TRIGGER trg_alerts_counters_del AFTER DELETE ON alerts
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION alerts_dashboard_counters();
+
+-- Rebuild all counters from the base tables (run once after restoring data
+-- that bypassed the triggers, e.g. pg_restore with triggers disabled)
+CREATE OR REPLACE FUNCTION refresh_dashboard_counters()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE dashboard_counters, dashboard_counter_deltas IN EXCLUSIVE MODE;
+    DELETE FROM dashboard_counters;
+    DELETE FROM dashboard_counter_deltas;
+    PERFORM apply_dashboard_deltas('{}', ARRAY(SELECT unnest(asset_dashboard_keys(a)) FROM assets a));
+    PERFORM apply_dashboard_deltas('{}', ARRAY(SELECT unnest(kit_dashboard_keys(k)) FROM asset_kits k));
+    PERFORM apply_dashboard_deltas('{}', ARRAY(SELECT unnest(alert_dashboard_keys(al)) FROM alerts al));
+    PERFORM rollup_dashboard_counters();
+END;
+$$ LANGUAGE plpgsql;
+
+-- =============================================================================
+-- TRIGGER: table_versions maintenance
+-- One change row per transaction and table whose write statements changed
+-- rows (transition tables, so the rules engine's no-op passes do not
+-- invalidate ETags). Appending takes no row locks, so hot writers neither
+-- queue nor deadlock on it. Only tables behind conditional GET endpoints are
+-- tracked. Versions are counts, not max(id): a change committing after a
+-- higher id was already visible still moves the version.
+-- =============================================================================
+CREATE OR REPLACE FUNCTION bump_table_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM changed_rows) THEN
+        INSERT INTO table_changes (table_name) VALUES (TG_TABLE_NAME)
+        ON CONFLICT (txid, table_name) DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Fold committed change rows into table_versions in one transaction (run by
+-- the scheduler leader); returns the number of change rows folded
+CREATE OR REPLACE FUNCTION rollup_table_versions()
+RETURNS BIGINT AS $$
+    WITH moved AS (
+        DELETE FROM table_changes RETURNING table_name, changed_at
+    ), folded AS (
+        INSERT INTO table_versions (table_name, version, changed_at)
+        SELECT table_name, COUNT(*), max(changed_at) FROM moved
+        GROUP BY table_name
+        ORDER BY table_name
+        ON CONFLICT (table_name) DO UPDATE
+            SET version = table_versions.version + EXCLUDED.version,
+                changed_at = GREATEST(table_versions.changed_at, EXCLUDED.changed_at)
+    )
+    SELECT COUNT(*) FROM moved;
+$$ LANGUAGE sql;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['assets', 'asset_kits', 'asset_categories', 'workers', 'alerts', 'custody_records']
+    LOOP
+        EXECUTE format('CREATE TRIGGER trg_%1$s_version_ins AFTER INSERT ON %1$I
+            REFERENCING NEW TABLE AS changed_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()', t);
+        EXECUTE format('CREATE TRIGGER trg_%1$s_version_upd AFTER UPDATE ON %1$I
+            REFERENCING NEW TABLE AS changed_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()', t);
+        EXECUTE format('CREATE TRIGGER trg_%1$s_version_del AFTER DELETE ON %1$I
+            REFERENCING OLD TABLE AS changed_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()', t);
+    END LOOP;
+END;
+$$;